@@ -0,0 +1,108 @@
+# 📁 binance/depth_stream.py
+
+import json
+import threading
+
+from config.config import DEPTH_STREAM_URL, MAX_ERROR_BACKOFF
+from config.logger import log
+from data.order_book import order_books
+
+# 增量深度推送频率（Binance 现货支持 100ms / 1000ms）
+DEPTH_UPDATE_SPEED = "100ms"
+
+# 等待推送消息的超时（秒）：超时后检查订阅的币种是否变化，并确认连接仍然存活
+RECEIVE_TIMEOUT = 5
+
+
+def stream_name(symbol: str) -> str:
+    """交易对转换为 Binance 推送流名称，如 "BTC/USDT" -> "btcusdt@depth@100ms" """
+    return f"{symbol.replace('/', '').lower()}@depth@{DEPTH_UPDATE_SPEED}"
+
+
+class DepthStream:
+    """
+    Binance 增量深度推送（<symbol>@depth）：在独立线程中运行 asyncio 事件循环，
+    通过一个组合流连接订阅所有币种，把 depthUpdate 事件交给 OrderBookManager 维护本地盘口。
+
+    - 连接断开后按 1, 2, 4 ... 秒（上限 MAX_ERROR_BACKOFF）重连，重连前丢弃所有本地盘口（期间的事件已丢失）
+    - set_symbols() 可在任意线程调用（币种配置热加载），订阅列表变化时重新连接
+    - 使用 aiohttp（ccxt 的依赖）建立 WebSocket 连接，缺少时只记录日志，不影响主循环
+    """
+
+    def __init__(self, books, url: str = DEPTH_STREAM_URL):
+        self.books = books
+        self.url = url
+        self._symbols = ()
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, symbols):
+        self.set_symbols(symbols)
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._serve, name="depth-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._changed.set()
+
+    def set_symbols(self, symbols):
+        symbols = tuple(sorted(symbols))
+        if symbols != self._symbols:
+            self._symbols = symbols
+            self._changed.set()
+
+    def _serve(self):
+        """推送线程入口；asyncio / aiohttp 只在启动推送时导入，未启用时不增加启动耗时"""
+        import asyncio
+
+        asyncio.run(self._run())
+
+    async def _run(self):
+        import asyncio
+
+        try:
+            import aiohttp
+        except ImportError:
+            log("⚠️ 未安装 aiohttp，本地盘口不可用（滑点检查将被跳过）")
+            return
+
+        failures = 0
+        async with aiohttp.ClientSession() as session:
+            while not self._stop.is_set():
+                self._changed.clear()
+                symbols = self._symbols
+                by_id = {symbol.replace("/", ""): symbol for symbol in symbols}
+                self.books.reset()
+                if not symbols:
+                    await asyncio.sleep(RECEIVE_TIMEOUT)
+                    continue
+
+                url = f"{self.url}?streams={'/'.join(stream_name(s) for s in symbols)}"
+                try:
+                    async with session.ws_connect(url, heartbeat=30) as ws:
+                        log(f"📡 已连接增量深度推送：{', '.join(symbols)}")
+                        failures = 0
+                        while not self._stop.is_set() and not self._changed.is_set():
+                            try:
+                                message = await ws.receive(timeout=RECEIVE_TIMEOUT)
+                            except asyncio.TimeoutError:
+                                continue
+                            if message.type != aiohttp.WSMsgType.TEXT:
+                                raise ConnectionError(f"连接已关闭（{message.type.name}）")
+                            data = json.loads(message.data).get("data") or {}
+                            symbol = by_id.get(data.get("s"))
+                            if data.get("e") == "depthUpdate" and symbol:
+                                self.books.on_event(symbol, data)
+                except Exception as e:
+                    failures += 1
+                    delay = min(2 ** (failures - 1), MAX_ERROR_BACKOFF)
+                    log(f"⚠️ 增量深度推送断开：{e}，{delay} 秒后重连")
+                    await asyncio.sleep(delay)
+
+
+# 全局深度推送（维护 data/order_book.py 中的 order_books）
+depth_stream = DepthStream(order_books)
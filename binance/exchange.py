@@ -1,14 +1,110 @@
-# 导入 ccxt 库，用于连接加密货币交易所 API
-import ccxt
+# 📁 binance/exchange.py
+
+import os
+import threading
 
 # 从自定义模块中导入 Binance API 的密钥配置
-from config.config import BINANCE_API_KEY, BINANCE_API_SECRET
+from config.config import (
+    BINANCE_API_KEY, BINANCE_API_SECRET, DRY_RUN,
+    SIM_INITIAL_BALANCES, SIM_BALANCE_FILE, SIM_LATENCY_MS, SIM_SPREAD_BPS, SIM_BOOK_LEVELS, SIM_LEVEL_NOTIONAL
+)
+
+# 交易所对象在第一次使用时才创建（ccxt 导入较慢，回测/分析工具无需加载）
+_exchange = None
+_lock = threading.Lock()
+
+
+def create_exchange():
+    """
+    创建交易所对象：
+    - 实盘：ccxt.binance 现货客户端
+    - 模拟交易（DRY_RUN）：本地撮合引擎，行情仍来自 Binance；账户余额保存在 SIM_BALANCE_FILE，重启后继续使用
+    """
+    # 导入 ccxt 库，用于连接加密货币交易所 API
+    import ccxt
+
+    # 初始化 Binance 交易所对象，配置 API 密钥和参数
+    binance_client = ccxt.binance({
+        'apiKey': BINANCE_API_KEY,               # 设置 API Key
+        'secret': BINANCE_API_SECRET,           # 设置 API Secret
+        'enableRateLimit': True,        # 启用速率限制，以防止触发 API 限频
+        'options': {'defaultType': 'spot'}  # 使用现货市场（spot），而非合约或杠杆市场
+    })
+
+    if not DRY_RUN:
+        return binance_client
+
+    from binance.simulator import SimulatedExchange, load_balances
+    return SimulatedExchange(
+        data_source=binance_client,
+        balances=load_balances(SIM_BALANCE_FILE, SIM_INITIAL_BALANCES),
+        balance_file=SIM_BALANCE_FILE,
+        latency_ms=SIM_LATENCY_MS,
+        spread_bps=SIM_SPREAD_BPS,
+        book_levels=SIM_BOOK_LEVELS,
+        level_notional=SIM_LEVEL_NOTIONAL,
+    )
+
+
+def create_venue_client(name: str, exchange_id: str):
+    """
+    为 TRADING_VENUES 中的额外交易所创建可下单的客户端，规则与 create_exchange 相同：
+    - 实盘：ccxt 现货客户端，API Key / Secret 读取环境变量 <NAME>_API_KEY / <NAME>_API_SECRET
+    - 模拟交易（DRY_RUN）：本地撮合引擎，行情来自该交易所；余额单独保存（sim_balances.<name>.json）
+    """
+    import ccxt
+
+    client = getattr(ccxt, exchange_id)({
+        'apiKey': os.getenv(f"{name.upper()}_API_KEY"),
+        'secret': os.getenv(f"{name.upper()}_API_SECRET"),
+        'enableRateLimit': True,
+        'options': {'defaultType': 'spot'}
+    })
+
+    if not DRY_RUN:
+        return client
+
+    from binance.simulator import SimulatedExchange, load_balances
+    root, ext = os.path.splitext(SIM_BALANCE_FILE)
+    balance_file = f"{root}.{name}{ext}"
+    return SimulatedExchange(
+        data_source=client,
+        balances=load_balances(balance_file, SIM_INITIAL_BALANCES),
+        balance_file=balance_file,
+        latency_ms=SIM_LATENCY_MS,
+        spread_bps=SIM_SPREAD_BPS,
+        book_levels=SIM_BOOK_LEVELS,
+        level_notional=SIM_LEVEL_NOTIONAL,
+    )
+
+
+def get_exchange():
+    """返回全局共享的交易所对象，首次调用时创建"""
+    global _exchange
+    if _exchange is None:
+        with _lock:
+            if _exchange is None:
+                _exchange = create_exchange()
+    return _exchange
+
+
+def get_market_data_source():
+    """
+    返回真实行情所在的交易所对象：模拟交易时为 SimulatedExchange 的行情来源（ccxt 客户端），
+    否则就是交易所对象本身。用于读取请求权重、拉取带 lastUpdateId 的盘口快照等只有真实接口才有的信息。
+    """
+    exchange = get_exchange()
+    return getattr(exchange, "data_source", None) or exchange
+
+
+def set_exchange(exchange):
+    """替换全局交易所对象（回测、回放或本地替身使用）"""
+    global _exchange
+    _exchange = exchange
 
-# 初始化 Binance 交易所对象，配置 API 密钥和参数
-exchange = ccxt.binance({
-    'apiKey': BINANCE_API_KEY,               # 设置 API Key
-    'secret': BINANCE_API_SECRET,           # 设置 API Secret
-    'enableRateLimit': True,        # 启用速率限制，以防止触发 API 限频
-    'options': {'defaultType': 'spot'}  # 使用现货市场（spot），而非合约或杠杆市场
-})
 
+def __getattr__(name):
+    # 兼容旧代码的 `from binance.exchange import exchange`（会在导入处触发创建）
+    if name == "exchange":
+        return get_exchange()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,474 @@
+# 📁 binance/execution.py
+
+import inspect
+import itertools
+import json
+import os
+import threading
+
+from binance.exchange import get_exchange
+from binance.order_manager import order_manager, get_fill_fee
+from binance.services import get_precision_info, round_to_precision
+from config.config import SYMBOL_CONFIGS
+from config.logger import log
+from config.symbol_loader import register_validator
+from config import clock as clock_module
+
+_parent_ids = itertools.count(1)
+
+# 运行中母单的状态（子单 ID 等），重启后据此结算已成交的子单
+ALGO_STATE_FILE = "algo_orders.json"
+
+# 追价撤单后无法确认子单最终状态时的重试次数（每次间隔 chase_interval 秒）
+CANCEL_RETRIES = 3
+
+# 录制 / 回放时执行算法不启动后台线程，由主循环每轮调用 step_executions() 同步推进（见 run_inline），
+# 等待只记在母单自己的唤醒时间上，不推进全局时钟，保证录制和回放的结果可复现
+_inline = False
+_inline_algos = []
+
+
+class AlgoStateStore:
+    """
+    母单状态文件：{母单 ID: {symbol, side, amount, tag, children}}。
+    母单启动和每下一笔子单时写入，母单结束（已回报汇总成交）后删除；
+    进程中途退出时留下的记录由 resume_execution() 在下次启动时结算。
+    多个执行算法线程共用，读写加锁。
+    """
+
+    def __init__(self, path: str = ALGO_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log(f"⚠️ 读取执行算法状态失败: {e}")
+            return {}
+
+    def _write(self, data: dict):
+        if not self.path:
+            return
+        try:
+            tmp_file = self.path + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.path)
+        except OSError as e:
+            log(f"⚠️ 保存执行算法状态失败: {e}")
+
+    def get(self, algo_id: str):
+        with self._lock:
+            return self._load().get(algo_id)
+
+    def save(self, algo, children=None, amount=None):
+        """保存母单状态；children / amount 只保留其中一部分子单时传入（见 ExecutionAlgo.unresolved）"""
+        with self._lock:
+            data = self._load()
+            data[algo.id] = {
+                "symbol": algo.symbol, "side": algo.side,
+                "amount": algo.amount if amount is None else amount,
+                "tag": algo.tag, "children": list(algo.children if children is None else children),
+            }
+            self._write(data)
+
+    def remove(self, algo_id: str):
+        with self._lock:
+            data = self._load()
+            if data.pop(algo_id, None) is not None:
+                self._write(data)
+
+
+# 全局母单状态
+algo_states = AlgoStateStore()
+
+
+class ExecutionAlgo:
+    """
+    执行算法基类：把一笔母单拆成多笔子单，在后台线程中异步下单（录制 / 回放时由主循环同步推进）。
+
+    子单成交累计在母单上，全部结束后通过 order_manager.report 回报一条汇总事件，
+    主循环的 process_order_events 再据此调用 apply_buy_fill / settle_sell（即 finalize_trade 的结算部分）。
+    子类把 _execute() 实现为生成器，需要等待时 yield 等待的秒数（不直接 sleep），通过 _child() 下子单；
+    _execute() 出错退出时 _finish_children() 负责收尾仍在挂着的子单。
+    母单和子单 ID 保存在 algo_states 中，进程中途退出后由 resume_execution() 结算。
+    重试后仍无法确认状态的子单记在 unresolved 中：母单照常回报已确认的成交，状态文件只保留这些子单，
+    回报的 tag 带上 resume=母单 ID，持仓保持挂单标记，下次启动由 resume_execution() 结算。
+    """
+
+    name = "base"
+
+    def __init__(self, symbol: str, side: str, amount: float, tag=None, sleep=clock_module.sleep):
+        self.symbol = symbol
+        self.side = side.upper()
+        self.amount = amount
+        self.tag = tag
+        # 带启动时间，重启后不会与上次运行的母单 ID 重复
+        self.id = f"algo-{self.name}-{int(clock_module.now())}-{next(_parent_ids)}"
+        self.children = []
+        self.unresolved = []
+        self.filled = 0.0
+        self.cost = 0.0
+        self.fee = 0.0
+        self.step_size, self.min_notional = get_precision_info(symbol)
+        self._sleep = sleep
+        self._thread = None
+        self._steps = None
+        self._wake_at = 0.0
+
+    @property
+    def remaining(self) -> float:
+        return round_to_precision(max(self.amount - self.filled, 0.0), self.step_size)
+
+    def start(self) -> dict:
+        """启动执行（后台线程，或录制 / 回放时的同步模式），返回一个 status=open 的母单回执（供调用方标记挂单）"""
+        algo_states.save(self)
+        if _inline:
+            self._steps = self._run_steps()
+            if self.step(clock_module.now()):
+                _inline_algos.append(self)
+        else:
+            self._thread = threading.Thread(target=self._run, name=self.id, daemon=True)
+            self._thread.start()
+        return {"id": self.id, "symbol": self.symbol, "side": self.side.lower(), "amount": self.amount, "status": "open"}
+
+    def _run(self):
+        for seconds in self._run_steps():
+            self._sleep(seconds)
+
+    def step(self, now: float) -> bool:
+        """同步模式：到了唤醒时间就执行到下一次等待为止，返回母单是否仍在执行"""
+        if now < self._wake_at:
+            return True
+        try:
+            self._wake_at = now + next(self._steps)
+        except StopIteration:
+            return False
+        return True
+
+    def _run_steps(self):
+        """完整的执行过程（生成器，yield 需要等待的秒数），结束时回报汇总成交"""
+        try:
+            yield from self._execute()
+        except Exception as e:
+            log(f"❌ {self.symbol} 执行算法 {self.id} 出错: {e}")
+            yield from self._finish_children()
+
+        done = self.remaining <= 0
+        log(f"🧩 {self.symbol} {self.name} 母单结束：成交 {self.filled}/{self.amount}")
+        tag = self.tag
+        if self.unresolved:
+            # 先保存只含未确认子单的状态，再回报，确保持仓重新标记挂单时状态已在文件中
+            algo_states.save(self, children=self.unresolved, amount=self.remaining)
+            tag = dict(self.tag or {}, resume=self.id)
+        order_manager.report(
+            self.symbol, self.side,
+            self.filled if done else self.amount,
+            self.filled, self.cost, self.fee,
+            # 未全部成交（含正常结束但未成交完）按部分成交结算，卖出时不会被当作清仓
+            "closed" if done else "canceled", tag, step_size=self.step_size
+        )
+        if not self.unresolved:
+            algo_states.remove(self.id)
+
+    def _execute(self):
+        raise NotImplementedError
+
+    def _finish_children(self):
+        """撤销仍在挂着的子单并累计其成交（生成器；默认子单都是立即结束的，无需处理）"""
+        yield from ()
+
+    def _child(self, amount, order_type="market", price=None, params=None):
+        """下一笔子单并累计成交，返回订单回执（失败返回 None）"""
+        amount = round_to_precision(min(amount, self.remaining), self.step_size)
+        if amount <= 0:
+            return None
+        try:
+            order = get_exchange().create_order(
+                symbol=self.symbol, type=order_type, side=self.side.lower(),
+                amount=amount, price=price, params=params or {}
+            )
+        except Exception as e:
+            log(f"⚠️ {self.symbol} 子单下单失败: {e}")
+            return None
+        self.children.append(str(order["id"]))
+        algo_states.save(self)
+        if order.get("status") != "open":
+            self._accumulate(order)
+        return order
+
+    def _accumulate(self, order):
+        filled = order.get("filled") or 0.0
+        if filled:
+            self.filled += filled
+            self.cost += order.get("cost") or filled * (order.get("average") or order.get("price"))
+            self.fee += get_fill_fee(order)
+
+
+class TWAPExecution(ExecutionAlgo):
+    """
+    TWAP：在 duration 秒内把母单等分为 slices 笔市价子单，匀速下单。
+    """
+
+    name = "twap"
+
+    def __init__(self, symbol, side, amount, slices: int = 5, duration: float = 60, **kwargs):
+        super().__init__(symbol, side, amount, **kwargs)
+        self.slices = max(int(slices), 1)
+        self.duration = duration
+
+    def _execute(self):
+        interval = self.duration / self.slices
+        slice_amount = self.amount / self.slices
+        for i in range(self.slices):
+            if self.remaining <= 0:
+                break
+            # 最后一笔吃掉全部剩余，避免精度截断留下零头
+            self._child(self.remaining if i == self.slices - 1 else slice_amount)
+            if i < self.slices - 1:
+                yield interval
+
+
+class IcebergExecution(ExecutionAlgo):
+    """
+    冰山单：每笔子单不超过对手盘前 depth_levels 档可见数量的 depth_fraction，
+    以 IOC 限价单吃到这些档位为止，不向更深的价位扫单；间隔 interval 秒等待盘口恢复。
+    """
+
+    name = "iceberg"
+
+    def __init__(self, symbol, side, amount, depth_levels: int = 5, depth_fraction: float = 0.3,
+                 interval: float = 2, max_children: int = 50, **kwargs):
+        super().__init__(symbol, side, amount, **kwargs)
+        self.depth_levels = depth_levels
+        self.depth_fraction = depth_fraction
+        self.interval = interval
+        self.max_children = max_children
+
+    def _execute(self):
+        for _ in range(self.max_children):
+            if self.remaining <= 0:
+                return
+            book = get_exchange().fetch_order_book(self.symbol, limit=self.depth_levels)
+            levels = (book["asks"] if self.side == "BUY" else book["bids"])[: self.depth_levels]
+            if not levels:
+                yield self.interval
+                continue
+
+            visible = sum(size for _, size in levels)
+            child = max(visible * self.depth_fraction, self.step_size)
+            limit_price = levels[-1][0]
+            self._child(child, order_type="limit", price=limit_price, params={"timeInForce": "IOC"})
+            if self.remaining > 0:
+                yield self.interval
+
+
+class PostOnlyChaser(ExecutionAlgo):
+    """
+    只挂单追价：以 postOnly 限价单挂在己方最优价（买单挂买一、卖单挂卖一），赚取 maker 手续费。
+    每 chase_interval 秒检查一次，最优价偏离挂单价时撤单并按新最优价重挂剩余数量；
+    检查 max_chases 次后仍未完成则撤单，若 fallback_market 为 True 则剩余部分以市价单成交。
+    """
+
+    name = "chase"
+
+    def __init__(self, symbol, side, amount, chase_interval: float = 3, max_chases: int = 10,
+                 fallback_market: bool = True, **kwargs):
+        super().__init__(symbol, side, amount, **kwargs)
+        self.chase_interval = chase_interval
+        self.max_chases = max_chases
+        self.fallback_market = fallback_market
+        self._working = None   # 当前挂着的子单
+
+    def _best_price(self):
+        book = get_exchange().fetch_order_book(self.symbol, limit=5)
+        return book["bids"][0][0] if self.side == "BUY" else book["asks"][0][0]
+
+    def _cancel(self, order):
+        """
+        撤销挂单，并按最终状态累计已成交部分（生成器，用 yield from 调用）。
+        重试 CANCEL_RETRIES 次仍无法确认子单已结束时返回 False，调用方需继续跟踪该子单。
+        """
+        for attempt in range(CANCEL_RETRIES):
+            if attempt:
+                yield self.chase_interval
+            try:
+                get_exchange().cancel_order(order["id"], self.symbol)
+            except Exception as e:
+                # 可能已经成交或已撤销，以 fetch_order 的结果为准
+                log(f"⚠️ {self.symbol} 追价撤单失败: {e}")
+            try:
+                final = get_exchange().fetch_order(order["id"], self.symbol)
+            except Exception as e:
+                log(f"⚠️ {self.symbol} 查询追价子单 {order['id']} 失败: {e}")
+                continue
+            if final.get("status") != "open":
+                self._accumulate(final)
+                return True
+        return False
+
+    def _finish_children(self):
+        """
+        撤销当前子单，最多重试 max_chases 轮；仍无法确认状态时记为 unresolved，
+        保留在母单状态中由 resume_execution() 结算，避免无限重试阻塞母单回报。
+        """
+        if self._working is None:
+            return
+        attempts = max(int(self.max_chases), 1)
+        for attempt in range(attempts):
+            if attempt:
+                log(f"⚠️ {self.symbol} 追价子单 {self._working['id']} 状态未确认，{self.chase_interval} 秒后重试")
+                yield self.chase_interval
+            if (yield from self._cancel(self._working)):
+                self._working = None
+                return
+        child_id = str(self._working["id"])
+        log(f"❌ {self.symbol} 追价子单 {child_id} 重试 {attempts} 轮仍未确认状态，保留在母单 {self.id} 中，下次启动时结算")
+        self.unresolved.append(child_id)
+        self._working = None
+
+    def _execute(self):
+        price = None
+        for _ in range(self.max_chases):
+            if self.remaining <= 0:
+                break
+
+            # 最优价偏离挂单价时撤单，按新最优价重挂剩余数量（撤单未确认时继续跟踪原子单）
+            best = self._best_price()
+            if self._working is not None and best != price:
+                if (yield from self._cancel(self._working)):
+                    self._working = None
+            if self._working is None:
+                price = best
+                order = self._child(self.remaining, order_type="limit", price=price, params={"postOnly": True})
+                # 被拒绝（会吃单）或已立即结束，下一轮按新盘口重试
+                if order is not None and order.get("status") == "open":
+                    self._working = order
+
+            yield self.chase_interval
+            if self._working is not None:
+                try:
+                    current = get_exchange().fetch_order(self._working["id"], self.symbol)
+                except Exception as e:
+                    log(f"⚠️ {self.symbol} 查询追价子单 {self._working['id']} 失败: {e}")
+                    continue
+                if current.get("status") != "open":
+                    self._accumulate(current)
+                    self._working = None
+
+        yield from self._finish_children()
+        if self.remaining > 0 and self.fallback_market:
+            log(f"⚠️ {self.symbol} 追价次数用完，剩余 {self.remaining} 以市价成交")
+            self._child(self.remaining)
+
+
+# 配置名 -> 执行算法
+EXECUTION_ALGOS = {
+    TWAPExecution.name: TWAPExecution,
+    IcebergExecution.name: IcebergExecution,
+    PostOnlyChaser.name: PostOnlyChaser,
+}
+
+
+# 执行算法构造参数中不能出现在 execution 配置里的字段（由调用方传入）
+_RESERVED_PARAMS = {"self", "symbol", "side", "amount", "tag", "sleep"}
+
+
+def validate_execution_config(symbol: str, config: dict):
+    """
+    按执行算法构造函数的签名校验币种配置中的 execution 参数：字段必须是该算法的参数，
+    类型与注解一致（float 参数接受整数，数值参数不接受 true/false）。校验失败抛出 ValueError。
+    """
+    if "execution" not in config:
+        return
+    params = dict(config["execution"])
+    algo_cls = EXECUTION_ALGOS.get(params.pop("algo", None))
+    if algo_cls is None:
+        raise ValueError(f"{symbol}.execution.algo: 只支持 {sorted(EXECUTION_ALGOS)}")
+
+    signature = inspect.signature(algo_cls.__init__)
+    for key, value in params.items():
+        param = signature.parameters.get(key)
+        if param is None or key in _RESERVED_PARAMS or param.kind is not param.POSITIONAL_OR_KEYWORD:
+            raise ValueError(f"{symbol}.execution.{key}: {algo_cls.name} 不支持该参数")
+        expected = param.annotation
+        allowed = (int, float) if expected is float else (expected,)
+        if expected is not param.empty and (
+            not isinstance(value, allowed) or (isinstance(value, bool) and expected is not bool)
+        ):
+            raise ValueError(f"{symbol}.execution.{key}: 类型错误 {value!r}，应为 {expected.__name__}")
+
+
+# 热加载和回放加载配置时一并校验执行算法参数；已加载的配置立即校验
+register_validator(validate_execution_config, SYMBOL_CONFIGS)
+
+
+def run_inline(enabled: bool):
+    """开启 / 关闭同步模式（录制 / 回放时开启，母单由主循环调用 step_executions() 推进）；切换时丢弃未推进完的母单"""
+    global _inline
+    _inline = enabled
+    _inline_algos.clear()
+
+
+def step_executions():
+    """同步模式下推进所有到期的母单（主循环每轮调用），已结束的母单移出列表"""
+    now = clock_module.now()
+    _inline_algos[:] = [algo for algo in _inline_algos if algo.step(now)]
+
+
+def start_execution(symbol: str, side: str, amount: float, execution_config: dict, tag=None):
+    """
+    按配置启动执行算法，返回 status=open 的母单回执；配置的算法不存在时返回 None。
+
+    execution_config 示例: {"algo": "twap", "slices": 5, "duration": 60}
+    """
+    params = dict(execution_config)
+    algo_cls = EXECUTION_ALGOS.get(params.pop("algo", None))
+    if algo_cls is None:
+        log(f"❌ 不支持的执行算法: {execution_config}")
+        return None
+    algo = algo_cls(symbol, side, amount, tag=tag, **params)
+    log(f"🧩 {symbol} 启动 {algo.name} 执行算法，母单 {side} 数量 {amount}（ID: {algo.id}）")
+    return algo.start()
+
+
+def resume_execution(algo_id: str) -> bool:
+    """
+    结算上次运行中断的母单：查询保存的每笔子单，仍在挂着的先撤销，再把已成交部分汇总回报给 order_manager
+    （与母单正常结束一样由 process_order_events 入账）。找不到母单状态时返回 False。
+    """
+    state = algo_states.get(algo_id)
+    if state is None:
+        return False
+
+    symbol, exchange = state["symbol"], get_exchange()
+    filled = cost = fee = 0.0
+    for child_id in state["children"]:
+        try:
+            order = exchange.fetch_order(child_id, symbol)
+            if order.get("status") == "open":
+                try:
+                    exchange.cancel_order(child_id, symbol)
+                except Exception as e:
+                    log(f"⚠️ {symbol} 撤销遗留子单 {child_id} 失败: {e}")
+                order = exchange.fetch_order(child_id, symbol)
+        except Exception as e:
+            log(f"⚠️ {symbol} 查询遗留子单 {child_id} 失败: {e}，该子单不计入成交")
+            continue
+        child_filled = order.get("filled") or 0.0
+        if child_filled:
+            filled += child_filled
+            cost += order.get("cost") or child_filled * (order.get("average") or order.get("price"))
+            fee += get_fill_fee(order)
+
+    log(f"🧩 {symbol} 结算中断的母单 {algo_id}：{len(state['children'])} 笔子单，成交 {filled}/{state['amount']}")
+    order_manager.report(
+        symbol, state["side"], state["amount"], filled, cost, fee, "canceled", state["tag"],
+        step_size=get_precision_info(symbol)[0]
+    )
+    algo_states.remove(algo_id)
+    return True
@@ -0,0 +1,296 @@
+# 📁 binance/order_manager.py
+
+import queue
+import threading
+
+from binance.exchange import get_exchange
+from binance.venues import venues
+from config.config import SYMBOL_CONFIGS, TRADE_FEE_RATE, ORDER_POLL_INTERVAL
+from config.logger import log
+from config import clock as clock_module
+
+
+def get_fill_fee(order, fee_rate=None):
+    """
+    从订单回执中取出以报价币（USDT）计价的手续费。
+    Binance 买单手续费通常以基础币或 BNB 扣除，此时按成交额 * 费率估算。
+    """
+    symbol = order.get("symbol") or ""
+    quote = symbol.split("/")[1] if "/" in symbol else "USDT"
+    if fee_rate is None:
+        fee_rate = SYMBOL_CONFIGS.get(symbol, {}).get("fee_rate", TRADE_FEE_RATE)
+
+    fee = order.get("fee") or {}
+    if fee.get("cost") is not None and fee.get("currency") == quote:
+        return fee["cost"]
+    return (order.get("cost") or 0.0) * fee_rate
+
+
+class OrderManager:
+    """
+    订单生命周期管理器：在内存中跟踪所有未完成的限价单。
+
+    - 每轮对每个有挂单的「交易所 × 交易对」调用一次 fetch_open_orders(symbol) 批量轮询
+      （Binance 不带交易对查询全部挂单时 ccxt 默认直接报错，且权重高），只对已离开挂单列表的订单调用 fetch_order 取最终状态
+    - 也可以通过 handle_order_update 直接消费用户数据流（executionReport）推送的订单更新
+    - 每个订单有独立超时；超时后撤单，若允许改价则按最新价重新挂出剩余数量（cancel/replace）
+    - 多次改价的成交量、成交额、手续费累计在同一个跟踪记录上
+    - 订单结束后把汇总成交作为事件放入队列，由主循环 drain_events 取出后更新持仓（避免跨线程改持仓）
+    """
+
+    def __init__(self, exchange=None, poll_interval: float = 2.0, clock=clock_module.now):
+        self._exchange = exchange
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self._tracked = {}            # order_id -> 跟踪记录
+        self._lock = threading.RLock()
+        self._events = queue.Queue()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def exchange(self):
+        """未显式传入交易所时使用全局交易所对象（延迟创建）"""
+        return self._exchange if self._exchange is not None else get_exchange()
+
+    def _client(self, venue):
+        """订单所在交易所的客户端：默认交易所使用 self.exchange，其他交易所从注册表中取"""
+        if venue is None or venue == venues.default:
+            return self.exchange
+        return venues.get(venue)
+
+    # ===================== 注册与事件 =====================
+
+    def track(self, order: dict, symbol: str, side: str, timeout_seconds: float = 20,
+              reprice: bool = False, max_reprices: int = 3, price_offset_pct: float = 0.0, tag=None,
+              venue: str = None):
+        """
+        注册一个已挂出的限价单。
+
+        参数:
+            order (dict): create_order 返回的订单回执
+            symbol (str): 交易对，如 "BTC/USDT"
+            side (str): "BUY" 或 "SELL"
+            timeout_seconds (float): 单次挂单的超时时间（秒）
+            reprice (bool): 超时后是否按最新价改价重挂
+            max_reprices (int): 最多改价次数，用完后直接撤单
+            price_offset_pct (float): 改价时相对最新价的偏移
+            tag: 调用方附带的上下文（如 {"action": "BUY"}），随事件原样返回
+            venue (str): 订单所在交易所（binance/venues.py），None 表示默认交易所
+        """
+        with self._lock:
+            self._tracked[str(order["id"])] = {
+                "order_id": str(order["id"]),
+                "symbol": symbol,
+                "side": side.upper(),
+                "amount": order["amount"],
+                "price": order.get("price"),
+                "filled": 0.0,
+                "cost": 0.0,
+                "fee": 0.0,
+                "created": self._clock(),
+                "timeout": timeout_seconds,
+                "reprices_left": max_reprices if reprice else 0,
+                "price_offset_pct": price_offset_pct,
+                "tag": tag,
+                "venue": venue,
+            }
+
+    def open_orders(self):
+        """返回当前跟踪中的订单 ID 列表"""
+        with self._lock:
+            return list(self._tracked)
+
+    def is_tracking(self, order_id) -> bool:
+        with self._lock:
+            return str(order_id) in self._tracked
+
+    def drain_events(self) -> list:
+        """
+        取出所有已结束订单的汇总事件（由主循环调用）。
+        事件结构: {symbol, side, status, filled, average, cost, fee, tag}
+        """
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    # ===================== 轮询 =====================
+
+    def poll(self):
+        """批量轮询一次：同步成交状态，并处理超时订单"""
+        with self._lock:
+            if not self._tracked:
+                return
+            tracked = dict(self._tracked)
+
+        open_orders = {}
+        for venue, symbol in {(entry["venue"], entry["symbol"]) for entry in tracked.values()}:
+            try:
+                open_orders[venue, symbol] = {str(o["id"]) for o in self._client(venue).fetch_open_orders(symbol)}
+            except Exception as e:
+                log(f"⚠️ 批量查询 {symbol} 挂单失败{f'（{venue}）' if venue else ''}: {e}")
+
+        now = self._clock()
+        for order_id, entry in tracked.items():
+            key = entry["venue"], entry["symbol"]
+            if key not in open_orders:
+                continue
+            if order_id in open_orders[key]:
+                if now - entry["created"] > entry["timeout"]:
+                    self._on_timeout(entry)
+                continue
+
+            # 已不在挂单列表中：成交或被外部撤销，取一次最终状态
+            try:
+                order = self._client(entry["venue"]).fetch_order(order_id, entry["symbol"])
+            except Exception as e:
+                log(f"⚠️ 查询订单 {order_id} 最终状态失败: {e}")
+                continue
+            self.handle_order_update(order)
+
+    def handle_order_update(self, order: dict):
+        """
+        处理一次订单状态更新（轮询结果或用户数据流推送均可）。
+        只在订单进入终态（closed / canceled / expired / rejected）时结算。
+        """
+        order_id = str(order["id"])
+        with self._lock:
+            entry = self._tracked.get(order_id)
+            if entry is None or order.get("status") == "open":
+                return
+            del self._tracked[order_id]
+        self._accumulate(entry, order)
+        self._emit(entry, order.get("status"))
+
+    def _on_timeout(self, entry):
+        """超时处理：撤单，可改价时按最新价重新挂出剩余数量"""
+        order_id, symbol = entry["order_id"], entry["symbol"]
+        exchange = self._client(entry["venue"])
+        try:
+            canceled = exchange.cancel_order(order_id, symbol)
+        except Exception as e:
+            log(f"⚠️ 撤销超时订单 {order_id} 失败: {e}")
+            return
+
+        with self._lock:
+            self._tracked.pop(order_id, None)
+        # 撤单回执里的成交量可能不完整，以 fetch_order 为准
+        try:
+            final = exchange.fetch_order(order_id, symbol)
+        except Exception:
+            final = canceled
+        self._accumulate(entry, final)
+
+        from binance.services import round_to_precision
+
+        # 剩余数量按交易所精度截断，不足一个最小单位或低于最小金额时不再重挂
+        step_size, min_notional = self._precision(entry)
+        remaining = round_to_precision(max(entry["amount"] - entry["filled"], 0.0), step_size)
+        if remaining > 0 and entry["price"] and remaining * entry["price"] < min_notional:
+            log(f"⚠️ {symbol} 剩余数量 {remaining} 低于最小下单金额 {min_notional}，不再改价重挂")
+            remaining = 0
+        if entry["reprices_left"] > 0 and remaining > 0:
+            if self._replace(entry, remaining):
+                return
+        log(f"⏳ {symbol} 限价单超时未完全成交，已撤销订单 ID: {order_id}")
+        self._emit(entry, "canceled")
+
+    def _replace(self, entry, remaining) -> bool:
+        """按最新价重新挂出剩余数量，成功返回 True"""
+        symbol, side = entry["symbol"], entry["side"]
+        exchange = self._client(entry["venue"])
+        try:
+            last = exchange.fetch_ticker(symbol)["last"]
+            offset = entry["price_offset_pct"]
+            price = last * (1 - offset) if side == "BUY" else last * (1 + offset)
+            price = float(exchange.price_to_precision(symbol, price)) \
+                if hasattr(exchange, "price_to_precision") else price
+            order = exchange.create_order(
+                symbol=symbol, type="limit", side=side.lower(), amount=remaining,
+                price=price, params={"timeInForce": "GTC"}
+            )
+        except Exception as e:
+            log(f"⚠️ {symbol} 改价重挂失败: {e}")
+            return False
+
+        entry["order_id"] = str(order["id"])
+        entry["price"] = price
+        entry["created"] = self._clock()
+        entry["reprices_left"] -= 1
+        log(f"🔁 {symbol} 限价单改价重挂 @ {price}，剩余数量 {remaining}")
+
+        if order.get("status") == "open":
+            with self._lock:
+                self._tracked[entry["order_id"]] = entry
+        else:
+            self._accumulate(entry, order)
+            self._emit(entry, order.get("status"))
+        return True
+
+    @staticmethod
+    def _accumulate(entry, order):
+        filled = order.get("filled") or 0.0
+        if not filled:
+            return
+        entry["filled"] += filled
+        entry["cost"] += order.get("cost") or filled * (order.get("average") or order.get("price") or 0.0)
+        entry["fee"] += get_fill_fee(order)
+
+    @staticmethod
+    def _precision(entry):
+        """订单所在交易所的 (step_size, min_notional)"""
+        # binance.services 在导入时依赖本模块的 order_manager，这里延迟导入
+        from binance.services import get_precision_info
+        return get_precision_info(entry["symbol"], entry["venue"])
+
+    def _emit(self, entry, status):
+        self.report(entry["symbol"], entry["side"], entry["amount"], entry["filled"],
+                    entry["cost"], entry["fee"], status, entry["tag"], entry["venue"],
+                    step_size=self._precision(entry)[0])
+
+    def report(self, symbol, side, amount, filled, cost, fee, status, tag=None, venue=None, step_size=0.0):
+        """
+        放入一条汇总成交事件（执行算法等外部组件也通过此方法回报母单成交）。
+        venue 为成交所在的交易所，None 表示默认交易所。
+        成交量与委托量相差不到半个 step_size（精度截断 / 浮点累加误差）时视为完全成交。
+        """
+        self._events.put({
+            "symbol": symbol,
+            "side": side,
+            "status": "closed" if filled >= amount - step_size / 2 else status,
+            "filled": filled,
+            "average": cost / filled if filled else None,
+            "cost": cost,
+            "fee": fee,
+            "tag": tag,
+            "venue": venue,
+        })
+
+    # ===================== 后台线程 =====================
+
+    def start(self):
+        """启动后台轮询线程（守护线程，不阻塞主循环）"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="order-manager", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval * 2)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                log(f"❌ 订单管理线程出错: {e}")
+
+
+# 全局订单管理器（与 exchange 一样以单例方式共享）
+order_manager = OrderManager(poll_interval=ORDER_POLL_INTERVAL)
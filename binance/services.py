@@ -1,40 +1,82 @@
-from binance.exchange import exchange
+from binance.order_manager import order_manager
+from binance.venues import venues
+from config.config import MARKET_CACHE_SIZE
 from config.logger import log
+from data.lru_cache import LRUCache
+from data.order_book import order_books
 from datetime import datetime, timedelta
+from decimal import Decimal
+import math
 
 
-def get_ticker_price(symbol):
+def get_ticker(symbol, venue=None):
+    """
+    获取当前交易对的行情快照（含 last / bid / ask / timestamp 等字段）。
+    venue 为交易所名称（binance/venues.py），None 表示默认交易所。
+    """
+    return venues.get(venue).fetch_ticker(symbol)
+
+
+def get_ticker_price(symbol, venue=None):
     """
     获取当前交易对最新成交价。
     例如 symbol="BTC/USDT"，返回当前市场成交价。
     """
-    ticker = exchange.fetch_ticker(symbol)
+    ticker = get_ticker(symbol, venue)
     return ticker['last']
 
 
-def get_balance(asset):
+def get_best_quote(symbol, side, trading_only=False):
+    """
+    并发拉取所有已注册交易所的报价，返回对该方向最有利的 Quote（BUY 卖一最低 / SELL 买一最高），
+    全部失败时返回 None。trading_only=True 时只比较可下单的交易所。
+    """
+    return venues.best_quote(symbol, side, trading_only=trading_only)
+
+
+def get_balance(asset, venue=None):
     """
     获取账户中指定资产的可用余额。
     例如 asset="USDT" 或 "BTC"
     """
     try:
-        balance = exchange.fetch_balance()
+        balance = venues.get(venue).fetch_balance()
         return balance['free'].get(asset.upper(), 0.0)
     except Exception as e:
         log(f"⚠️ 获取余额失败: {e}")
         return 0.0
 
 
-def get_precision_info(symbol):
+# 交易对精度信息缓存：(交易所, symbol) -> (step_size, min_notional)，按最近使用淘汰
+_precision_cache = LRUCache(MARKET_CACHE_SIZE)
+
+
+def reset_precision_cache(symbol=None):
+    """丢弃某个交易对（None 表示全部）的精度缓存（模拟交易所的精度来自币种配置，配置变化时调用）"""
+    if symbol is None:
+        _precision_cache.clear()
+        return
+    for key in _precision_cache.keys():
+        if key[1] == symbol:
+            _precision_cache.pop(key)
+
+
+def get_precision_info(symbol, venue=None):
     """
     获取交易对的最小下单单位 stepSize 和最小金额 minNotional。
-    用于自动精度适配和合法性校验。
+    用于自动精度适配和合法性校验。结果按交易对缓存（LRU，最多 MARKET_CACHE_SIZE 条）。
     返回: (step_size, min_notional)
     """
+    exchange = venues.get(venue)
+    cached = _precision_cache.get((exchange.name, symbol))
+    if cached is not None:
+        return cached
     try:
-        info = exchange.client().fetch_market(symbol)
+        exchange.load_markets()  # ccxt 会缓存市场信息，只有首次调用才请求接口
+        info = exchange.market(symbol)
         step_size = info['precision']['amount']  # 数量精度（如 0.0001）
         min_notional = info['limits']['cost']['min']  # 最小交易金额（如 10 USDT）
+        _precision_cache.put((exchange.name, symbol), (step_size, min_notional))
         return step_size, min_notional
     except Exception as e:
         log(f"⚠️ 获取精度失败: {e}")
@@ -46,11 +88,20 @@ def round_to_precision(value, precision):
     将数量 value 按照最小精度 precision 进行截断处理。
     如 value=0.00357, precision=0.001 -> 返回 0.003
     """
-    factor = 1 / precision
-    return int(value * factor) / factor
+    # 先除再加微小容差，避免 0.001 / 0.00001 = 99.999... 这类浮点误差导致多截掉一个最小单位
+    steps = math.floor(value / precision + 1e-9)
+    decimals = max(0, -Decimal(str(precision)).normalize().as_tuple().exponent)
+    return round(steps * precision, decimals)
+
+
+def get_order(order_id, symbol, venue=None):
+    """
+    查询单个订单的最新状态（ccxt 统一订单结构）。
+    """
+    return venues.get(venue).fetch_order(order_id, symbol)
 
 
-def cancel_order_if_timeout(symbol, order_id, timeout_seconds=20):
+def cancel_order_if_timeout(symbol, order_id, timeout_seconds=20, venue=None):
     """
     如果限价单在指定时间内未成交，则自动撤销。
     适用于挂单策略，防止长时间不成交导致持仓紊乱。
@@ -59,9 +110,11 @@ def cancel_order_if_timeout(symbol, order_id, timeout_seconds=20):
         symbol (str): 交易对
         order_id (str): Binance 返回的订单ID
         timeout_seconds (int): 超时时间（秒）
+        venue (str): 交易所名称，None 表示默认交易所
     """
+    exchange = venues.get(venue)
     try:
-        order_info = exchange.fetch_order(order_id, symbol.replace("/", ""))
+        order_info = exchange.fetch_order(order_id, symbol)
         create_time = datetime.fromtimestamp(order_info['timestamp'] / 1000)
         now = datetime.now()
 
@@ -70,21 +123,59 @@ def cancel_order_if_timeout(symbol, order_id, timeout_seconds=20):
             return
 
         if (now - create_time) > timedelta(seconds=timeout_seconds):
-            exchange.cancel_order(order_id, symbol.replace("/", ""))
+            exchange.cancel_order(order_id, symbol)
             log(f"⏳ 超时未成交，已撤销订单 ID: {order_id}")
 
     except Exception as e:
         log(f"⚠️ 检查或撤销订单失败: {e}")
 
 
-def place_order(symbol: str, side: str, quantity: float, order_type: str = "MARKET", price_offset_pct: float = 0.005):
+def get_price_tick(symbol, venue=None):
+    """
+    获取交易对的价格最小变动单位 tickSize，用于限价单价格截断。
+    """
+    try:
+        exchange = venues.get(venue)
+        exchange.load_markets()
+        return exchange.market(symbol)['precision']['price']
+    except Exception as e:
+        log(f"⚠️ 获取价格精度失败: {e}")
+        return None
+
+
+def check_slippage(symbol, side, quantity, max_slippage_pct):
+    """
+    按本地维护的盘口（data/order_book.py）预估市价单滑点，深度不足或滑点超限时返回 False。
+    本地盘口未同步 / 已过期时无法判断，放行。
+    """
+    estimate = order_books.estimate_fill(symbol, side, quantity)
+    if estimate is None:
+        log(f"⚠️ {symbol} 本地盘口不可用，跳过滑点检查")
+        return True
+
+    average, fillable, slippage = estimate
+    if fillable < quantity:
+        log(f"❌ {symbol} [{side}] 本地盘口深度不足：可成交 {fillable}，需要 {quantity}")
+        return False
+    if slippage > max_slippage_pct:
+        log(f"❌ {symbol} [{side}] 预估滑点 {slippage:.3%} 超过上限 {max_slippage_pct:.3%}（预估均价 {average}）")
+        return False
+    return True
+
+
+def place_order(symbol: str, side: str, quantity: float, order_type: str = "MARKET", price_offset_pct: float = 0.005,
+                price: float = None, timeout_seconds: float = 20, reprice: bool = False, max_reprices: int = 3,
+                params: dict = None, tag=None, max_slippage_pct: float = None, venue: str = None,
+                market_price: float = None):
     """
     自动处理下单逻辑，包括：
-    - 获取最新市场价
+    - 获取最新市场价（只在需要时请求：买入估算成本、限价单按偏移定价；调用方已有价格时直接使用）
     - 判断余额是否足够
     - 自动调整下单精度（防止失败）
     - 支持市价单或限价单（默认市价）
-    - 限价挂单支持自动撤单（由外部调用 cancel_order_if_timeout）
+    - 限价单未立即成交时自动交给后台订单管理器跟踪，超时撤单或改价重挂
+    - 市价单按本地盘口预估滑点，超过 max_slippage_pct 时拒绝下单（不发网络请求，盘口未同步时跳过）
+    - 可指定下单的交易所；venue="best" 时市价单并发比价，路由到报价最优的可下单交易所
 
     参数：
         symbol (str): 交易对，如 "BTC/USDT"
@@ -92,57 +183,105 @@ def place_order(symbol: str, side: str, quantity: float, order_type: str = "MARK
         quantity (float): 下单数量（基础币）
         order_type (str): "MARKET" 或 "LIMIT"
         price_offset_pct (float): 限价挂单时的偏移百分比，例如 0.005 表示 ±0.5%
+        price (float): 指定限价单价格（为 None 时按最新价 + 偏移计算）
+        timeout_seconds (float): 限价单超时时间（秒）
+        reprice (bool): 限价单超时后是否改价重挂
+        max_reprices (int): 最多改价次数
+        params (dict): 透传给交易所的额外参数（如 {"postOnly": True}）
+        tag: 随订单完成事件返回的上下文，见 OrderManager.drain_events
+        max_slippage_pct (float): 市价单允许的最大预估滑点（相对中间价），None 表示不检查
+            （本地盘口只维护默认交易所，其他交易所不检查）
+        venue (str): 交易所名称（binance/venues.py），None 表示默认交易所，"best" 表示市价单按最优报价路由
+        market_price (float): 调用方已有的默认交易所最新价（如本轮策略判断用的价格），传入时不再请求行情
 
     返回：
-        dict or None: Binance 订单回执，失败返回 None
+        dict or None: Binance 订单回执，失败返回 None；回执中附加 "venue" 字段（实际下单的交易所名称）
     """
     base, quote = symbol.upper().split("/")
-    market_price = get_ticker_price(symbol)
-    step_size, min_notional = get_precision_info(symbol)
+    best = None
+    if venue == "best":
+        # 只有市价单按最优报价路由；限价单在默认交易所挂出（重启后可按币种配置找回挂单）
+        best = get_best_quote(symbol, side, trading_only=True) if order_type.upper() == "MARKET" else None
+        venue = best.venue if best else None
+    try:
+        exchange = venues.get(venue)
+    except KeyError as e:
+        log(f"❌ 下单失败: {e.args[0]}")
+        return None
+
+    # 比价时已拿到目标交易所的报价，调用方的价格只对默认交易所有效，其余情况按需请求一次行情
+    if best is not None:
+        market_price = best.ask if side.upper() == "BUY" else best.bid
+    elif exchange.name != venues.default:
+        market_price = None
+    if market_price is None and price is None and (side.upper() == "BUY" or order_type.upper() == "LIMIT"):
+        market_price = get_ticker_price(symbol, exchange.name)
+    step_size, min_notional = get_precision_info(symbol, exchange.name)
 
     quantity = round_to_precision(quantity, step_size)
 
     if side.upper() == "BUY":
-        cost_estimate = market_price * quantity * 1.01
-        quote_balance = get_balance(quote)
+        cost_estimate = (price or market_price) * quantity * 1.01
+        quote_balance = get_balance(quote, exchange.name)
         if quote_balance < cost_estimate:
             log(f"❌ BUY 失败，{quote} 余额不足：需 {cost_estimate:.2f}，现有 {quote_balance:.2f}")
             return None
 
     elif side.upper() == "SELL":
-        base_balance = get_balance(base)
+        base_balance = get_balance(base, exchange.name)
         if base_balance < quantity:
             log(f"❌ SELL 失败，{base} 余额不足：需 {quantity}，现有 {base_balance}")
             return None
 
+    if order_type.upper() == "MARKET" and max_slippage_pct is not None and exchange.name == venues.default:
+        if not check_slippage(symbol, side, quantity, max_slippage_pct):
+            return None
+
     try:
         if order_type.upper() == "MARKET":
             order = exchange.create_order(
-                symbol=symbol.replace("/", ""),
+                symbol=symbol,
                 type="market",
                 side=side.lower(),
                 amount=quantity
             )
         elif order_type.upper() == "LIMIT":
-            if side.upper() == "BUY":
+            if price is not None:
+                limit_price = price
+            elif side.upper() == "BUY":
                 limit_price = market_price * (1 - price_offset_pct)
             else:
                 limit_price = market_price * (1 + price_offset_pct)
-            limit_price = round(limit_price, 2)
+            price_tick = get_price_tick(symbol, exchange.name)
+            if price_tick:
+                limit_price = round_to_precision(limit_price, price_tick)
             order = exchange.create_order(
-                symbol=symbol.replace("/", ""),
+                symbol=symbol,
                 type="limit",
                 side=side.lower(),
                 amount=quantity,
                 price=limit_price,
-                params={"timeInForce": "GTC"}
+                params={"timeInForce": "GTC", **(params or {})}
             )
-            log(f"⏳ 已挂限价单，价格: {limit_price}，等待成交... 可调用 cancel_order_if_timeout 设定超时撤单。")
+            if order.get("status") == "open":
+                order_manager.track(
+                    order, symbol, side,
+                    timeout_seconds=timeout_seconds,
+                    reprice=reprice,
+                    max_reprices=max_reprices,
+                    price_offset_pct=price_offset_pct,
+                    tag=tag,
+                    venue=exchange.name
+                )
+                log(f"⏳ 已挂限价单，价格: {limit_price}，由订单管理器跟踪（超时 {timeout_seconds}s）")
         else:
             log(f"❌ 不支持的订单类型: {order_type}")
             return None
 
-        log(f"✅ 成功下单 {symbol} [{side}] 数量: {quantity}")
+        # 持仓记录开仓交易所，卖出 / 止损回到同一个交易所
+        order["venue"] = exchange.name
+        where = "" if exchange.name == venues.default else f"（{exchange.name}）"
+        log(f"✅ 成功下单 {symbol} [{side}] 数量: {quantity}{where}")
         return order
 
     except Exception as e:
@@ -0,0 +1,531 @@
+# 📁 binance/simulator.py
+
+import collections
+import functools
+import itertools
+import json
+import os
+import threading
+
+from config.config import SYMBOL_CONFIGS, TRADE_FEE_RATE
+from config import clock as clock_module
+
+# 本地保存的 K 线数量上限（无外部行情源时使用）
+MAX_LOCAL_CANDLES = 1000
+
+# 保留的已结束订单（成交 / 撤销 / 拒绝）和成交记录数量上限，更早的记录被淘汰，长时间运行内存不增长
+MAX_CLOSED_ORDERS = 1000
+MAX_TRADES = 10000
+
+
+def timeframe_to_ms(timeframe: str) -> int:
+    """
+    将 ccxt 风格的周期字符串转换为毫秒，如 "1m" -> 60000，"4h" -> 14400000。
+    """
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    return int(timeframe[:-1]) * units[timeframe[-1]] * 1000
+
+
+def load_balances(path: str, default: dict) -> dict:
+    """读取上次运行保存的模拟账户余额，文件不存在或无法解析时返回 default 的副本"""
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                return {asset: float(amount) for asset, amount in json.load(f).items()}
+        except (OSError, ValueError, AttributeError):
+            pass
+    return dict(default)
+
+
+def _order_not_found(message: str):
+    """与真实交易所一致抛出 ccxt.OrderNotFound，调用方可以用同一个 except 处理（ccxt 导入较慢，只在出错时导入）"""
+    from ccxt.base.errors import OrderNotFound
+    return OrderNotFound(message)
+
+
+def _synchronized(method):
+    """撮合状态会被主循环和后台订单线程同时访问，公开接口统一加锁（行情请求和模拟延迟除外，见 create_order）"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class SimulatedExchange:
+    """
+    本地模拟交易所（纸面交易撮合引擎），实现本项目用到的 ccxt 接口子集：
+    - 行情：fetch_ticker / fetch_ohlcv / fetch_order_book / load_markets / market
+    - 账户：fetch_balance / fetch_my_trades
+    - 订单：create_order / fetch_order / fetch_open_orders / cancel_order
+
+    撮合规则：
+    - 市价单按合成盘口逐档吃单，产生真实滑点；深度不足时部分成交，剩余部分撤销
+    - 限价单若可立即成交则按 taker 吃单，剩余挂单；之后由 K 线（low/high 穿越）或最新价驱动按 maker 成交
+    - postOnly 限价单若会立即成交则直接拒绝
+    - 手续费：taker 使用 fee_rate，maker 使用 maker_fee_rate（未配置时同 fee_rate）
+    - 每次下单/撤单前注入 latency_ms 延迟，期间行情可能变化
+
+    data_source 为真实 ccxt 交易所对象时，行情从该对象透传（纸面交易）；
+    为 None 时完全离线，行情通过 feed_candle 推入（回测 / 本地替身）。
+
+    挂单始终保留；已结束的订单只保留最近 max_closed_orders 笔，成交记录只保留最近 max_trades 条。
+
+    传入 balance_file 时每次成交后把各资产余额（可用 + 冻结）写入该文件，下次启动用 load_balances() 读回，
+    重启后已有持仓对应的基础币余额仍在（挂单不保存，冻结资金按可用余额恢复）。
+    """
+
+    def __init__(
+        self,
+        data_source=None,
+        balances: dict = None,
+        latency_ms: float = 0,
+        spread_bps: float = 2,
+        book_levels: int = 20,
+        level_step_bps: float = 1,
+        level_notional: float = 5000,
+        sleep=clock_module.sleep,
+        max_closed_orders: int = MAX_CLOSED_ORDERS,
+        max_trades: int = MAX_TRADES,
+        clock=clock_module.now,
+        balance_file: str = None,
+    ):
+        self.data_source = data_source
+        self.latency_ms = latency_ms
+        self.spread_bps = spread_bps
+        self.book_levels = book_levels
+        self.level_step_bps = level_step_bps
+        self.level_notional = level_notional
+        self._sleep = sleep
+        self._clock = clock
+        self.balance_file = balance_file
+
+        self._free = dict(balances or {"USDT": 10000})
+        self._used = {}
+        self._last_price = {}
+        self._candles = {}
+        self._orders = {}
+        self._open_ids = []
+        self._closed_ids = collections.deque()
+        self._trades = collections.deque(maxlen=max_trades)
+        self.max_closed_orders = max_closed_orders
+        self._markets = None
+        self._order_ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    # ===================== 行情接口 =====================
+
+    @_synchronized
+    def load_markets(self, reload=False):
+        if self._markets is None or reload:
+            self._markets = {}
+            for symbol, config in list(SYMBOL_CONFIGS.items()):
+                base, quote = symbol.split("/")
+                self._markets[symbol] = {
+                    "id": base + quote,
+                    "symbol": symbol,
+                    "base": base,
+                    "quote": quote,
+                    "precision": {
+                        "amount": config.get("amount_step", 0.00001),
+                        "price": config.get("price_tick", 0.00001),
+                    },
+                    "limits": {"cost": {"min": config.get("min_notional", 5)}},
+                }
+        return self._markets
+
+    @_synchronized
+    def market(self, symbol):
+        return self.load_markets()[self._normalize(symbol)]
+
+    def fetch_ticker(self, symbol):
+        symbol = self._normalize(symbol)
+        if self.data_source is not None:
+            # 行情请求不持锁，只在驱动撮合时加锁
+            ticker = self.data_source.fetch_ticker(symbol)
+            with self._lock:
+                self._on_price(symbol, ticker["last"])
+            return ticker
+
+        with self._lock:
+            last = self._require_price(symbol)
+            bid, ask = self._best_quotes(last)
+            now = self._now_ms()
+        return {"symbol": symbol, "timestamp": now, "last": last, "close": last, "bid": bid, "ask": ask}
+
+    def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None, params=None):
+        symbol = self._normalize(symbol)
+        if self.data_source is not None:
+            kwargs = {"timeframe": timeframe, "limit": limit}
+            if since is not None:
+                kwargs["since"] = since
+            candles = self.data_source.fetch_ohlcv(symbol, **kwargs)
+            with self._lock:
+                self._match_candles(symbol, candles)
+                if candles:
+                    self._on_price(symbol, candles[-1][4])
+            return candles
+
+        with self._lock:
+            candles = self._candles.get(symbol, [])
+            if since is not None:
+                candles = [c for c in candles if c[0] >= since]
+            return [list(c) for c in (candles[-limit:] if limit else candles)]
+
+    @_synchronized
+    def fetch_order_book(self, symbol, limit=None):
+        symbol = self._normalize(symbol)
+        last = self._require_price(symbol)
+        bids, asks = self._synthetic_book(last, limit or self.book_levels)
+        return {"symbol": symbol, "timestamp": self._now_ms(), "bids": bids, "asks": asks}
+
+    @_synchronized
+    def feed_candle(self, symbol, candle):
+        """
+        离线模式下推入一根 K 线 [timestamp, open, high, low, close, volume]，
+        同一 timestamp 的 K 线会覆盖（未收盘 K 线的更新）。推入后驱动挂单撮合。
+        """
+        symbol = self._normalize(symbol)
+        candles = self._candles.setdefault(symbol, [])
+        if candles and candles[-1][0] == candle[0]:
+            candles[-1] = list(candle)
+        else:
+            candles.append(list(candle))
+            if len(candles) > MAX_LOCAL_CANDLES:
+                del candles[: len(candles) - MAX_LOCAL_CANDLES]
+        self._match_candles(symbol, [candle])
+        self._on_price(symbol, candle[4])
+
+    # ===================== 账户接口 =====================
+
+    @_synchronized
+    def fetch_balance(self, params=None):
+        assets = set(self._free) | set(self._used)
+        free = {a: self._free.get(a, 0.0) for a in assets}
+        used = {a: self._used.get(a, 0.0) for a in assets}
+        total = {a: free[a] + used[a] for a in assets}
+        return {"free": free, "used": used, "total": total}
+
+    @_synchronized
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params=None):
+        trades = list(self._trades)
+        if symbol is not None:
+            symbol = self._normalize(symbol)
+            trades = [t for t in trades if t["symbol"] == symbol]
+        if since is not None:
+            trades = [t for t in trades if t["timestamp"] >= since]
+        from_id = (params or {}).get("fromId")
+        if from_id is not None:
+            trades = [t for t in trades if int(t["id"]) >= int(from_id)]
+        trades = trades[:limit] if limit else trades
+        return [dict(t) for t in trades]
+
+    # ===================== 订单接口 =====================
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        params = params or {}
+        symbol = self._normalize(symbol)
+        # 模拟延迟和刷新行情都在加锁之前，不阻塞其他线程查询 / 撤单
+        self._inject_latency()
+
+        # 纸面交易模式下，延迟期间行情可能已经变化
+        if self.data_source is not None:
+            self.fetch_ticker(symbol)
+        with self._lock:
+            return self._place_order(symbol, type, side, amount, price, params)
+
+    def _place_order(self, symbol, type, side, amount, price, params):
+        """create_order 的撮合部分（调用方持锁）"""
+        last = self._require_price(symbol)
+
+        order = self._new_order(symbol, type, side, amount, price)
+        if type == "market":
+            if not self._reserve(order, last):
+                return self._reject(order, "insufficient balance")
+            self._take(order, limit_price=None)
+            # 市价单深度不足时剩余部分直接撤销（IOC 语义）
+            self._close_or_cancel(order)
+            return self._public(order)
+
+        if type != "limit" or price is None:
+            return self._reject(order, f"unsupported order type: {type}")
+
+        bid, ask = self._best_quotes(last)
+        marketable = price >= ask if side == "buy" else price <= bid
+        post_only = params.get("postOnly") or params.get("timeInForce") in ("GTX", "PO")
+        if marketable and post_only:
+            return self._reject(order, "post-only order would take liquidity")
+
+        if not self._reserve(order, price):
+            return self._reject(order, "insufficient balance")
+
+        if marketable:
+            self._take(order, limit_price=price)
+
+        if order["remaining"] <= 0 or params.get("timeInForce") == "IOC":
+            self._close_or_cancel(order)
+        else:
+            self._open_ids.append(order["id"])
+        return self._public(order)
+
+    @_synchronized
+    def fetch_order(self, id, symbol=None, params=None):
+        order = self._orders.get(str(id))
+        if order is None:
+            raise _order_not_found(f"order not found: {id}")
+        return self._public(order)
+
+    @_synchronized
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        symbol = self._normalize(symbol) if symbol else None
+        orders = [self._orders[i] for i in self._open_ids]
+        return [self._public(o) for o in orders if symbol is None or o["symbol"] == symbol]
+
+    def cancel_order(self, id, symbol=None, params=None):
+        self._inject_latency()
+        with self._lock:
+            order = self._orders.get(str(id))
+            if order is None or order["status"] != "open":
+                raise _order_not_found(f"order not open: {id}")
+            self._open_ids.remove(order["id"])
+            self._release(order)
+            order["status"] = "canceled"
+            self._retire(order)
+            return self._public(order)
+
+    # ===================== 撮合内部实现 =====================
+
+    def _match_candles(self, symbol, candles):
+        """用 K 线的最高/最低价驱动挂单（maker）成交"""
+        for order_id in list(self._open_ids):
+            order = self._orders[order_id]
+            if order["symbol"] != symbol:
+                continue
+            for candle in candles:
+                # 只使用挂单之后开盘的 K 线，避免用挂单前的价格成交
+                if candle[0] < order["timestamp"]:
+                    continue
+                high, low = candle[2], candle[3]
+                if (order["side"] == "buy" and low <= order["price"]) or (
+                    order["side"] == "sell" and high >= order["price"]
+                ):
+                    self._fill(order, order["price"], order["remaining"], maker=True)
+                    self._close_or_cancel(order)
+                    break
+
+    def _on_price(self, symbol, price):
+        """记录最新价，并用最新价穿越驱动挂单成交"""
+        self._last_price[symbol] = price
+        for order_id in list(self._open_ids):
+            order = self._orders[order_id]
+            if order["symbol"] != symbol:
+                continue
+            if (order["side"] == "buy" and price <= order["price"]) or (
+                order["side"] == "sell" and price >= order["price"]
+            ):
+                self._fill(order, order["price"], order["remaining"], maker=True)
+                self._close_or_cancel(order)
+
+    def _take(self, order, limit_price):
+        """按合成盘口逐档吃单（taker），limit_price 为 None 时不限价"""
+        last = self._last_price[order["symbol"]]
+        bids, asks = self._synthetic_book(last, self.book_levels)
+        levels = asks if order["side"] == "buy" else bids
+        for level_price, level_size in levels:
+            if order["remaining"] <= 0:
+                break
+            if limit_price is not None:
+                if order["side"] == "buy" and level_price > limit_price:
+                    break
+                if order["side"] == "sell" and level_price < limit_price:
+                    break
+            qty = min(level_size, order["remaining"])
+            if order["side"] == "buy" and order["type"] == "market":
+                # 市价买单的资金上限为预留金额
+                affordable = self._order_reserved(order) / (level_price * (1 + self._fee_rate(order, False)))
+                qty = min(qty, affordable)
+                if qty <= 0:
+                    break
+            self._fill(order, level_price, qty, maker=False)
+
+    def _fill(self, order, price, qty, maker):
+        symbol = order["symbol"]
+        base, quote = symbol.split("/")
+        cost = price * qty
+        rate = self._fee_rate(order, maker)
+        fee = cost * rate
+
+        if order["side"] == "buy":
+            self._used[quote] = self._used.get(quote, 0.0) - (cost + fee)
+            order["_reserved"] -= cost + fee
+            self._free[base] = self._free.get(base, 0.0) + qty
+        else:
+            self._used[base] = self._used.get(base, 0.0) - qty
+            order["_reserved"] -= qty
+            self._free[quote] = self._free.get(quote, 0.0) + cost - fee
+
+        order["filled"] += qty
+        order["remaining"] = max(order["amount"] - order["filled"], 0.0)
+        order["cost"] += cost
+        order["average"] = order["cost"] / order["filled"]
+        order["fee"]["cost"] += fee
+        order["fee"]["rate"] = rate
+
+        trade = {
+            "id": str(next(self._trade_ids)),
+            "order": order["id"],
+            "timestamp": self._now_ms(),
+            "symbol": symbol,
+            "side": order["side"],
+            "type": order["type"],
+            "takerOrMaker": "maker" if maker else "taker",
+            "price": price,
+            "amount": qty,
+            "cost": cost,
+            "fee": {"cost": fee, "currency": quote, "rate": rate},
+        }
+        self._trades.append(trade)
+        order["trades"].append(trade)
+        self._save_balances()
+
+    def _save_balances(self):
+        if not self.balance_file:
+            return
+        assets = set(self._free) | set(self._used)
+        totals = {a: self._free.get(a, 0.0) + self._used.get(a, 0.0) for a in sorted(assets)}
+        try:
+            tmp_file = self.balance_file + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(totals, f)
+            os.replace(tmp_file, self.balance_file)
+        except OSError:
+            pass
+
+    def _close_or_cancel(self, order):
+        if order["id"] in self._open_ids:
+            self._open_ids.remove(order["id"])
+        order["status"] = "closed" if order["remaining"] <= 0 else "canceled"
+        self._retire(order)
+        self._release(order)
+
+    def _reserve(self, order, price):
+        """下单时冻结资金：买单冻结报价币（含手续费），卖单冻结基础币"""
+        base, quote = order["symbol"].split("/")
+        if order["side"] == "buy":
+            asset = quote
+            need = price * order["amount"] * (1 + self._fee_rate(order, False))
+        else:
+            asset, need = base, order["amount"]
+
+        free = self._free.get(asset, 0.0)
+        if free < need or need <= 0:
+            return False
+        if order["side"] == "buy" and order["type"] == "market":
+            # 市价买单额外预留 5% 作为滑点缓冲，成交后多余部分会退回
+            need = min(need * 1.05, free)
+        self._free[asset] -= need
+        self._used[asset] = self._used.get(asset, 0.0) + need
+        order["_reserved"] = need
+        return True
+
+    def _release(self, order):
+        """订单结束后把未用完的冻结资金退回可用余额"""
+        left = order.get("_reserved", 0.0)
+        if left <= 0:
+            return
+        base, quote = order["symbol"].split("/")
+        asset = quote if order["side"] == "buy" else base
+        self._used[asset] = self._used.get(asset, 0.0) - left
+        self._free[asset] = self._free.get(asset, 0.0) + left
+        order["_reserved"] = 0.0
+
+    @staticmethod
+    def _public(order):
+        """返回订单回执副本（去掉内部字段，避免外部修改撮合状态）"""
+        copy = {k: v for k, v in order.items() if not k.startswith("_")}
+        copy["fee"] = dict(order["fee"])
+        copy["trades"] = [dict(t) for t in order["trades"]]
+        return copy
+
+    @staticmethod
+    def _order_reserved(order):
+        return order.get("_reserved", 0.0)
+
+    def _new_order(self, symbol, type, side, amount, price):
+        order_id = str(next(self._order_ids))
+        now = self._now_ms()
+        order = {
+            "id": order_id,
+            "clientOrderId": f"sim-{order_id}",
+            "timestamp": now,
+            "datetime": None,
+            "symbol": symbol,
+            "type": type,
+            "side": side,
+            "price": price,
+            "average": None,
+            "amount": float(amount),
+            "filled": 0.0,
+            "remaining": float(amount),
+            "cost": 0.0,
+            "status": "open",
+            "fee": {"cost": 0.0, "currency": symbol.split("/")[1], "rate": None},
+            "trades": [],
+            "_reserved": 0.0,
+        }
+        self._orders[order_id] = order
+        return order
+
+    def _retire(self, order):
+        """订单结束后进入淘汰队列，超过上限时删除最早结束的订单"""
+        self._closed_ids.append(order["id"])
+        while len(self._closed_ids) > self.max_closed_orders:
+            self._orders.pop(self._closed_ids.popleft(), None)
+
+    def _reject(self, order, reason):
+        order["status"] = "rejected"
+        order["info"] = {"reason": reason}
+        self._retire(order)
+        raise ValueError(f"simulated order rejected: {reason}")
+
+    def _synthetic_book(self, last, levels):
+        """围绕最新价生成合成盘口：固定价差、等距价位、每档固定名义金额"""
+        half_spread = last * self.spread_bps / 2 / 10000
+        step = last * self.level_step_bps / 10000
+        size = self.level_notional / last
+        bids = [[last - half_spread - i * step, size] for i in range(levels)]
+        asks = [[last + half_spread + i * step, size] for i in range(levels)]
+        return bids, asks
+
+    def _best_quotes(self, last):
+        half_spread = last * self.spread_bps / 2 / 10000
+        return last - half_spread, last + half_spread
+
+    def _fee_rate(self, order, maker):
+        config = SYMBOL_CONFIGS.get(order["symbol"], {})
+        taker = config.get("fee_rate", TRADE_FEE_RATE)
+        return config.get("maker_fee_rate", taker) if maker else taker
+
+    def _require_price(self, symbol):
+        if symbol not in self._last_price:
+            if self.data_source is None:
+                raise ValueError(f"no market data for {symbol}")
+            self.fetch_ticker(symbol)
+        return self._last_price[symbol]
+
+    def _normalize(self, symbol):
+        """兼容 "BTCUSDT" 形式的交易对 ID，统一转换为 "BTC/USDT" """
+        if "/" in symbol:
+            return symbol
+        for market in self.load_markets().values():
+            if market["id"] == symbol:
+                return market["symbol"]
+        return symbol
+
+    def _inject_latency(self):
+        if self.latency_ms:
+            self._sleep(self.latency_ms / 1000)
+
+    def _now_ms(self):
+        return int(self._clock() * 1000)
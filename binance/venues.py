@@ -0,0 +1,185 @@
+# 📁 binance/venues.py
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from binance.exchange import get_exchange, create_venue_client
+from config.config import DEFAULT_VENUE, QUOTE_VENUES, TRADING_VENUES, VENUE_QUOTE_TIMEOUT
+from config.logger import log
+
+# 单个交易所的报价快照（latency_ms 为本次请求耗时，便于比较各交易所的响应速度）
+Quote = namedtuple("Quote", "venue symbol bid ask last timestamp latency_ms")
+
+
+class Venue:
+    """
+    交易所适配器：统一使用 ccxt 风格的交易对（"BTC/USDT"）和接口，
+    交易所自身的交易对 ID（如 Binance 的 "BTCUSDT"）只在 market_id() 中转换。
+
+    client 可以是任何实现 ccxt 统一接口的对象：ccxt 客户端、SimulatedExchange，
+    或测试中基于 SimulatedExchange 构造的本地替身。未传入 client 时使用全局交易所对象（延迟创建）。
+    trading=False 表示只读行情（没有 API Key），不参与下单路由。
+    """
+
+    def __init__(self, name: str, client=None, trading: bool = True):
+        self.name = name
+        self._client = client
+        self.trading = trading
+
+    @property
+    def client(self):
+        return self._client if self._client is not None else get_exchange()
+
+    def market_id(self, symbol: str) -> str:
+        """统一交易对 -> 交易所交易对 ID（行情推送订阅等需要原生 ID 的场合使用）"""
+        self.client.load_markets()
+        return self.client.market(symbol)["id"]
+
+    def fetch_quote(self, symbol: str) -> Quote:
+        """最新报价；行情中没有买一 / 卖一时用最新成交价代替"""
+        started = time.perf_counter()
+        ticker = self.client.fetch_ticker(symbol)
+        last = ticker.get("last")
+        return Quote(
+            self.name, symbol, ticker.get("bid") or last, ticker.get("ask") or last, last,
+            ticker.get("timestamp"), (time.perf_counter() - started) * 1000
+        )
+
+    def __getattr__(self, name):
+        # 其余接口（fetch_ticker / create_order / fetch_order / cancel_order / fetch_balance ...）直接透传给 client
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def __repr__(self):
+        return f"Venue({self.name!r}, trading={self.trading})"
+
+
+class VenueRegistry:
+    """
+    交易所注册表：默认交易所（DEFAULT_VENUE）始终存在，对应 binance/exchange.py 中的全局交易所对象；
+    QUOTE_VENUES 中配置的交易所在第一次使用时创建只读的 ccxt 客户端，
+    TRADING_VENUES 中配置的交易所创建可下单的客户端（见 create_venue_client）。
+
+    - fetch_quotes() 在线程池中并发拉取同一交易对在各交易所的报价，单个交易所失败或超时不影响其他交易所
+    - best_quote() 按方向选出最优报价（买入取最低卖一，卖出取最高买一），供策略比价和下单路由使用
+    """
+
+    def __init__(self, default: str = DEFAULT_VENUE, quote_venues: dict = None, trading_venues: dict = None,
+                 timeout: float = VENUE_QUOTE_TIMEOUT):
+        self.default = default
+        self.timeout = timeout
+        self._venues = {default: Venue(default)}
+        # 待创建的交易所：名称 -> (ccxt 交易所 ID, 是否可下单)
+        self._pending = {name: (exchange_id, False) for name, exchange_id in
+                         (QUOTE_VENUES if quote_venues is None else quote_venues).items()}
+        self._pending.update({name: (exchange_id, True) for name, exchange_id in
+                              (TRADING_VENUES if trading_venues is None else trading_venues).items()})
+        self._lock = threading.Lock()
+        self._pool = None
+
+    # ===== 注册 =====
+
+    def register(self, name: str, client, trading: bool = True, default: bool = False) -> Venue:
+        """注册（或替换）一个交易所；default=True 时同时设为默认交易所"""
+        venue = client if isinstance(client, Venue) else Venue(name, client, trading)
+        with self._lock:
+            self._venues[name] = venue
+            self._pending.pop(name, None)
+            if default:
+                self.default = name
+        return venue
+
+    def unregister(self, name: str):
+        if name == self.default:
+            raise ValueError(f"不能移除默认交易所 {name}")
+        with self._lock:
+            self._venues.pop(name, None)
+            self._pending.pop(name, None)
+
+    def _load_pending(self):
+        """为 QUOTE_VENUES / TRADING_VENUES 中的交易所创建客户端（ccxt 导入较慢，延迟到第一次使用）"""
+        if not self._pending:
+            return
+        import ccxt
+        with self._lock:
+            for name, (exchange_id, trading) in list(self._pending.items()):
+                try:
+                    if trading:
+                        client = create_venue_client(name, exchange_id)
+                    else:
+                        client = getattr(ccxt, exchange_id)({"enableRateLimit": True})
+                    self._venues[name] = Venue(name, client, trading=trading)
+                except Exception as e:
+                    log(f"⚠️ 创建交易所 {name}（{exchange_id}）失败: {e}")
+                del self._pending[name]
+
+    def get(self, name: str = None) -> Venue:
+        """按名称取交易所，None 表示默认交易所；未注册时抛出 KeyError"""
+        if name is None:
+            name = self.default
+        venue = self._venues.get(name)
+        if venue is None:
+            self._load_pending()
+            venue = self._venues.get(name)
+        if venue is None:
+            raise KeyError(f"未注册的交易所: {name}")
+        return venue
+
+    def names(self, trading_only: bool = False) -> list:
+        self._load_pending()
+        return [name for name, venue in self._venues.items() if venue.trading or not trading_only]
+
+    # ===== 比价 =====
+
+    def _executor(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="venue-quote")
+        return self._pool
+
+    def fetch_quotes(self, symbol: str, names: list = None, timeout: float = None) -> dict:
+        """
+        并发拉取各交易所的报价，返回 {交易所名称: Quote}。
+        失败或超过 timeout 秒未返回的交易所记录日志后跳过（超时的请求在后台线程中自然结束）。
+        """
+        venues = [self.get(name) for name in (names or self.names())]
+        if len(venues) == 1:
+            # 只有一个交易所时直接在当前线程请求，没有线程切换开销
+            try:
+                return {venues[0].name: venues[0].fetch_quote(symbol)}
+            except Exception as e:
+                log(f"⚠️ {venues[0].name} 获取 {symbol} 报价失败: {e}")
+                return {}
+
+        futures = {self._executor().submit(venue.fetch_quote, symbol): venue.name for venue in venues}
+        done, not_done = wait(futures, timeout=self.timeout if timeout is None else timeout)
+        quotes = {}
+        for future in done:
+            name = futures[future]
+            try:
+                quotes[name] = future.result()
+            except Exception as e:
+                log(f"⚠️ {name} 获取 {symbol} 报价失败: {e}")
+        for future in not_done:
+            log(f"⚠️ {futures[future]} 获取 {symbol} 报价超时，本次不参与比价")
+        return quotes
+
+    def best_quote(self, symbol: str, side: str, trading_only: bool = False):
+        """
+        各交易所中对该方向最有利的报价：BUY 取卖一最低，SELL 取买一最高。
+        trading_only=True 时只比较可下单的交易所（用于下单路由）。全部失败时返回 None。
+        """
+        quotes = [q for q in self.fetch_quotes(symbol, self.names(trading_only)).values() if q.bid and q.ask]
+        if not quotes:
+            return None
+        if side.upper() == "BUY":
+            return min(quotes, key=lambda q: q.ask)
+        return max(quotes, key=lambda q: q.bid)
+
+
+# 全局交易所注册表（与 exchange 一样以单例方式共享）
+venues = VenueRegistry()
@@ -1,4 +1,31 @@
+import argparse
+
+from core.journal import journal
 from core.strategy_runner import run_loop
 
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="量化交易机器人")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", metavar="PATH", help="录制本次运行的行情和决策到运行日志（如 logs/session.journal）")
+    mode.add_argument("--replay", metavar="PATH", help="全速回放运行日志，并比对决策是否与录制时一致")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    run_loop()
+    args = parse_args()
+
+    max_cycles = None
+    if args.replay:
+        max_cycles = journal.start_replay(args.replay)
+
+    if args.record:
+        journal.start_recording(args.record)
+
+    try:
+        run_loop(max_cycles=max_cycles)
+    finally:
+        mismatched = journal.finish()
+
+    if mismatched:
+        raise SystemExit(1)
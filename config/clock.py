@@ -0,0 +1,62 @@
+# 📁 config/clock.py
+
+import threading
+import time as _time
+
+
+class SystemClock:
+    """真实时钟（默认）"""
+
+    time = staticmethod(_time.time)
+    monotonic = staticmethod(_time.monotonic)
+    sleep = staticmethod(_time.sleep)
+
+
+class ReplayClock:
+    """
+    回放用的模拟时钟：时间由回放日志驱动，sleep 不真正等待，只把时间向前推进，
+    因此回放可以全速运行。
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._now
+
+    monotonic = time
+
+    def sleep(self, seconds: float):
+        with self._lock:
+            self._now += max(seconds, 0.0)
+
+    def set(self, timestamp: float):
+        with self._lock:
+            self._now = timestamp
+
+
+# 全局时钟：各模块通过下面的函数取时间 / 等待，回放时整体替换为 ReplayClock
+_clock = SystemClock()
+
+
+def now() -> float:
+    return _clock.time()
+
+
+def monotonic() -> float:
+    return _clock.monotonic()
+
+
+def sleep(seconds: float):
+    _clock.sleep(seconds)
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    """替换全局时钟（回放 / 测试使用）"""
+    global _clock
+    _clock = clock
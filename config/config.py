@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
 
+from config.symbol_loader import load_symbol_configs
+
 # 加载 .env 文件中的变量
 load_dotenv()
 
@@ -19,101 +21,117 @@ TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 # ======================== 策略参数 ==========================
 
 # 每个币种的完整策略配置（包含买入价、买入数量、止盈比例、止损比例）
-# 每个币种的完整策略配置字典（用于量化策略中参数控制）
-SYMBOL_CONFIGS = {
-    "BTC/USDT": {
-        #  交易参数
-        "buy_price": 84580,            # 买入触发价格（当现价低于此值才考虑买入）
-        "amount": 0.001,               # 买入数量（单位为 BTC）
-        "fee_rate":0.001,              # 手续费  千分之一
-        "take_profit_pct": 0.03,       # 止盈比例（如 0.03 表示盈利3%即卖出）
-        "stop_loss_ratio": 0.98,       # 基础止损比例（作为兜底策略：入场价 * 0.99）
-
-        #  技术指标参数
-        "macd_params": (12, 26, 9),    # MACD 参数（快速EMA周期, 慢速EMA周期, 信号线周期）
-        "kdj_params":(9, 3, 3),        # KDJ 参数（周期, 平滑因子）
-        "atr_window": 14,              # ATR（平均真实波动范围）计算窗口
-
-        #  技术策略判断条件
-        "max_j_buy": 70,               # 当 J < 70 才允许买入（防止高位追涨）
-        "min_j_sell": 90,              # 当 J > 90 时考虑超买卖出
-
-        #  多重止损机制
-        "fixed_stop_loss_pct": 0.02,         # 固定止损（入场价下跌 2% 即止损）
-        "atr_stop_multiplier": 2.0,          # ATR 动态止损系数（止损线 = entry - ATR*系数）
-        "max_drawdown_pct": 0.05,            # 最大浮盈回撤（从最大涨幅回撤 5% 即止损）
-        "trailing_stop_pct": 0.02,           # 移动止损比例（随价格上升而抬升止损线）
-
-        "stop_loss_priority": [              # 各止损方式判断的优先顺序（先匹配先执行）
-            "trailing",      # 移动止损
-            "fixed",         # 固定百分比止损
-            "atr",           # ATR 波动止损
-            "macd",          # MACD 趋势止损
-            "drawdown"       # 最大回撤止损
-        ]
-    },
-
-    "ETH/USDT": {
-        "buy_price": 1600,              # 以太坊的买入价格
-        "amount": 0.02,                 # 买入 0.02 ETH
-        "take_profit_pct": 0.04,        # 盈利 4% 即止盈
-        "stop_loss_ratio": 0.985,       # 兜底止损线：入场价 * 0.985
-
-        "macd_params": (12, 26, 9),
-        "kdj_params":(9, 3, 3),
-        "atr_window": 14,
-
-        "max_j_buy": 65,                # 略微保守，只在 J < 65 时买入
-        "min_j_sell": 85,               # 超买判断更灵敏
-
-        "fixed_stop_loss_pct": 0.025,
-        "atr_stop_multiplier": 2.2,
-        "max_drawdown_pct": 0.06,
-        "trailing_stop_pct": 0.025,
-
-        "stop_loss_priority": [
-            "trailing",
-            "atr",
-            "fixed",
-            "macd",
-            "drawdown"
-        ]
-    },
-
-    "DOGE/USDT": {
-        "buy_price": 0.16,              # 狗狗币的建仓价
-        "amount": 20,                   # 买入 20 个 DOGE
-        "take_profit_pct": 0.05,        # 盈利 5% 即止盈
-        "stop_loss_ratio": 0.98,        # 亏损 2% 止损
-
-        "macd_params": (12, 26, 9),
-        "kdj_params": (9, 3, 3),
-        "atr_window": 14,
-
-        "max_j_buy": 60,                # J < 60 才可买入（防止过热买入）
-        "min_j_sell": 80,               # 超买 J > 80 卖出
-
-        "fixed_stop_loss_pct": 0.03,
-        "atr_stop_multiplier": 2.5,
-        "max_drawdown_pct": 0.08,
-        "trailing_stop_pct": 0.03,
-
-        "stop_loss_priority": [
-            "atr",
-            "trailing",
-            "fixed",
-            "drawdown",
-            "macd"
-        ]
-    }
-}
+# 配置保存在 config/symbols.toml 中（可通过环境变量 SYMBOL_CONFIG_FILE 指定其他文件），
+# 运行中修改会被 SymbolConfigWatcher 热加载，并原地更新下面这个字典
+SYMBOL_CONFIG_FILE = os.getenv(
+    "SYMBOL_CONFIG_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "symbols.toml")
+)
+SYMBOL_CONFIGS = load_symbol_configs(SYMBOL_CONFIG_FILE)
+
 
+# ===================== 调度参数（core/scheduler.py） ========================
+# 策略使用的 K 线周期；每根 K 线收盘后 CANDLE_CLOSE_DELAY 秒所有币种都会检查一次
+STRATEGY_TIMEFRAME = "1m"
+CANDLE_CLOSE_DELAY = 2
 
-# 每轮循环检查行情的时间间隔（单位：秒）
+# 持仓 / 有挂单的币种检查间隔（单位：秒），也是主循环空闲时的最长等待时间
 INTERVAL = 5
 
+# 空仓币种在两次 K 线收盘之间的检查间隔（单位：秒）
+IDLE_INTERVAL = 30
+
+# 价格距止损线不足 NEAR_STOP_PCT（0.5%）时的检查间隔（单位：秒）
+NEAR_STOP_INTERVAL = 1
+NEAR_STOP_PCT = 0.005
+
+# 出错后按 INTERVAL × 2^(n-1) 指数退避的上限（单位：秒）
+MAX_ERROR_BACKOFF = 300
+
+# 后台订单管理器批量轮询挂单的时间间隔（单位：秒）
+ORDER_POLL_INTERVAL = 2
+
 # 是否启用“模拟交易模式”
 DRY_RUN = True
 
 # 交易手续费率（默认 0.1%）
-TRADE_FEE_RATE = 0.001
\ No newline at end of file
+TRADE_FEE_RATE = 0.001
+
+# ===================== 本地盘口（data/order_book.py） ========================
+# 是否订阅 Binance 增量深度推送维护本地盘口（录制 / 回放时不启动，保证可复现）
+ORDER_BOOK_STREAM = True
+DEPTH_STREAM_URL = "wss://stream.binance.com:9443/stream"
+
+# 市价单按本地盘口预估的滑点（相对中间价）超过该比例时拒绝下单；可在币种配置中用 max_slippage_pct 覆盖。
+# 止损单不检查；本地盘口未同步时跳过检查
+MAX_SLIPPAGE_PCT = 0.003
+
+# ===================== 多交易所（binance/venues.py） ========================
+# 全局交易所对象（上面的 Binance 客户端 / 模拟交易所）在交易所注册表中的名称
+DEFAULT_VENUE = "binance"
+
+# 额外的只读行情交易所（名称 -> ccxt 交易所 ID），只参与比价、不下单，如 {"okx": "okx", "bybit": "bybit"}
+QUOTE_VENUES = {}
+
+# 额外的可下单交易所（名称 -> ccxt 交易所 ID），参与比价，也是 venue = "best" 的下单路由候选。
+# API Key / Secret 从环境变量 <名称大写>_API_KEY / <名称大写>_API_SECRET 读取；
+# DRY_RUN 时同样使用本地撮合引擎（行情来自该交易所），模拟余额保存在 sim_balances.<名称>.json
+TRADING_VENUES = {}
+
+# 并发拉取各交易所报价的超时（秒），超时的交易所本次不参与比价
+VENUE_QUOTE_TIMEOUT = 2
+
+# ===================== 启动对账（core/reconciler.py） ========================
+# 启动时按交易所成交记录修正 position.json（模拟交易所每次启动都是新账户，不对账）
+RECONCILE_ON_STARTUP = True
+RECONCILE_WORKERS = 8         # 并发拉取成交 / 挂单的线程数
+RECONCILE_PAGE_SIZE = 1000    # 每次 fetch_my_trades 拉取的成交条数（Binance 上限 1000）
+
+# ===================== 监控（core/metrics.py） ========================
+# Prometheus 指标（/metrics）与健康检查（/healthz）的监听地址；METRICS_PORT 设为 None 表示不启动
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+
+# 主循环超过该秒数没有完成一轮时 /healthz 返回 503
+HEALTH_STALL_SECONDS = 60
+
+# 性能分析（core/profiler.py）：kill -USR1 或 /debug/profile 触发 CPU 采样，kill -USR2 或 /debug/tracemalloc 触发逐轮内存分配跟踪
+PROFILE_DIR = "logs/profiles"
+PROFILE_SECONDS = 30              # 默认 CPU 采样时长（秒）
+PROFILE_SAMPLE_INTERVAL = 0.005   # 采样间隔（秒）
+TRACEMALLOC_CYCLES = 10           # 默认跟踪的主循环轮数
+TRACEMALLOC_TOP = 25              # 每轮输出增长最多的代码行数量
+
+# ===================== 内存上限（长时间运行） ========================
+# 最多缓存多少个「币种@周期」的 K 线窗口和指标历史，超出时淘汰最久未使用的（下次使用时重新全量拉取）
+MAX_CACHED_SYMBOLS = 32
+
+# 交易对精度信息（stepSize / minNotional）的缓存条数
+MARKET_CACHE_SIZE = 256
+
+# ======================== 风控参数 ==========================
+# 每笔开仓前由 core/risk_engine.py 检查，卖出和止损不受限制；设为 None / 0 表示不限制
+RISK_LIMITS = {
+    # 总敞口上限（所有持仓成本 + 挂单中的买入金额，USDT）
+    "max_gross_exposure": 5000,
+    # 单个基础资产的敞口上限（USDT），可在 asset_exposure_limits 中按资产覆盖
+    "max_asset_exposure": 2000,
+    "asset_exposure_limits": {},
+    # 当日已实现净亏损达到该值（USDT）后停止开仓，次日自动恢复
+    "daily_loss_limit": 200,
+    # 连续止损达到次数后熔断，熔断期间停止开仓（秒）
+    "max_consecutive_stop_losses": 3,
+    "circuit_breaker_cooldown": 3600,
+}
+
+# ===================== 模拟交易所（DRY_RUN 时生效） ========================
+# 模拟账户初始余额（首次启动时使用，之后从 SIM_BALANCE_FILE 恢复；删除该文件即重置模拟账户）
+SIM_INITIAL_BALANCES = {"USDT": 10000}
+SIM_BALANCE_FILE = "sim_balances.json"
+
+# 每次下单/撤单注入的网络延迟（毫秒）
+SIM_LATENCY_MS = 50
+
+# 合成盘口参数：买卖价差（基点）、档位数量、每档名义金额（USDT）
+SIM_SPREAD_BPS = 2
+SIM_BOOK_LEVELS = 20
+SIM_LEVEL_NOTIONAL = 5000
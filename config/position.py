@@ -4,76 +4,233 @@ import os
 # 定义保存仓位信息的文件名
 POSITION_FILE = "position.json"
 
-def load_position():
+# 持仓文件格式版本（v1 为旧版的 {symbol: {字段: 值}} 字典格式）
+POSITION_FORMAT_VERSION = 2
+
+_MISSING = object()
+
+
+class Position:
+    """
+    单个币种的持仓记录（使用 __slots__，字段固定，避免自由字典带来的键缺失和额外内存）。
+
+    字段:
+        holding (bool): 是否持仓
+        amount (float): 持仓数量
+        entry_price (float): 入场价
+        trailing_stop_price (float): 当前移动止损位
+        max_price (float): 持仓期间最高价（用于回撤止损）
+        buy_fee (float): 买入手续费（USDT）
+        pending_order (str): 未完成的挂单/母单 ID
+        realized_pnl (float): 本次持仓已部分卖出的累计净盈亏（全部平仓时一次性计入风控）
+        venue (str): 开仓所在的交易所（binance/venues.py），卖出 / 止损在同一个交易所下单；旧记录为 None
+
+    任何字段发生变化都会把记录标记为 dirty，保存时只重新序列化 dirty 的记录。
+    """
+
+    FIELDS = ("holding", "amount", "entry_price", "trailing_stop_price", "max_price", "buy_fee", "pending_order",
+              "realized_pnl", "venue")
+    __slots__ = FIELDS + ("_dirty",)
+
+    def __init__(self, holding=False, amount=None, entry_price=None, trailing_stop_price=None,
+                 max_price=None, buy_fee=None, pending_order=None, realized_pnl=None, venue=None):
+        self.holding = holding
+        self.amount = amount
+        self.entry_price = entry_price
+        self.trailing_stop_price = trailing_stop_price
+        self.max_price = max_price
+        self.buy_fee = buy_fee
+        self.pending_order = pending_order
+        self.realized_pnl = realized_pnl
+        self.venue = venue
+        object.__setattr__(self, "_dirty", True)
+
+    def __setattr__(self, name, value):
+        # 只有值真正改变时才标记 dirty
+        if getattr(self, name, _MISSING) != value:
+            object.__setattr__(self, "_dirty", True)
+        object.__setattr__(self, name, value)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"Position({fields})"
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def mark_clean(self):
+        object.__setattr__(self, "_dirty", False)
+
+    def open(self, price: float, amount: float, fee: float, trailing_pct: float, venue: str = None):
+        """按成交结果建立持仓"""
+        self.holding = True
+        self.amount = amount
+        self.entry_price = price
+        self.trailing_stop_price = price * (1 - trailing_pct)
+        self.max_price = price
+        self.buy_fee = fee
+        self.pending_order = None
+        self.realized_pnl = None
+        self.venue = venue
+
+    def add(self, price: float, amount: float, fee: float):
+        """追加买入成交：按数量加权更新入场价，累加数量和买入手续费"""
+        total = self.amount + amount
+        self.entry_price = (self.entry_price * self.amount + price * amount) / total
+        self.amount = total
+        self.buy_fee = (self.buy_fee or 0.0) + fee
+        self.pending_order = None
+
+    def reset(self):
+        """清空持仓字段（pending_order 由挂单流程单独维护）"""
+        self.holding = False
+        self.amount = None
+        self.entry_price = None
+        self.trailing_stop_price = None
+        self.max_price = None
+        self.buy_fee = None
+        self.realized_pnl = None
+        self.venue = None
+
+    def to_record(self) -> list:
+        """紧凑序列化：按 FIELDS 顺序输出为列表"""
+        return [getattr(self, name) for name in self.FIELDS]
+
+    @classmethod
+    def from_record(cls, record: list, fields=FIELDS) -> "Position":
+        """从紧凑列表恢复（fields 为文件中记录的字段顺序，兼容字段增减）"""
+        values = dict(zip(fields, record))
+        return cls(**{name: values.get(name) for name in cls.FIELDS if name in values})
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Position":
+        """从旧版字典格式恢复，忽略未知键（如旧版写入的 stop_reason）"""
+        return cls(**{name: data.get(name) for name in cls.FIELDS if name in data})
+
+
+class PositionBook(dict):
+    """
+    所有币种的持仓集合：{symbol: Position}。
+
+    记录每条持仓的序列化缓存，保存时只重新序列化发生变化的记录，
+    没有任何变化时不写文件。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._encoded = {}
+        self._removed = False
+
+    def ensure(self, symbol: str) -> Position:
+        """确保币种的持仓记录存在（空仓），并返回该记录"""
+        record = self.get(symbol)
+        if record is None:
+            record = self[symbol] = Position()
+        return record
+
+    def __delitem__(self, symbol):
+        super().__delitem__(symbol)
+        self._encoded.pop(symbol, None)
+        self._removed = True
+
+    @property
+    def dirty(self) -> bool:
+        return self._removed or any(p.dirty or s not in self._encoded for s, p in self.items())
+
+    def encode(self) -> str:
+        """序列化为 JSON 文本，只对 dirty 记录重新编码"""
+        for symbol, record in self.items():
+            if record.dirty or symbol not in self._encoded:
+                self._encoded[symbol] = json.dumps(record.to_record())
+                record.mark_clean()
+        self._removed = False
+
+        body = ",\n".join(f"    {json.dumps(symbol)}: {self._encoded[symbol]}" for symbol in self)
+        return (
+            f'{{\n  "version": {POSITION_FORMAT_VERSION},\n'
+            f'  "fields": {json.dumps(list(Position.FIELDS))},\n'
+            f'  "positions": {{\n{body}\n  }}\n}}\n'
+        )
+
+
+def load_position() -> PositionBook:
     """
     从本地文件加载仓位信息。
-    如果文件存在，则读取其内容并返回一个字典格式的数据；
-    如果文件不存在，则返回一个默认的空仓结构。
-    
+    支持新版紧凑格式（version=2）和旧版 {symbol: {字段: 值}} 字典格式；
+    文件不存在或无法解析时返回空的持仓集合。
+
     返回:
-        dict: 包含持仓状态、入场价、移动止损线和最大价格的字典。
+        PositionBook: {symbol: Position}
     """
-    if os.path.exists(POSITION_FILE):
-        with open(POSITION_FILE, 'r') as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                # 避免读取异常导致程序中断
-                return {
-                    "holding": False,
-                    "entry_price": None,
-                    "trailing_stop_price": None,
-                    "max_price": None
-                }
-
-    # 默认仓位结构（无持仓）
-    return {}
-
-def save_position(position):
+    book = PositionBook()
+    if not os.path.exists(POSITION_FILE):
+        return book
+
+    with open(POSITION_FILE, 'r') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError:
+            # 避免读取异常导致程序中断
+            return book
+
+    if isinstance(data, dict) and "version" in data:
+        fields = data.get("fields", Position.FIELDS)
+        for symbol, record in data.get("positions", {}).items():
+            book[symbol] = Position.from_record(record, fields)
+    else:
+        for symbol, record in data.items():
+            if isinstance(record, dict):
+                book[symbol] = Position.from_dict(record)
+    return book
+
+def save_position(position: PositionBook):
     """
-    将当前仓位信息保存到本地文件。
-    
+    将当前仓位信息保存到本地文件（先写临时文件再替换，避免写到一半崩溃损坏文件）。
+    没有任何记录变化时直接跳过。
+
     参数:
-        position (dict): 包含以下键的字典：
-            - holding: 是否持仓
-            - entry_price: 入场价
-            - trailing_stop_price: 当前移动止损位
-            - max_price: 持仓期间最高价（用于回撤止损）
+        position (PositionBook): 所有币种的持仓集合
     """
-    with open(POSITION_FILE, 'w') as f:
-        json.dump(position, f, indent=4)
+    if not position.dirty:
+        return
+    content = position.encode()
+    tmp_file = POSITION_FILE + ".tmp"
+    with open(tmp_file, 'w') as f:
+        f.write(content)
+    os.replace(tmp_file, POSITION_FILE)
 
-def update_trailing_stop(position: dict, price: float, trailing_pct: float) -> bool:
+def update_trailing_stop(position: Position, price: float, trailing_pct: float) -> bool:
     """
     更新移动止损价格和最大价格。
 
     该函数仅在价格上涨时更新止损线或最大值，并返回是否发生实际变化。
-    
+
     参数:
-        position (dict): 当前币种的持仓字典，需包含 holding、trailing_stop_price、max_price
+        position (Position): 当前币种的持仓记录
         price (float): 当前最新市场价格
         trailing_pct (float): 移动止损百分比（如 0.02 表示 2%）
-    
+
     返回:
         bool: 如果 trailing_stop_price 或 max_price 被更新，返回 True；否则返回 False
     """
-    if not position.get("holding"):
+    if not position.holding:
         return False
 
     updated = False  # 标志是否发生了更新
 
     # 计算新的止损位（随着上涨而上移）
     trailing_stop = price * (1 - trailing_pct)
-    old_stop = position.get("trailing_stop_price")
+    old_stop = position.trailing_stop_price
 
     if old_stop is None or trailing_stop > old_stop:
-        position["trailing_stop_price"] = trailing_stop
+        position.trailing_stop_price = trailing_stop
         updated = True
 
     # 更新最大价格（只允许向上更新）
-    max_price = position.get("max_price")
+    max_price = position.max_price
     if max_price is None or price > max_price:
-        position["max_price"] = price
+        position.max_price = price
         updated = True
 
     return updated
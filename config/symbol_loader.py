@@ -0,0 +1,193 @@
+# 📁 config/symbol_loader.py
+
+import os
+import tomllib
+
+from config.logger import log
+
+_NUMBER = (int, float)
+_STOP_METHODS = {"trailing", "fixed", "atr", "macd", "drawdown"}
+_EXECUTION_ALGOS = {"twap", "iceberg", "chase"}
+
+# 其他模块注册的额外校验 validator(symbol, config)，校验失败抛出 ValueError（见 register_validator）
+_validators = []
+
+# 币种配置字段校验表：字段名 -> (允许的类型, 是否必填)
+SYMBOL_SCHEMA = {
+    # 交易参数
+    "buy_price": (_NUMBER, True),
+    "amount": (_NUMBER, True),
+    "fee_rate": (_NUMBER, False),
+    "maker_fee_rate": (_NUMBER, False),
+    "take_profit_pct": (_NUMBER, False),
+    "stop_loss_ratio": (_NUMBER, False),
+    "min_profit_pct": (_NUMBER, False),
+
+    # 下单方式
+    "order_type": (str, False),
+    "limit_offset_pct": (_NUMBER, False),
+    "limit_timeout": (_NUMBER, False),
+    "limit_reprice": (bool, False),
+    "limit_max_reprices": (int, False),
+    "execution": (dict, False),
+    "max_slippage_pct": (_NUMBER, False),
+    "venue": (str, False),
+
+    # 模拟交易所的市场精度（DRY_RUN）
+    "amount_step": (_NUMBER, False),
+    "price_tick": (_NUMBER, False),
+    "min_notional": (_NUMBER, False),
+
+    # 技术指标参数
+    "macd_params": (list, False),
+    "kdj_params": (list, False),
+    "atr_window": (int, False),
+    "max_j_buy": (_NUMBER, False),
+    "min_j_sell": (_NUMBER, False),
+
+    # 止损参数
+    "fixed_stop_loss_pct": (_NUMBER, False),
+    "atr_stop_multiplier": (_NUMBER, False),
+    "max_drawdown_pct": (_NUMBER, False),
+    "trailing_stop_pct": (_NUMBER, True),
+    "stop_loss_priority": (list, False),
+}
+
+
+def _validate_symbol(symbol: str, config: dict) -> dict:
+    """
+    校验单个币种的配置并做类型归一（指标参数数组转为元组），返回新的配置字典。
+    校验失败抛出 ValueError。
+    """
+    if "/" not in symbol:
+        raise ValueError(f"{symbol}: 交易对格式应为 BASE/QUOTE")
+
+    unknown = set(config) - set(SYMBOL_SCHEMA)
+    if unknown:
+        raise ValueError(f"{symbol}: 未知字段 {sorted(unknown)}")
+
+    for key, (types, required) in SYMBOL_SCHEMA.items():
+        if key not in config:
+            if required:
+                raise ValueError(f"{symbol}: 缺少必填字段 {key}")
+            continue
+        value = config[key]
+        # bool 是 int 的子类，数值字段不接受 true/false
+        if not isinstance(value, types) or (isinstance(value, bool) and types is not bool):
+            raise ValueError(f"{symbol}.{key}: 类型错误 {value!r}")
+
+    result = dict(config)
+    for key in ("macd_params", "kdj_params"):
+        if key in result:
+            params = result[key]
+            if len(params) != 3 or not all(isinstance(p, int) and p > 0 for p in params):
+                raise ValueError(f"{symbol}.{key}: 需要 3 个正整数")
+            result[key] = tuple(params)
+
+    for key in ("buy_price", "amount", "trailing_stop_pct"):
+        if result[key] <= 0:
+            raise ValueError(f"{symbol}.{key}: 必须大于 0")
+
+    priorities = result.get("stop_loss_priority", [])
+    if set(priorities) - _STOP_METHODS:
+        raise ValueError(f"{symbol}.stop_loss_priority: 未知止损方式 {sorted(set(priorities) - _STOP_METHODS)}")
+
+    if result.get("order_type", "MARKET") not in ("MARKET", "LIMIT"):
+        raise ValueError(f"{symbol}.order_type: 只支持 MARKET / LIMIT")
+
+    if "execution" in result and result["execution"].get("algo") not in _EXECUTION_ALGOS:
+        raise ValueError(f"{symbol}.execution.algo: 只支持 {sorted(_EXECUTION_ALGOS)}")
+
+    for validator in _validators:
+        validator(symbol, result)
+
+    return result
+
+
+def register_validator(validator, configs: dict = None):
+    """
+    注册额外的币种配置校验（如执行算法参数，由 binance/execution.py 注册，避免 config 反向导入 binance），
+    之后的加载 / 热加载都会调用；同时立即校验已加载的 configs，失败抛出 ValueError。
+    """
+    _validators.append(validator)
+    for symbol, config in (configs or {}).items():
+        validator(symbol, config)
+
+
+def load_symbol_configs(path: str) -> dict:
+    """
+    读取并校验币种配置文件（TOML），返回 {symbol: config} 字典。
+    文件不存在、解析失败或校验失败均抛出异常。
+    """
+    with open(path, "rb") as f:
+        raw = tomllib.load(f)
+    if not raw:
+        raise ValueError("配置文件中没有任何币种")
+    return {symbol: _validate_symbol(symbol, config) for symbol, config in raw.items()}
+
+
+class SymbolConfigWatcher:
+    """
+    币种配置热加载：按修改时间轮询配置文件，变化时重新解析并校验，
+    校验通过后原地更新 target（即全局 SYMBOL_CONFIGS，保持对象引用不变），
+    只替换参数发生变化的币种，并通知已注册的回调重建这些币种的状态。
+
+    poll() 由主循环在两轮之间调用，因此一次更新对主循环而言是原子的；
+    新配置校验失败时保留旧配置不变。
+    """
+
+    def __init__(self, path: str, target: dict):
+        self.path = path
+        self.target = target
+        self._hooks = []
+        self._stamp = self._file_stamp()
+
+    def register_hook(self, hook):
+        """注册回调 hook(symbol, old_config, new_config)，新增币种 old 为 None，删除币种 new 为 None"""
+        self._hooks.append(hook)
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def poll(self) -> set:
+        """检查文件是否变化并应用，返回参数发生变化（含新增/删除）的币种集合"""
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return set()
+        self._stamp = stamp
+
+        try:
+            new_configs = load_symbol_configs(self.path)
+        except Exception as e:
+            log(f"⚠️ 币种配置热加载失败，继续使用旧配置: {e}")
+            return set()
+        return self.apply(new_configs)
+
+    def apply(self, new_configs: dict) -> set:
+        """应用一份已校验的完整配置（poll 读取文件后调用，回放时直接传入录制的配置），返回变化的币种集合"""
+        changed = {
+            symbol for symbol in set(self.target) | set(new_configs)
+            if self.target.get(symbol) != new_configs.get(symbol)
+        }
+        if not changed:
+            return set()
+
+        old_configs = {symbol: self.target.get(symbol) for symbol in changed}
+        for symbol in changed:
+            if symbol in new_configs:
+                self.target[symbol] = new_configs[symbol]
+            else:
+                del self.target[symbol]
+
+        log(f"🔄 币种配置已热加载，变化的币种: {', '.join(sorted(changed))}")
+        for symbol in changed:
+            for hook in self._hooks:
+                try:
+                    hook(symbol, old_configs[symbol], new_configs.get(symbol))
+                except Exception as e:
+                    log(f"⚠️ 配置变更回调执行失败 {symbol}: {e}")
+        return changed
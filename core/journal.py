@@ -0,0 +1,401 @@
+# 📁 core/journal.py
+
+import gzip
+import json
+import os
+import struct
+import threading
+from collections import defaultdict, deque
+
+from config import clock as clock_module
+from config.clock import ReplayClock
+from config.config import SYMBOL_CONFIGS, DRY_RUN, SIM_SPREAD_BPS, SIM_BOOK_LEVELS, SIM_LEVEL_NOTIONAL
+from config.logger import log
+
+# 日志格式版本
+JOURNAL_VERSION = 1
+
+# 需要录制的行情接口（下单 / 查单等账户接口不录制，回放时由本地撮合引擎重新执行）
+RECORDED_METHODS = ("fetch_ticker", "fetch_ohlcv", "fetch_order_book")
+
+# 影响撮合结果、需要记录到日志中的本地撮合引擎参数
+SIMULATOR_PARAMS = ("spread_bps", "book_levels", "level_step_bps", "level_notional")
+
+_HEADER = struct.Struct(">I")
+
+
+class ReplayError(Exception):
+    """回放失败：日志中没有对应的行情，或录制时该请求本身就失败了"""
+
+
+# ===================== 日志文件读写 =====================
+
+class JournalWriter:
+    """
+    运行日志写入器：gzip 压缩流中依次写入帧，每帧为 4 字节长度 + 紧凑 JSON。
+    每轮结束时 flush，进程崩溃最多丢失当前一轮。可被多个线程同时调用。
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._file = gzip.open(path, "wb")
+        self._lock = threading.Lock()
+
+    def write(self, frame: dict):
+        payload = json.dumps(frame, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+        with self._lock:
+            self._file.write(_HEADER.pack(len(payload)))
+            self._file.write(payload)
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_journal(path: str):
+    """依次读出日志中的所有帧；文件末尾因崩溃被截断时读到最后一个完整帧为止"""
+    with gzip.open(path, "rb") as f:
+        while True:
+            try:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return
+                (length,) = _HEADER.unpack(header)
+                payload = f.read(length)
+            except EOFError:
+                return
+            if len(payload) < length:
+                return
+            yield json.loads(payload)
+
+
+def _request_key(method: str, args, kwargs) -> str:
+    return json.dumps([method, list(args), kwargs], sort_keys=True, default=str)
+
+
+def _list_delta(previous, result):
+    """
+    相邻两次 K 线请求大部分数据相同：找到本次第一根 K 线在上次结果中的位置 offset，
+    以及从该位置起完全相同的行数 k，只保存剩余的新行。无法增量表示时返回 None。
+    """
+    if not isinstance(previous, list) or not isinstance(result, list) or not previous or not result:
+        return None
+    first = result[0]
+    offset = next((i for i, row in enumerate(previous) if row[:1] == first[:1]), None)
+    if offset is None:
+        return None
+    k = 0
+    while k < len(result) and offset + k < len(previous) and result[k] == previous[offset + k]:
+        k += 1
+    return [offset, k, result[k:]]
+
+
+def _apply_delta(previous, delta):
+    offset, k, tail = delta
+    return previous[offset:offset + k] + tail
+
+
+# ===================== 行情录制 / 回放 =====================
+
+class RecordingDataSource:
+    """
+    包装行情来源（模拟盘为 SimulatedExchange.data_source，实盘为 ccxt 客户端），
+    把每次行情请求及其返回值（或异常）写入日志；其余属性和方法原样透传。
+    K 线请求只保存相对同一请求上次结果的增量（见 _list_delta）。
+    """
+
+    def __init__(self, inner, journal: "Journal"):
+        self._inner = inner
+        self._journal = journal
+        self._previous = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if name not in RECORDED_METHODS:
+            return attr
+
+        def recorded(*args, **kwargs):
+            key = _request_key(name, args, kwargs)
+            frame = {"t": "md", "c": self._journal.cycle, "k": key}
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                frame["e"] = f"{type(e).__name__}: {e}"
+                self._journal.write(frame)
+                raise
+
+            # 增量基于写入顺序，计算和写入需在同一把锁内完成
+            with self._lock:
+                delta = _list_delta(self._previous.get(key), result)
+                if delta is None:
+                    frame["r"] = result
+                else:
+                    frame["d"] = delta
+                if isinstance(result, list):
+                    self._previous[key] = result
+                self._journal.write(frame)
+            return result
+
+        return recorded
+
+
+class ReplayDataSource:
+    """
+    回放行情来源：按 (轮次, 请求) 分组保存录制的返回值，请求到来时依次取出。
+    按轮次分组保证某一轮的决策出现分歧时，不会打乱后续轮次的行情。
+    本轮没有录制的请求（如实盘录制时下单前不会单独拉取行情）沿用该请求最近一次的返回值。
+
+    K 线增量帧在取出时才按录制顺序展开，展开后释放原始帧，长时间的日志也不会占用过多内存。
+    """
+
+    def __init__(self, journal: "Journal"):
+        self._journal = journal
+        self._responses = defaultdict(deque)   # (轮次, 请求) -> 该请求帧序号队列
+        self._frames = defaultdict(list)       # 请求 -> 按录制顺序排列的帧
+        self._expanded = {}                    # 请求 -> (已展开到的帧序号, 完整结果)
+        self._last = {}
+
+    def add(self, frame: dict):
+        key = frame["k"]
+        self._responses[(frame["c"], key)].append(len(self._frames[key]))
+        self._frames[key].append(frame)
+
+    def _resolve(self, key: str, seq: int) -> dict:
+        """按录制顺序展开到第 seq 帧，返回 {"r": 结果} 或 {"e": 错误}"""
+        frames = self._frames[key]
+        done, result = self._expanded.get(key, (-1, None))
+        for i in range(done + 1, seq + 1):
+            frame = frames[i]
+            frames[i] = None
+            if "d" in frame:
+                result = _apply_delta(result, frame["d"])
+            elif "r" in frame:
+                result = frame["r"]
+            if i == seq:
+                self._expanded[key] = (seq, result)
+                return {"e": frame["e"]} if "e" in frame else {"r": result}
+        return {"r": result}
+
+    def __getattr__(self, name):
+        if name not in RECORDED_METHODS:
+            raise AttributeError(name)
+
+        def replayed(*args, **kwargs):
+            key = _request_key(name, args, kwargs)
+            queue = self._responses.get((self._journal.cycle, key))
+            if queue:
+                frame = self._last[key] = self._resolve(key, queue.popleft())
+            elif key in self._last:
+                frame = self._last[key]
+            else:
+                raise ReplayError(f"第 {self._journal.cycle} 轮没有录制的行情: {key}")
+            if "e" in frame:
+                raise ReplayError(frame["e"])
+            return frame["r"]
+
+        return replayed
+
+
+# ===================== 录制 / 回放会话 =====================
+
+class Journal:
+    """
+    运行日志：录制模式下记录启动状态、每轮时间戳、行情返回值、配置变更和策略决策；
+    回放模式下用录制的数据驱动同一个主循环（时钟被替换为 ReplayClock，全速运行），
+    并逐条比对决策是否与录制时一致。
+
+    未开启录制 / 回放时所有方法都是空操作。
+    """
+
+    def __init__(self):
+        self.mode = None
+        self.cycle = 0
+        self._writer = None
+        self._ticks = []
+        self._configs = {}
+        self._decisions = defaultdict(deque)
+        self._matched = 0
+        self._mismatched = 0
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def write(self, frame: dict):
+        if self._writer is not None:
+            self._writer.write(frame)
+
+    # ----- 录制 -----
+
+    def start_recording(self, path: str):
+        """开始录制：写入启动状态，并在行情来源外包一层录制器"""
+        from binance.exchange import get_exchange, set_exchange
+        from binance.execution import run_inline
+        from binance.simulator import SimulatedExchange
+        from config.position import load_position
+        from core.risk_engine import risk_engine
+
+        exchange = get_exchange()
+        balance = exchange.fetch_balance()
+        # 回放时本地撮合引擎的盘口参数：模拟盘取当前模拟交易所的参数，实盘取配置中的 SIM_*
+        if isinstance(exchange, SimulatedExchange):
+            simulator = {name: getattr(exchange, name) for name in SIMULATOR_PARAMS}
+        else:
+            simulator = {"spread_bps": SIM_SPREAD_BPS, "book_levels": SIM_BOOK_LEVELS, "level_notional": SIM_LEVEL_NOTIONAL}
+        self._writer = JournalWriter(path)
+        self.mode = "record"
+        # 执行算法由主循环同步推进，不在后台线程里推进时钟
+        run_inline(True)
+        self.write({
+            "t": "meta",
+            "version": JOURNAL_VERSION,
+            "started": clock_module.now(),
+            "dry_run": DRY_RUN,
+            "symbols": SYMBOL_CONFIGS,
+            "position": json.loads(load_position().encode()),
+            "risk": risk_engine.state(),
+            "balances": {asset: amount for asset, amount in balance.get("free", {}).items() if amount},
+            "used": {asset: amount for asset, amount in balance.get("used", {}).items() if amount},
+            "simulator": simulator,
+        })
+
+        if isinstance(exchange, SimulatedExchange):
+            exchange.data_source = RecordingDataSource(exchange.data_source, self)
+        else:
+            set_exchange(RecordingDataSource(exchange, self))
+        log(f"🎙️ 运行日志录制中：{path}")
+
+    # ----- 回放 -----
+
+    def start_replay(self, path: str) -> int:
+        """
+        加载日志并准备回放环境，返回录制的轮数：
+        - 币种配置、持仓、风控状态恢复为录制开始时的状态（持仓写入单独的文件，不覆盖实盘）
+        - 交易所替换为本地撮合引擎，行情来自日志
+        - 时钟替换为 ReplayClock，关闭 Telegram 通知，交易记录写入 logs/replay
+        """
+        import config.position as position_module
+        import binance.execution as execution_module
+        import core.signal_handler as signal_handler
+        from binance.exchange import set_exchange
+        from binance.simulator import SimulatedExchange
+        from config.symbol_loader import _validate_symbol
+        from core.risk_engine import risk_engine
+        from notify.telegram import set_enabled
+
+        source = ReplayDataSource(self)
+        meta = None
+        for frame in read_journal(path):
+            kind = frame["t"]
+            if kind == "meta":
+                meta = frame
+            elif kind == "tick":
+                self._ticks.append(frame["ts"])
+            elif kind == "md":
+                source.add(frame)
+            elif kind == "config":
+                self._configs[frame["c"]] = frame["symbols"]
+            elif kind == "decision":
+                self._decisions[frame["c"]].append(frame)
+        if meta is None:
+            raise ReplayError(f"{path} 不是有效的运行日志")
+        if meta.get("version") != JOURNAL_VERSION:
+            raise ReplayError(f"不支持的日志版本 {meta.get('version')}")
+
+        self.mode = "replay"
+        clock_module.set_clock(ReplayClock(meta["started"]))
+        execution_module.run_inline(True)
+        set_enabled(False)
+        signal_handler.TRADE_LOG_DIR = os.path.join("logs", "replay")
+
+        SYMBOL_CONFIGS.clear()
+        SYMBOL_CONFIGS.update({s: _validate_symbol(s, c) for s, c in meta["symbols"].items()})
+        for cycle_no, configs in self._configs.items():
+            self._configs[cycle_no] = {s: _validate_symbol(s, c) for s, c in configs.items()}
+
+        position_module.POSITION_FILE = path + ".position.json"
+        execution_module.algo_states.path = path + ".algos.json"
+        with open(position_module.POSITION_FILE, "w") as f:
+            json.dump(meta["position"], f)
+
+        risk_engine.state_file = None
+        risk_engine.restore(meta["risk"])
+
+        # 录制开始时冻结在挂单中的资金：遗留挂单在启动时被撤销（回放时查不到，直接清除标记），
+        # 因此按可用 + 冻结的合计作为回放账户的可用余额
+        balances = dict(meta["balances"])
+        for asset, amount in meta.get("used", {}).items():
+            balances[asset] = balances.get(asset, 0.0) + amount
+        # 盘口参数与录制时一致；不注入网络延迟，全速回放
+        set_exchange(SimulatedExchange(
+            data_source=source, balances=balances, latency_ms=0, **meta.get("simulator", {}),
+        ))
+        log(f"⏪ 回放运行日志：{path}，共 {len(self._ticks)} 轮")
+        return len(self._ticks)
+
+    # ----- 主循环钩子 -----
+
+    def begin_cycle(self, config_watcher):
+        """
+        每轮开始时调用：录制模式记录时间戳和配置变更；回放模式把时钟拨到录制时的时间，
+        并应用录制的配置变更；正常模式只检查配置文件。
+        """
+        self.cycle += 1
+        if self.replaying:
+            clock_module.get_clock().set(self._ticks[self.cycle - 1])
+            configs = self._configs.get(self.cycle)
+            if configs is not None:
+                config_watcher.apply(configs)
+            return
+
+        self.write({"t": "tick", "c": self.cycle, "ts": clock_module.now()})
+        if config_watcher.poll():
+            self.write({"t": "config", "c": self.cycle, "symbols": SYMBOL_CONFIGS})
+
+    def end_cycle(self):
+        if self._writer is not None:
+            self._writer.flush()
+
+    def record_decision(self, symbol: str, action: str, price: float = None, reason: str = None):
+        """记录（录制）或比对（回放）某个币种本轮的决策"""
+        if self.recording:
+            self.write({"t": "decision", "c": self.cycle, "symbol": symbol, "action": action,
+                        "price": price, "reason": reason})
+        elif self.replaying:
+            expected = self._decisions[self.cycle].popleft() if self._decisions[self.cycle] else None
+            got = (symbol, action, reason)
+            if expected is not None and (expected["symbol"], expected["action"], expected["reason"]) == got:
+                self._matched += 1
+            else:
+                self._mismatched += 1
+                want = (expected["symbol"], expected["action"], expected["reason"]) if expected else None
+                log(f"❗ 第 {self.cycle} 轮决策不一致：录制 {want}，回放 {got}")
+
+    def finish(self) -> int:
+        """结束录制 / 回放；回放时返回不一致的决策数量"""
+        from binance.execution import run_inline
+
+        run_inline(False)
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if not self.replaying:
+            return 0
+        missing = sum(len(q) for q in self._decisions.values())
+        self._mismatched += missing
+        log(f"⏹️ 回放完成：{self._matched} 个决策一致，{self._mismatched} 个不一致")
+        return self._mismatched
+
+
+# 全局运行日志
+journal = Journal()
@@ -0,0 +1,264 @@
+# 📁 core/metrics.py
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from config import clock as clock_module
+from config.config import (
+    METRICS_HOST, METRICS_PORT, HEALTH_STALL_SECONDS, PROFILE_DIR, PROFILE_SECONDS, TRACEMALLOC_CYCLES
+)
+from config.logger import log
+from core.profiler import profiler, allocation_tracker
+
+# /debug/profile 单次采样的最长时间（秒）
+MAX_PROFILE_SECONDS = 600
+
+# 指标说明与类型：name -> (type, help)
+METRIC_HELP = {
+    "bot_cycles_total": ("counter", "主循环已完成的轮数"),
+    "bot_cycle_errors_total": ("counter", "主循环整轮出错次数"),
+    "bot_cycle_duration_seconds": ("gauge", "最近一轮主循环耗时"),
+    "bot_cycle_duration_seconds_sum": ("counter", "主循环累计耗时"),
+    "bot_last_cycle_timestamp_seconds": ("gauge", "最近一轮主循环完成时间"),
+    "bot_last_price": ("gauge", "各币种最新价格"),
+    "bot_price_age_seconds": ("gauge", "各币种最新价格距今秒数"),
+    "bot_symbol_consecutive_errors": ("gauge", "各币种连续出错次数（调度器退避中）"),
+    "bot_open_positions": ("gauge", "当前持仓的币种数量"),
+    "bot_gross_exposure_usdt": ("gauge", "总持仓成本（USDT）"),
+    "bot_realized_pnl_today_usdt": ("gauge", "当日已实现净盈亏（USDT）"),
+    "bot_circuit_breaker_active": ("gauge", "连续止损熔断是否生效"),
+    "bot_orders_total": ("counter", "提交的订单数量（按方向和结果）"),
+    "bot_telegram_queue_depth": ("gauge", "Telegram 待发送消息数量"),
+    "bot_exchange_used_weight_1m": ("gauge", "Binance 最近 1 分钟已用请求权重"),
+    "bot_data_quality_events_total": ("counter", "行情数据质量事件（按类型）"),
+    "bot_order_book_synced": ("gauge", "本地盘口是否已同步且未过期"),
+    "bot_order_book_spread_bps": ("gauge", "本地盘口买卖价差（基点）"),
+    "bot_order_book_imbalance": ("gauge", "本地盘口前 10 档深度不平衡度"),
+    "bot_order_book_events_total": ("counter", "本地盘口计数（增量事件 / 序号缺口 / 重新同步 / 过期快照）"),
+}
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in labels)
+    return "{" + body + "}"
+
+
+class MetricsRegistry:
+    """
+    极简的 Prometheus 指标注册表。
+
+    主循环线程只做加锁后的字典写入（O(1)），HTTP 线程在抓取时加锁复制后渲染，
+    抓取再慢也不会阻塞交易主循环。其他线程安全的数据源（Telegram 队列、交易所权重、
+    数据质量计数）在抓取时由 collector 直接读取。
+    """
+
+    def __init__(self):
+        self._values = {}        # (name, labels) -> value
+        self._price_times = {}   # symbol -> 最新价格时间
+        self._collectors = []
+        self._lock = threading.Lock()
+        self.started = clock_module.now()
+        self.last_cycle = None
+
+    @staticmethod
+    def _key(name: str, labels: dict = None):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._values[self._key(name, labels)] = value
+
+    def observe_cycle(self, duration: float):
+        """记录一轮主循环完成"""
+        now = clock_module.now()
+        with self._lock:
+            self.last_cycle = now
+            self._values[("bot_cycle_duration_seconds", ())] = duration
+            self._values[("bot_last_cycle_timestamp_seconds", ())] = now
+            self._values[("bot_cycles_total", ())] = self._values.get(("bot_cycles_total", ()), 0) + 1
+            key = ("bot_cycle_duration_seconds_sum", ())
+            self._values[key] = self._values.get(key, 0) + duration
+
+    def observe_price(self, symbol: str, price: float):
+        with self._lock:
+            self._values[("bot_last_price", (("symbol", symbol),))] = price
+            self._price_times[symbol] = clock_module.now()
+
+    def forget_symbol(self, symbol: str):
+        """币种被移除后不再输出其指标"""
+        with self._lock:
+            self._price_times.pop(symbol, None)
+            for key in [k for k in self._values if ("symbol", symbol) in k[1]]:
+                del self._values[key]
+
+    def register_collector(self, collector):
+        """注册抓取时调用的 collector() -> [(name, labels_dict, value), ...]"""
+        self._collectors.append(collector)
+
+    def samples(self) -> list:
+        now = clock_module.now()
+        with self._lock:
+            samples = [(name, labels, value) for (name, labels), value in self._values.items()]
+            samples += [
+                ("bot_price_age_seconds", (("symbol", symbol),), now - t)
+                for symbol, t in self._price_times.items()
+            ]
+        for collector in self._collectors:
+            try:
+                samples += [(name, tuple(sorted(labels.items())), value) for name, labels, value in collector()]
+            except Exception as e:
+                log(f"⚠️ 指标采集失败 {getattr(collector, '__name__', collector)}: {e}")
+        return samples
+
+    def render(self) -> str:
+        """按 Prometheus 文本格式输出"""
+        by_name = {}
+        for name, labels, value in self.samples():
+            by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name in sorted(by_name):
+            kind, help_text = METRIC_HELP.get(name, ("gauge", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name[name]):
+                lines.append(f"{name}{_format_labels(labels)} {float(value):.10g}")
+        return "\n".join(lines) + "\n"
+
+    def health(self):
+        """主循环在 HEALTH_STALL_SECONDS 内完成过一轮（或刚启动）视为健康，返回 (是否健康, 说明)"""
+        now = clock_module.now()
+        with self._lock:
+            last = self.last_cycle
+        reference = last if last is not None else self.started
+        age = now - reference
+        if age > HEALTH_STALL_SECONDS:
+            what = "上一轮完成" if last is not None else "启动"
+            return False, f"stalled: {what}已 {age:.0f} 秒"
+        return True, f"ok: 上一轮完成于 {age:.0f} 秒前" if last is not None else "ok: starting"
+
+
+# ===================== 抓取时读取的数据源 =====================
+
+def _collect_telegram():
+    from notify.telegram import queue_depth
+    return [("bot_telegram_queue_depth", {}, queue_depth())]
+
+
+def _collect_exchange_weight():
+    """读取 Binance 响应头中的 X-MBX-USED-WEIGHT-1M（模拟盘读取行情来源客户端）"""
+    from binance.exchange import get_market_data_source
+
+    source = get_market_data_source()
+    headers = getattr(source, "last_response_headers", None) or {}
+    for name, value in dict(headers).items():
+        if name.lower() == "x-mbx-used-weight-1m":
+            return [("bot_exchange_used_weight_1m", {}, float(value))]
+    return []
+
+
+def _collect_data_quality():
+    from data.data_quality import get_data_quality_stats
+    return [("bot_data_quality_events_total", {"kind": kind}, n) for kind, n in get_data_quality_stats().items()]
+
+
+def _collect_order_books():
+    from data.order_book import order_books
+
+    stats = order_books.stats()
+    samples = [("bot_order_book_events_total", {"kind": kind}, n) for kind, n in stats.items() if kind != "synced"]
+    for symbol, synced in stats["synced"].items():
+        samples.append(("bot_order_book_synced", {"symbol": symbol}, int(synced)))
+        top = order_books.top(symbol)
+        if top is not None:
+            samples.append(("bot_order_book_spread_bps", {"symbol": symbol}, top.spread_bps))
+            samples.append(("bot_order_book_imbalance", {"symbol": symbol}, top.imbalance))
+    return samples
+
+
+metrics = MetricsRegistry()
+metrics.register_collector(_collect_telegram)
+metrics.register_collector(_collect_exchange_weight)
+metrics.register_collector(_collect_data_quality)
+metrics.register_collector(_collect_order_books)
+
+
+# ===================== HTTP 服务 =====================
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path, query = url.path, parse_qs(url.query)
+        if path == "/metrics":
+            self._reply(200, metrics.render(), "text/plain; version=0.0.4; charset=utf-8")
+        elif path == "/healthz":
+            healthy, detail = metrics.health()
+            self._reply(200 if healthy else 503, detail + "\n", "text/plain; charset=utf-8")
+        elif path == "/debug/profile":
+            # 在后台线程采样主循环，立即返回结果文件路径
+            seconds = min(self._number(query, "seconds", PROFILE_SECONDS), MAX_PROFILE_SECONDS)
+            base = profiler.start(seconds)
+            if base is None:
+                self._reply(409, "profile already running\n", "text/plain; charset=utf-8")
+            else:
+                self._reply(202, f"profiling {seconds:.0f}s -> {base}.folded / {base}.txt\n", "text/plain; charset=utf-8")
+        elif path == "/debug/tracemalloc":
+            cycles = int(self._number(query, "cycles", TRACEMALLOC_CYCLES))
+            allocation_tracker.request(cycles)
+            self._reply(202, f"tracking allocations for {cycles} cycles -> {PROFILE_DIR}/alloc-*.txt\n", "text/plain; charset=utf-8")
+        else:
+            self._reply(404, "not found\n", "text/plain; charset=utf-8")
+
+    @staticmethod
+    def _number(query: dict, name: str, default: float) -> float:
+        try:
+            return max(float(query[name][0]), 1)
+        except (KeyError, IndexError, ValueError):
+            return default
+
+    def _reply(self, status: int, body: str, content_type: str):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # 不把每次抓取写入交易日志
+        pass
+
+
+_server = None
+
+
+def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    """在后台线程启动 /metrics 与 /healthz 服务；METRICS_PORT 为空时不启动。返回服务对象或 None"""
+    global _server
+    if _server is not None or port is None:
+        return _server
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        log(f"⚠️ 指标服务启动失败（{host}:{port}）: {e}")
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    log(f"📊 指标服务已启动：http://{host}:{_server.server_port}/metrics")
+    return _server
+
+
+def stop_metrics_server():
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
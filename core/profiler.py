@@ -0,0 +1,264 @@
+# 📁 core/profiler.py
+
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+from config.config import (
+    PROFILE_DIR, PROFILE_SECONDS, PROFILE_SAMPLE_INTERVAL, TRACEMALLOC_CYCLES, TRACEMALLOC_TOP
+)
+from config.logger import log
+
+# 项目根目录：项目内文件显示相对路径，内存分配按项目代码行归因
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# tracemalloc 保存的调用栈深度（pandas 内部调用较深，太浅时无法归因到项目代码）
+TRACEMALLOC_DEPTH = 25
+
+# 调用栈中的这些函数表示主循环在等待（sleep），汇总时单独统计
+_IDLE_FUNCTIONS = {"sleep"}
+
+# tracemalloc 对比时忽略的内部帧
+_TRACEMALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+def _profile_path(kind: str) -> str:
+    """输出文件路径（不含后缀）"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f"{kind}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+
+
+@lru_cache(maxsize=1024)
+def _project_path(filename: str):
+    """项目内文件返回相对项目根目录的路径，其他文件返回 None"""
+    if filename.startswith("<"):
+        return None
+    relative = os.path.relpath(os.path.abspath(filename), PROJECT_ROOT)
+    return None if relative.startswith("..") else relative
+
+
+def _short_path(filename: str) -> str:
+    """项目内文件显示相对路径，第三方库只显示文件名"""
+    return _project_path(filename) or os.path.basename(filename)
+
+
+class SamplingProfiler:
+    """
+    采样式 CPU 分析器：后台线程每隔 PROFILE_SAMPLE_INTERVAL 秒通过 sys._current_frames()
+    读取主循环线程的调用栈，持续 N 秒后输出：
+
+    - <PROFILE_DIR>/cpu-<时间>.folded：折叠栈格式（每行 "帧;帧;帧 次数"），可直接交给 flamegraph.pl / speedscope
+    - <PROFILE_DIR>/cpu-<时间>.txt：按函数自身 / 累计采样占比排序的摘要
+
+    采样不修改被分析线程，开销只取决于采样频率，可以在实盘进程上随时开启。
+    同一时间只允许一次采样。
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float = PROFILE_SECONDS, thread_id: int = None):
+        """开始采样（不阻塞），返回输出文件路径（不含后缀）；已有采样在进行时返回 None"""
+        with self._lock:
+            if self.running:
+                log("⚠️ CPU 采样正在进行中，忽略本次请求")
+                return None
+            target = thread_id or threading.main_thread().ident
+            base = _profile_path("cpu")
+            self._thread = threading.Thread(
+                target=self._run, args=(target, seconds, base), name="cpu-profiler", daemon=True
+            )
+            self._thread.start()
+        log(f"🔬 开始 CPU 采样 {seconds:.0f} 秒，结果写入 {base}.folded / .txt")
+        return base
+
+    def _run(self, thread_id: int, seconds: float, base: str):
+        stacks = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((_short_path(code.co_filename), code.co_name))
+                frame = frame.f_back
+            stacks[tuple(reversed(stack))] += 1
+            samples += 1
+            time.sleep(self.interval)
+
+        try:
+            self._write(stacks, samples, seconds, base)
+        except Exception as e:
+            log(f"❌ CPU 采样结果写入失败: {e}")
+
+    @staticmethod
+    def _write(stacks: Counter, samples: int, seconds: float, base: str):
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(";".join(f"{func} ({path})" for path, func in stack) + f" {count}\n")
+
+        own, total = Counter(), Counter()
+        idle = 0
+        for stack, count in stacks.items():
+            if not stack:
+                continue
+            path, func = stack[-1]
+            own[(path, func)] += count
+            if func in _IDLE_FUNCTIONS:
+                idle += count
+            for key in set(stack):
+                total[key] += count
+
+        def pct(n):
+            return 100.0 * n / samples if samples else 0.0
+
+        lines = [
+            f"CPU 采样：{seconds:.0f} 秒，{samples} 个样本，其中等待（sleep）{pct(idle):.1f}%",
+            "",
+            "== 自身占比（栈顶函数）==",
+        ]
+        lines += [f"{pct(n):6.2f}%  {func}  ({path})" for (path, func), n in own.most_common(30)]
+        lines += ["", "== 累计占比（出现在调用栈中）=="]
+        lines += [f"{pct(n):6.2f}%  {func}  ({path})" for (path, func), n in total.most_common(30)]
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+        log(f"🔬 CPU 采样完成：{samples} 个样本，已写入 {base}.txt")
+
+
+class AllocationTracker:
+    """
+    逐轮内存分配跟踪：开启后在接下来 N 轮主循环中，每轮结束时拍一次 tracemalloc 快照，
+    与上一轮对比，追加写入 <PROFILE_DIR>/alloc-<时间>.txt，跟踪结束后关闭 tracemalloc（开启期间有额外开销）。
+    每轮输出两张表（各 TRACEMALLOC_TOP 项）：
+    - 按项目代码行归因：分配发生在 pandas / ta 等库内部时，归到调用链上最近的项目代码行，
+      用来定位 fetch_ohlcv / get_strategy_indicators 这类调用每轮产生的 DataFrame 开销
+    - 按实际分配位置：库内部的具体代码行
+
+    request() 可以在任意线程 / 信号处理函数中调用，快照只在主循环线程的 on_cycle() 中拍摄。
+    """
+
+    def __init__(self, top: int = TRACEMALLOC_TOP):
+        self.top = top
+        self._requested = 0
+        self._remaining = 0
+        self._previous = None
+        self._path = None
+        self._started_tracing = False
+
+    @property
+    def active(self) -> bool:
+        return self._remaining > 0
+
+    def request(self, cycles: int = TRACEMALLOC_CYCLES):
+        """申请跟踪接下来 cycles 轮（下一轮结束时生效）"""
+        self._requested = max(int(cycles), 1)
+        log(f"🧮 已申请跟踪接下来 {self._requested} 轮的内存分配")
+
+    def on_cycle(self, cycle: int):
+        """每轮结束时由主循环调用"""
+        if self._requested and not self.active:
+            self._begin(self._requested)
+            self._requested = 0
+            return
+        if not self.active:
+            return
+
+        try:
+            snapshot = tracemalloc.take_snapshot().filter_traces(_TRACEMALLOC_FILTERS)
+            self._write_diff(cycle, snapshot)
+            self._previous = snapshot
+        except Exception as e:
+            log(f"❌ 内存分配快照失败: {e}")
+            self._remaining = 1
+
+        self._remaining -= 1
+        if not self.active:
+            self._finish()
+
+    def _begin(self, cycles: int):
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start(TRACEMALLOC_DEPTH)
+        self._previous = tracemalloc.take_snapshot().filter_traces(_TRACEMALLOC_FILTERS)
+        self._remaining = cycles
+        self._path = _profile_path("alloc") + ".txt"
+        log(f"🧮 开始跟踪内存分配 {cycles} 轮，结果写入 {self._path}")
+
+    def _write_diff(self, cycle: int, snapshot):
+        stats = snapshot.compare_to(self._previous, "traceback")
+        current, peak = tracemalloc.get_traced_memory()
+
+        by_project, by_site = Counter(), Counter()
+        blocks_project, blocks_site = Counter(), Counter()
+        for stat in stats:
+            if not stat.size_diff and not stat.count_diff:
+                continue
+            frames = list(stat.traceback)  # 从最早的调用到实际分配位置
+            site = frames[-1]
+            site_key = f"{_short_path(site.filename)}:{site.lineno}"
+            project = next((f for f in reversed(frames) if _project_path(f.filename)), None)
+            project_key = f"{_project_path(project.filename)}:{project.lineno}" if project else site_key
+            by_site[site_key] += stat.size_diff
+            blocks_site[site_key] += stat.count_diff
+            by_project[project_key] += stat.size_diff
+            blocks_project[project_key] += stat.count_diff
+
+        def table(sizes: Counter, blocks: Counter):
+            ranked = sorted(sizes, key=lambda key: abs(sizes[key]), reverse=True)[:self.top]
+            return [f"{sizes[key] / 1024:+10.1f} KiB {blocks[key]:+7d} 块  {key}" for key in ranked]
+
+        growth = sum(by_site.values())
+        lines = [f"== 第 {cycle} 轮：净增长 {growth / 1024:+.1f} KiB，当前跟踪 {current / 1024:.1f} KiB，峰值 {peak / 1024:.1f} KiB =="]
+        lines += ["-- 按项目代码行 --"] + table(by_project, blocks_project)
+        lines += ["-- 按分配位置 --"] + table(by_site, blocks_site)
+        with open(self._path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n\n")
+
+    def _finish(self):
+        self._previous = None
+        if self._started_tracing:
+            tracemalloc.stop()
+        log(f"🧮 内存分配跟踪结束，已写入 {self._path}")
+
+
+# 全局实例
+profiler = SamplingProfiler()
+allocation_tracker = AllocationTracker()
+
+
+def install_signal_handlers() -> bool:
+    """
+    注册信号触发（仅 POSIX，且必须在主线程调用）：
+    - kill -USR1 <pid>：CPU 采样 PROFILE_SECONDS 秒
+    - kill -USR2 <pid>：跟踪接下来 TRACEMALLOC_CYCLES 轮的内存分配
+    """
+    if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+        return False
+    # 信号处理函数在主线程的任意位置执行，为避免重入日志输出，实际工作交给新线程
+    def spawn(target):
+        return lambda signum, frame: threading.Thread(target=target, daemon=True).start()
+
+    signal.signal(signal.SIGUSR1, spawn(profiler.start))
+    signal.signal(signal.SIGUSR2, spawn(allocation_tracker.request))
+    log(f"🔬 性能分析已就绪：kill -USR1 {os.getpid()} 采样 CPU，kill -USR2 {os.getpid()} 跟踪内存分配")
+    return True
@@ -0,0 +1,242 @@
+# 📁 core/reconciler.py
+
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from binance.order_manager import get_fill_fee
+from binance.venues import venues
+from config.config import SYMBOL_CONFIGS, RECONCILE_WORKERS, RECONCILE_PAGE_SIZE
+from config.logger import log
+from config.position import save_position
+from notify.telegram import send_telegram_message
+
+# 对账检查点：每个币种在各交易所已处理到的成交 ID，以及按成交累计出的持仓（数量 / 成本 / 买入手续费 / 最近买入的交易所）
+RECONCILE_STATE_FILE = "reconcile_state.json"
+RECONCILE_STATE_VERSION = 1
+
+# 持仓数量比较的相对容差（浮点累加误差）
+AMOUNT_TOLERANCE = 1e-6
+
+
+def _ledger(amount: float = 0.0, cost: float = 0.0, fee: float = 0.0, venue: str = None) -> dict:
+    return {"last_trade_ids": {}, "amount": amount, "cost": cost, "fee": fee, "venue": venue}
+
+
+def _same_amount(a: float, b: float) -> bool:
+    return math.isclose(a, b, rel_tol=AMOUNT_TOLERANCE, abs_tol=1e-12)
+
+
+def apply_trade(ledger: dict, trade: dict, venue: str = None):
+    """
+    按一笔成交更新账本：买入累加数量、成本和手续费，并记录买入所在的交易所（持仓的卖出交易所）；
+    卖出按平均成本减少成本，并按比例扣除买入手续费（与 settle_sell 的部分成交处理一致），卖完后清零。
+    """
+    amount = trade["amount"]
+    if trade["side"] == "buy":
+        if venue is not None:
+            ledger["venue"] = venue
+        ledger["amount"] += amount
+        ledger["cost"] += trade.get("cost") or amount * trade["price"]
+        ledger["fee"] += get_fill_fee(trade)
+        return
+
+    held = ledger["amount"]
+    remaining = held - amount
+    if held <= 0 or remaining <= held * AMOUNT_TOLERANCE:
+        ledger["amount"] = ledger["cost"] = ledger["fee"] = 0.0
+        return
+    ratio = remaining / held
+    ledger["amount"] = remaining
+    ledger["cost"] *= ratio
+    ledger["fee"] *= ratio
+
+
+class Reconciler:
+    """
+    启动对账：position.json 只在本地写入，崩溃发生在「交易所已成交」和「写入持仓」之间时两者会不一致。
+    启动时以交易所成交记录为准修正本地持仓：
+
+    - 检查点（RECONCILE_STATE_FILE）记录每个币种在各交易所已处理到的成交 ID 和由成交累计出的持仓，
+      每次启动只用 fetch_my_trades(fromId=上次 ID + 1) 分页拉取之后的新成交，历史再长也只拉增量
+    - 所有「币种 × 可下单交易所」的成交和挂单在线程池中并发拉取
+    - 累计后的持仓与本地不一致时修正本地记录（保留移动止损等本地字段），有未完成挂单的币种交给
+      resume_pending_orders 结算；交易所上有本地不知道的挂单时只告警，不擅自撤单
+    - 全部币种处理完后持仓文件和检查点各写一次；任一币种拉取失败时该币种保持原样，检查点不前进
+
+    第一次看到某个币种时以本地持仓为起点，检查点设为交易所上最新的成交 ID。
+    """
+
+    def __init__(self, state_file: str = RECONCILE_STATE_FILE, workers: int = RECONCILE_WORKERS,
+                 page_size: int = RECONCILE_PAGE_SIZE):
+        self.state_file = state_file
+        self.workers = workers
+        self.page_size = page_size
+
+    # ===== 检查点 =====
+
+    def load_state(self) -> dict:
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log(f"⚠️ 读取对账检查点失败，重新建立: {e}")
+            return {}
+        if data.get("version") != RECONCILE_STATE_VERSION:
+            return {}
+        return data.get("symbols", {})
+
+    def save_state(self, ledgers: dict):
+        if not self.state_file:
+            return
+        try:
+            tmp_file = self.state_file + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump({"version": RECONCILE_STATE_VERSION, "symbols": ledgers}, f)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            log(f"⚠️ 保存对账检查点失败: {e}")
+
+    # ===== 拉取（线程池中执行） =====
+
+    def _fetch_trades(self, venue, symbol: str, last_id):
+        """
+        返回 (成交列表, 最新成交 ID)。last_id 为 None（第一次对账）时不回溯历史，只取最新的成交 ID。
+        """
+        if last_id is None:
+            recent = venue.fetch_my_trades(symbol, limit=self.page_size)
+            return [], max((int(t["id"]) for t in recent), default=0)
+
+        trades = []
+        while True:
+            page = venue.fetch_my_trades(symbol, limit=self.page_size, params={"fromId": int(last_id) + 1})
+            page = [t for t in page if int(t["id"]) > int(last_id)]
+            trades += page
+            if page:
+                last_id = max(int(t["id"]) for t in page)
+            if len(page) < self.page_size:
+                return trades, int(last_id)
+
+    def _fetch(self, venue_name: str, symbol: str, last_id):
+        venue = venues.get(venue_name)
+        trades, last_id = self._fetch_trades(venue, symbol, last_id)
+        open_orders = venue.fetch_open_orders(symbol)
+        return trades, last_id, open_orders
+
+    # ===== 对账 =====
+
+    def run(self, position) -> dict:
+        """
+        对账并修正 position（PositionBook），返回摘要 {"symbols", "trades", "fixed", "failed", "seconds"}。
+        """
+        started = time.perf_counter()
+        ledgers = self.load_state()
+        symbols = sorted(set(SYMBOL_CONFIGS) | set(position) | set(ledgers))
+        names = venues.names(trading_only=True)
+
+        tasks = {}
+        with ThreadPoolExecutor(max_workers=max(self.workers, 1), thread_name_prefix="reconcile") as pool:
+            for symbol in symbols:
+                last_ids = ledgers.get(symbol, {}).get("last_trade_ids", {})
+                for name in names:
+                    tasks[symbol, name] = pool.submit(self._fetch, name, symbol, last_ids.get(name))
+
+        results, failed = {}, set()
+        for (symbol, name), future in tasks.items():
+            try:
+                results[symbol, name] = future.result()
+            except Exception as e:
+                failed.add(symbol)
+                log(f"⚠️ {symbol} 对账拉取失败（{name}）: {e}，本次保持原样")
+
+        fixed = []
+        trade_count = 0
+        for symbol in symbols:
+            if symbol in failed:
+                continue
+            ledger = ledgers.get(symbol)
+            if ledger is None:
+                record = position.get(symbol)
+                holding = record is not None and record.holding
+                ledger = _ledger(
+                    record.amount if holding else 0.0,
+                    record.entry_price * record.amount if holding else 0.0,
+                    (record.buy_fee or 0.0) if holding else 0.0,
+                    record.venue if holding else None,
+                )
+            ledger = dict(ledger, last_trade_ids=dict(ledger["last_trade_ids"]))
+
+            trades, open_orders = [], []
+            for name in names:
+                venue_trades, last_id, venue_orders = results[symbol, name]
+                trades += [(trade, name) for trade in venue_trades]
+                open_orders += venue_orders
+                ledger["last_trade_ids"][name] = last_id
+            trades.sort(key=lambda item: (item[0].get("timestamp") or 0, int(item[0]["id"])))
+            for trade, name in trades:
+                apply_trade(ledger, trade, name)
+            trade_count += len(trades)
+            ledgers[symbol] = ledger
+
+            if self._reconcile_symbol(symbol, ledger, open_orders, position):
+                fixed.append(symbol)
+
+        # 持仓与检查点各写一次（持仓先写：两次写入之间崩溃时，下次启动重放同样的成交，结果相同）
+        save_position(position)
+        self.save_state(ledgers)
+
+        summary = {
+            "symbols": len(symbols) - len(failed), "trades": trade_count, "fixed": fixed,
+            "failed": sorted(failed), "seconds": time.perf_counter() - started,
+        }
+        log(
+            f"🧾 启动对账完成：{summary['symbols']} 个币种，{trade_count} 笔新成交，"
+            f"修正 {len(fixed)} 个持仓，用时 {summary['seconds']:.1f} 秒"
+        )
+        if fixed:
+            send_telegram_message(f"🧾 启动对账修正了本地持仓：{', '.join(fixed)}")
+        return summary
+
+    @staticmethod
+    def _reconcile_symbol(symbol: str, ledger: dict, open_orders: list, position) -> bool:
+        """按账本修正单个币种的本地持仓，返回是否有修正"""
+        record = position.get(symbol)
+        pending = record.pending_order if record else None
+        orphans = [o for o in open_orders if str(o["id"]) != str(pending)]
+        if orphans:
+            ids = ", ".join(str(o["id"]) for o in orphans)
+            log(f"⚠️ {symbol} 交易所上有本地未记录的挂单：{ids}，请人工确认")
+        if pending:
+            # 挂单的成交由 resume_pending_orders 结算，这里不重复入账
+            return False
+
+        local_amount = record.amount if record is not None and record.holding else 0.0
+        if _same_amount(local_amount, ledger["amount"]):
+            return False
+
+        record = position.ensure(symbol)
+        if ledger["amount"] <= 0:
+            log(f"🧾 {symbol} 交易所成交显示已清仓，本地持仓 {local_amount} 清空")
+            record.reset()
+            return True
+
+        entry_price = ledger["cost"] / ledger["amount"]
+        venue = ledger.get("venue") or record.venue
+        if record.holding:
+            record.amount = ledger["amount"]
+            record.entry_price = entry_price
+            record.buy_fee = ledger["fee"]
+            record.venue = venue
+        else:
+            trailing_pct = SYMBOL_CONFIGS.get(symbol, {}).get("trailing_stop_pct", 0.02)
+            record.open(entry_price, ledger["amount"], ledger["fee"], trailing_pct, venue=venue)
+        log(f"🧾 {symbol} 按交易所成交修正持仓：数量 {local_amount} -> {ledger['amount']}，入场价 {entry_price:.6f}")
+        return True
+
+
+# 全局对账器
+reconciler = Reconciler()
@@ -0,0 +1,210 @@
+# 📁 core/risk_engine.py
+
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from config.config import RISK_LIMITS
+from config.logger import log
+from config import clock as clock_module
+from notify.telegram import send_telegram_message
+
+# 风控状态文件（当日已实现盈亏、连续止损次数、熔断截止时间），重启后继续生效
+RISK_STATE_FILE = "risk_state.json"
+
+
+def asset_of(symbol: str) -> str:
+    """交易对的基础资产（BTC/USDT -> BTC），同一资产的不同报价对合并计算敞口"""
+    return symbol.split("/")[0]
+
+
+class RiskEngine:
+    """
+    账户级风控：在策略信号和下单之间检查每一笔开仓。
+
+    - 总敞口上限（max_gross_exposure）：所有持仓成本 + 挂单中的买入金额
+    - 单资产敞口上限（max_asset_exposure / asset_exposure_limits）
+    - 当日亏损上限（daily_loss_limit）：当日已实现净亏损达到上限后停止开仓
+    - 连续止损熔断（max_consecutive_stop_losses）：连续止损达到次数后暂停开仓 circuit_breaker_cooldown 秒
+
+    敞口按持仓成本（入场价 × 数量）计，各项汇总值在成交时增量更新，
+    因此每次检查都是 O(1)，不遍历持仓。卖出和止损永远不受限制。
+    所有方法只在主循环线程调用。
+    """
+
+    def __init__(self, limits: dict = None, state_file: str = RISK_STATE_FILE, clock=clock_module.now):
+        self.limits = RISK_LIMITS if limits is None else limits
+        self.state_file = state_file
+        self.clock = clock
+
+        self._exposure = {}           # symbol -> 持仓成本
+        self._asset_exposure = {}     # asset -> 持仓成本
+        self._gross = 0.0
+        self._reserved = {}           # symbol -> 挂单中的买入金额
+        self._asset_reserved = {}
+        self._reserved_total = 0.0
+
+        self._day = None
+        self._realized_pnl = 0.0
+        self._consecutive_stops = 0
+        self._tripped_until = 0.0
+        self._load_state()
+
+    # ===== 汇总值维护 =====
+
+    @staticmethod
+    def _add(table: dict, key: str, delta: float) -> float:
+        value = table.get(key, 0.0) + delta
+        if value <= 1e-9:
+            table.pop(key, None)
+            return 0.0
+        table[key] = value
+        return value
+
+    def set_exposure(self, symbol: str, cost: float):
+        """更新某个币种的持仓成本（建仓 / 部分卖出 / 清仓后调用），按差值调整汇总"""
+        delta = (cost or 0.0) - self._exposure.get(symbol, 0.0)
+        if not delta:
+            return
+        self._add(self._exposure, symbol, delta)
+        self._add(self._asset_exposure, asset_of(symbol), delta)
+        self._gross += delta
+        if self._gross <= 1e-9 or not self._exposure:
+            self._gross = 0.0
+
+    def reserve(self, symbol: str, notional: float):
+        """记录已通过检查、尚未成交的买入金额（同一币种同一时间只有一笔）"""
+        self.release(symbol)
+        self._reserved[symbol] = notional
+        self._add(self._asset_reserved, asset_of(symbol), notional)
+        self._reserved_total += notional
+
+    def release(self, symbol: str):
+        """买单成交或结束后释放预留金额"""
+        notional = self._reserved.pop(symbol, 0.0)
+        if notional:
+            self._add(self._asset_reserved, asset_of(symbol), -notional)
+            self._reserved_total -= notional
+            if self._reserved_total <= 1e-9 or not self._reserved:
+                self._reserved_total = 0.0
+
+    def rebuild(self, position):
+        """启动时按持仓集合重建敞口（仅此一次遍历）"""
+        self._exposure.clear()
+        self._asset_exposure.clear()
+        self._gross = 0.0
+        for symbol, record in position.items():
+            if record.holding and record.entry_price and record.amount:
+                self.set_exposure(symbol, record.entry_price * record.amount)
+
+    # ===== 当日盈亏 / 熔断 =====
+
+    def _today(self) -> str:
+        return datetime.fromtimestamp(self.clock()).strftime("%Y-%m-%d")
+
+    def _roll_day(self):
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._realized_pnl = 0.0
+
+    def record_close(self, symbol: str, net_profit: float, action: str):
+        """记录一次卖出成交的已实现盈亏，并更新连续止损计数"""
+        self._roll_day()
+        self._realized_pnl += net_profit
+        if action == "STOP_LOSS":
+            self._consecutive_stops += 1
+            max_stops = self.limits.get("max_consecutive_stop_losses")
+            if max_stops and self._consecutive_stops >= max_stops:
+                cooldown = self.limits.get("circuit_breaker_cooldown", 3600)
+                self._tripped_until = self.clock() + cooldown
+                self._consecutive_stops = 0
+                log(f"🧯 连续止损 {max_stops} 次，触发熔断，{cooldown} 秒内停止开仓")
+                send_telegram_message(f"🧯 连续止损 {max_stops} 次（最近: {symbol}），触发熔断，{cooldown} 秒内停止开仓")
+        else:
+            self._consecutive_stops = 0
+        self._save_state()
+
+    # ===== 下单前检查 =====
+
+    def check_buy(self, symbol: str, notional: float) -> Optional[str]:
+        """
+        检查一笔开仓是否允许。允许返回 None，否则返回拒绝原因。
+        """
+        limits = self.limits
+        now = self.clock()
+
+        if now < self._tripped_until:
+            return f"连续止损熔断中，剩余 {self._tripped_until - now:.0f} 秒"
+
+        self._roll_day()
+        daily_loss_limit = limits.get("daily_loss_limit")
+        if daily_loss_limit and -self._realized_pnl >= daily_loss_limit:
+            return f"当日亏损 {-self._realized_pnl:.2f} USDT 已达上限 {daily_loss_limit}"
+
+        max_gross = limits.get("max_gross_exposure")
+        gross = self._gross + self._reserved_total + notional
+        if max_gross and gross > max_gross:
+            return f"总敞口 {gross:.2f} USDT 将超过上限 {max_gross}"
+
+        asset = asset_of(symbol)
+        asset_cap = limits.get("asset_exposure_limits", {}).get(asset, limits.get("max_asset_exposure"))
+        asset_total = self._asset_exposure.get(asset, 0.0) + self._asset_reserved.get(asset, 0.0) + notional
+        if asset_cap and asset_total > asset_cap:
+            return f"{asset} 敞口 {asset_total:.2f} USDT 将超过上限 {asset_cap}"
+
+        return None
+
+    def snapshot(self) -> dict:
+        """当前风控汇总值（日志 / 监控用）"""
+        self._roll_day()
+        return {
+            "gross_exposure": self._gross,
+            "reserved": self._reserved_total,
+            "asset_exposure": dict(self._asset_exposure),
+            "realized_pnl_today": self._realized_pnl,
+            "consecutive_stop_losses": self._consecutive_stops,
+            "circuit_breaker_active": self.clock() < self._tripped_until,
+        }
+
+    # ===== 状态持久化 =====
+
+    def state(self) -> dict:
+        """需要跨重启保留的风控状态"""
+        return {
+            "day": self._day,
+            "realized_pnl": self._realized_pnl,
+            "consecutive_stop_losses": self._consecutive_stops,
+            "tripped_until": self._tripped_until,
+        }
+
+    def restore(self, state: dict):
+        self._day = state.get("day")
+        self._realized_pnl = state.get("realized_pnl", 0.0)
+        self._consecutive_stops = state.get("consecutive_stop_losses", 0)
+        self._tripped_until = state.get("tripped_until", 0.0)
+
+    def _load_state(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r") as f:
+                self.restore(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            log(f"⚠️ 读取风控状态失败，使用初始状态: {e}")
+
+    def _save_state(self):
+        if not self.state_file:
+            return
+        try:
+            tmp_file = self.state_file + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(self.state(), f)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            log(f"⚠️ 保存风控状态失败: {e}")
+
+
+# 全局风控实例
+risk_engine = RiskEngine()
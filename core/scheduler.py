@@ -0,0 +1,93 @@
+# 📁 core/scheduler.py
+
+import math
+
+from binance.simulator import timeframe_to_ms
+from config.config import (
+    INTERVAL, IDLE_INTERVAL, NEAR_STOP_INTERVAL, NEAR_STOP_PCT,
+    CANDLE_CLOSE_DELAY, MAX_ERROR_BACKOFF, STRATEGY_TIMEFRAME
+)
+
+
+class SymbolScheduler:
+    """
+    按币种自适应调度策略判断，代替固定间隔轮询：
+
+    - 每根 K 线收盘后 CANDLE_CLOSE_DELAY 秒，所有币种都会检查一次（指标在收盘时变化）
+    - 空仓币种两次收盘之间每 IDLE_INTERVAL 秒检查一次
+    - 持仓 / 有挂单的币种每 INTERVAL 秒检查一次
+    - 价格距止损线不足 NEAR_STOP_PCT 时每 NEAR_STOP_INTERVAL 秒检查一次
+    - 出错的币种按 INTERVAL × 2^(n-1) 指数退避（上限 MAX_ERROR_BACKOFF），成功一次即恢复
+
+    所有时间都以本轮开始时间为基准计算（不受本轮执行耗时影响，不累积漂移），
+    同样的行情和时间戳下调度结果完全确定，录制回放可以复现。
+    """
+
+    def __init__(self, timeframe: str = STRATEGY_TIMEFRAME):
+        self.timeframe_seconds = timeframe_to_ms(timeframe) / 1000
+        self._next_due = {}   # symbol -> 下次检查时间
+        self._errors = {}     # symbol -> 连续出错次数
+
+    def next_candle_close(self, now: float) -> float:
+        """
+        下一根 K 线收盘后的检查时间。
+        按 now - CANDLE_CLOSE_DELAY 取整：收盘后的延迟窗口内（刚收盘、尚未检查）返回本次收盘的检查时间，
+        不会跳过这根 K 线直接排到下一次收盘。
+        """
+        period = self.timeframe_seconds
+        return (math.floor((now - CANDLE_CLOSE_DELAY) / period) + 1) * period + CANDLE_CLOSE_DELAY
+
+    def due(self, symbols, now: float) -> list:
+        """按配置顺序返回本轮到期的币种（新出现的币种立即到期）"""
+        return [symbol for symbol in symbols if self._next_due.get(symbol, now) <= now]
+
+    def next_wake(self, symbols, now: float) -> float:
+        """最早到期的时间"""
+        return min((self._next_due.get(symbol, now) for symbol in symbols), default=now + INTERVAL)
+
+    def interval_for(self, holding_info, price: float, config: dict) -> float:
+        """按持仓状态和价格距止损线的距离决定下次检查间隔"""
+        if holding_info.pending_order:
+            return INTERVAL
+        if not holding_info.holding:
+            return IDLE_INTERVAL
+
+        entry_price = holding_info.entry_price
+        stops = [holding_info.trailing_stop_price]
+        if entry_price:
+            stops.append(entry_price * (1 - config.get("fixed_stop_loss_pct", 0.02)))
+        stop = max((s for s in stops if s), default=None)
+        if price and stop and price <= stop * (1 + NEAR_STOP_PCT):
+            return NEAR_STOP_INTERVAL
+        return INTERVAL
+
+    def on_success(self, symbol: str, now: float, interval: float):
+        """判断完成：在上次计划时间的基础上推进（落后时从本轮开始时间算起），且不晚于下一根 K 线收盘"""
+        self._errors.pop(symbol, None)
+        planned = self._next_due.get(symbol, now) + interval
+        if planned <= now:
+            planned = now + interval
+        self._next_due[symbol] = min(planned, self.next_candle_close(now))
+
+    def on_error(self, symbol: str, now: float) -> float:
+        """判断出错：指数退避，返回退避秒数"""
+        errors = self._errors[symbol] = self._errors.get(symbol, 0) + 1
+        delay = min(INTERVAL * 2 ** (errors - 1), MAX_ERROR_BACKOFF)
+        self._next_due[symbol] = now + delay
+        return delay
+
+    def forget(self, symbol: str):
+        """币种被移除或配置变化时清除调度状态（下一轮立即检查）"""
+        self._next_due.pop(symbol, None)
+        self._errors.pop(symbol, None)
+
+    def snapshot(self) -> dict:
+        """各币种的下次检查时间和连续出错次数（日志 / 监控用）"""
+        return {
+            symbol: {"next_due": due, "errors": self._errors.get(symbol, 0)}
+            for symbol, due in self._next_due.items()
+        }
+
+
+# 全局调度器
+scheduler = SymbolScheduler()
@@ -4,8 +4,17 @@ from datetime import datetime
 from config.logger import log
 from config.position import save_position
 from notify.telegram import send_telegram_message
-from config.config import SYMBOL_CONFIGS, DRY_RUN, TRADE_FEE_RATE
-from binance.services import place_order
+from config.config import SYMBOL_CONFIGS, DRY_RUN, MAX_SLIPPAGE_PCT
+from binance.services import place_order, get_order
+from binance.order_manager import order_manager, get_fill_fee
+from binance.execution import start_execution, resume_execution
+from binance.venues import venues
+from core.risk_engine import risk_engine
+from core.metrics import metrics
+
+
+# 交易记录 CSV 所在目录（回放模式下改为单独目录，避免混入实盘记录）
+TRADE_LOG_DIR = "logs"
 
 
 def get_local_time():
@@ -13,7 +22,7 @@ def get_local_time():
 
 def get_trade_log_path():
     date_str = datetime.now().strftime("%Y-%m-%d")
-    return f"logs/trade_history_{date_str}.csv"
+    return f"{TRADE_LOG_DIR}/trade_history_{date_str}.csv"
 
 def record_trade_to_csv(symbol, action, price, amount=None, profit=None, pct=None, reason=None, buy_fee=None, sell_fee=None):
     path = get_trade_log_path()
@@ -42,58 +51,167 @@ def record_trade_to_csv(symbol, action, price, amount=None, profit=None, pct=Non
         log(f"⚠️ 写入交易日志失败: {e}")
 
 def reset_position(symbol, position):
-    position[symbol] = {
-        "holding": False,
-        "entry_price": None,
-        "amount": None,
-        "trailing_stop_price": None,
-        "max_price": None,
-        "buy_fee": None
+    position.ensure(symbol).reset()
+
+def submit_order(symbol, side, amount, tag=None, urgent=False, venue=None, market_price=None):
+    """
+    按币种配置的下单方式（order_type / execution / venue）提交订单。
+    urgent=True（如止损）时强制使用单笔市价单，且不做滑点检查和比价，保证尽快离场。
+    venue 为指定的交易所（卖出时为持仓的开仓交易所），None 时使用币种配置；
+    卖出只能在持币的交易所下单，因此不按最优报价路由。
+    market_price 为本轮已取得的最新价，传入时下单前不再重复请求行情。
+    """
+    # 币种可能已被热加载移除（仍有持仓需要卖出），缺少配置时按默认方式下单
+    config = SYMBOL_CONFIGS.get(symbol, {})
+    venue = venue or config.get("venue")
+    if venue == "best" and (urgent or side == "SELL"):
+        venue = None
+
+    # 配置了执行算法时由算法拆单异步执行（只在默认交易所下单），母单以挂单形式等待汇总成交事件
+    if config.get("execution") and not urgent and venue in (None, "best", venues.default):
+        order = start_execution(symbol, side, amount, config["execution"], tag=tag)
+    else:
+        order_type = "MARKET" if urgent else config.get("order_type", "MARKET")
+        order = place_order(
+            symbol, side, amount,
+            order_type=order_type,
+            price_offset_pct=config.get("limit_offset_pct", 0.0005),
+            timeout_seconds=config.get("limit_timeout", 20),
+            reprice=config.get("limit_reprice", False),
+            max_reprices=config.get("limit_max_reprices", 3),
+            tag=tag,
+            max_slippage_pct=None if urgent else config.get("max_slippage_pct", MAX_SLIPPAGE_PCT),
+            venue=venue,
+            market_price=market_price
+        )
+
+    metrics.inc("bot_orders_total", side=side.lower(), result="success" if order else "failure")
+    return order
+
+def fill_from_order(order):
+    """将订单回执转换为统一的成交汇总结构（与订单管理器事件字段一致）"""
+    filled = order.get("filled") or 0.0
+    return {
+        "filled": filled,
+        "average": order.get("average") or order.get("price"),
+        "fee": get_fill_fee(order) if filled else 0.0,
+        "complete": order.get("status") == "closed",
+        "venue": order.get("venue"),
     }
 
 def handle_buy(symbol, price, position):
-    config = SYMBOL_CONFIGS[symbol]
-    trailing_pct = config.get("trailing_stop_pct", 0.02)
-    amount = config.get("amount", 0.01)
-    fee_rate = config.get("fee_rate", TRADE_FEE_RATE)
+    if position.ensure(symbol).pending_order:
+        return
+
+    amount = SYMBOL_CONFIGS[symbol].get("amount", 0.01)
+
+    # 风控检查：总敞口 / 单资产敞口 / 当日亏损 / 连续止损熔断
+    notional = price * amount
+    reject_reason = risk_engine.check_buy(symbol, notional)
+    if reject_reason:
+        log(f"🛡️ {symbol} 风控拒绝开仓：{reject_reason}")
+        return
+    risk_engine.reserve(symbol, notional)
+
+    # 先下单，按实际成交价/成交量记录持仓（模拟盘由本地撮合引擎成交）
+    try:
+        order = submit_order(symbol, "BUY", amount, tag={"action": "BUY"}, market_price=price)
+    except Exception as e:
+        # 任何异常都不能留下占用的风控额度（如执行算法参数错误）
+        log(f"❌ {symbol} 买入下单出错: {e}")
+        order = None
+    if not order:
+        risk_engine.release(symbol)
+        log(f"⚠️ {symbol} 买入下单失败，保持空仓")
+        return
+
+    # 限价单挂出未成交：记录挂单，成交后由 process_order_events 入账
+    if order.get("status") == "open":
+        position[symbol].pending_order = order["id"]
+        save_position(position)
+        log(f"⏳ {symbol} 买入限价单已挂出（ID: {order['id']}），等待成交")
+        return
+
+    apply_buy_fill(symbol, fill_from_order(order), position)
+
+def apply_buy_fill(symbol, fill, position):
+    """按实际成交结果建立持仓并通知/记录"""
+    risk_engine.release(symbol)
+    if not fill["filled"]:
+        log(f"⚠️ {symbol} 买入未成交，保持空仓")
+        return
+
+    # 挂单期间币种可能已被热加载移除，成交仍需入账
+    trailing_pct = SYMBOL_CONFIGS.get(symbol, {}).get("trailing_stop_pct", 0.02)
+    price = fill["average"]
+    amount = fill["filled"]
+    fee = fill["fee"]
 
     total_cost = price * amount
-    fee = total_cost * fee_rate
     cost_with_fee = total_cost + fee
 
-    position[symbol] = {
-        "holding": True,
-        "amount": amount,
-        "entry_price": price,
-        "trailing_stop_price": price * (1 - trailing_pct),
-        "max_price": price,
-        "buy_fee": fee
-    }
+    record = position.ensure(symbol)
+    if record.holding:
+        # 执行算法遗留子单的后续成交（见 binance/execution.py 的 unresolved），并入已有持仓
+        record.add(price, amount, fee)
+    else:
+        # 执行算法的母单没有交易所信息，在默认交易所成交
+        record.open(price, amount, fee, trailing_pct, venue=fill.get("venue") or venues.default)
+    risk_engine.set_exposure(symbol, record.entry_price * record.amount)
 
     save_position(position)
 
-    log(f"✅ 买入 {symbol} @ {price:.6f}，数量: {amount}, 手续费: {fee:.6f}, 总成本: {cost_with_fee:.2f} USDT")
+    mode = "模拟" if DRY_RUN else ""
+    log(f"✅ {mode}买入 {symbol} @ {price:.6f}，数量: {amount}, 手续费: {fee:.6f}, 总成本: {cost_with_fee:.2f} USDT")
     send_telegram_message(
-        f"🟢 模拟买入 {symbol}\n"
+        f"🟢 {mode}买入 {symbol}\n"
         f"价格: {price:.6f} USDT\n"
         f"数量: {amount}\n"
         f"买入手续费: {fee:.6f}\n"
         f"总成本: {cost_with_fee:.2f} USDT"
     )
 
-    if not DRY_RUN:
-        place_order(symbol, "BUY", amount, order_type="MARKET")
-
     record_trade_to_csv(symbol, "BUY", price, amount=amount, buy_fee=fee)
 
 def finalize_trade(symbol, price, holding_info, position, action="SELL", reason=None, ignore_min_profit=False):
+    if holding_info.pending_order:
+        return
+
+    # 先下单，确认成交后再计算盈亏和清仓（模拟盘由本地撮合引擎成交，含滑点）；在开仓的交易所卖出
+    order = submit_order(
+        symbol, "SELL", holding_info.amount,
+        tag={"action": action, "reason": reason},
+        urgent=(action == "STOP_LOSS"),
+        venue=holding_info.venue,
+        market_price=price
+    )
+    if not order:
+        log(f"⚠️ {symbol} 卖出下单失败，保留持仓等待下一轮")
+        return
+
+    if order.get("status") == "open":
+        holding_info.pending_order = order["id"]
+        save_position(position)
+        log(f"⏳ {symbol} 卖出限价单已挂出（ID: {order['id']}），等待成交")
+        return
+
+    settle_sell(symbol, fill_from_order(order), holding_info, position, action=action, reason=reason)
+
+def settle_sell(symbol, fill, holding_info, position, action="SELL", reason=None):
+    """按实际卖出成交结果计算盈亏、通知、记录，并更新持仓"""
+    if not fill["filled"]:
+        log(f"⚠️ {symbol} 卖出未成交，保留持仓等待下一轮")
+        return
+
     # 从持仓信息中获取买入价格、买入数量、买入手续费
-    entry_price = holding_info["entry_price"]
-    amount = holding_info.get("amount", 0.01)
-    buy_fee = holding_info.get("buy_fee", 0.0)
+    entry_price = holding_info.entry_price
+    held_amount = holding_info.amount
+    held_buy_fee = holding_info.buy_fee or 0.0
 
-    # 获取当前交易对的手续费率（默认使用全局设置）
-    fee_rate = SYMBOL_CONFIGS[symbol].get("fee_rate", TRADE_FEE_RATE)
+    price = fill["average"]
+    amount = fill["filled"]
+    # 部分成交时按比例分摊买入手续费
+    buy_fee = held_buy_fee * min(amount / held_amount, 1.0) if held_amount else held_buy_fee
 
     # 最小可接受的净利润门槛（比如 0.5 USDT），只有非止损才判断
    # MIN_PROFIT_USDT = SYMBOL_CONFIGS[symbol].get("min_profit", 0.5)
@@ -101,8 +219,8 @@ def finalize_trade(symbol, price, holding_info, position, action="SELL", reason=
     # 计算本次卖出收入（未扣手续费）
     sell_total = price * amount
 
-    # 卖出手续费
-    sell_fee = sell_total * fee_rate
+    # 卖出手续费（以实际成交回执为准）
+    sell_fee = fill["fee"]
 
     # 计算净利润：卖出收益 - 买入成本 - 买入手续费 - 卖出手续费
     net_profit = sell_total - (entry_price * amount) - buy_fee - sell_fee
@@ -122,16 +240,16 @@ def finalize_trade(symbol, price, holding_info, position, action="SELL", reason=
 
     # 表情和文案根据类型（正常卖出 or 止损）切换
     emoji = "🔴" if action == "SELL" else "🔻"
-    result_text = "卖出" if action == "SELL" else "止损卖出"
+    result_text = ("模拟" if DRY_RUN else "") + ("卖出" if action == "SELL" else "止损卖出")
 
     # 日志记录卖出成功详情
     log(
-        f"✅ 模拟{result_text} {symbol} @ {price:.6f}，数量: {amount}，净盈亏: {net_profit:.6f}（{pct:.2f}%），卖出手续费: {sell_fee:.6f}"
+        f"✅ {result_text} {symbol} @ {price:.6f}，数量: {amount}，净盈亏: {net_profit:.6f}（{pct:.2f}%），卖出手续费: {sell_fee:.6f}"
     )
 
     # 发送 Telegram 通知，显示盈亏详情
     send_telegram_message(
-        f"{emoji} 模拟{result_text} {symbol}\n"
+        f"{emoji} {result_text} {symbol}\n"
         f"买入价: {entry_price:.6f}，卖出价: {price:.6f}\n"
         f"数量: {amount}\n"
         f"总手续费: {buy_fee + sell_fee:.6f} USDT\n"
@@ -139,10 +257,6 @@ def finalize_trade(symbol, price, holding_info, position, action="SELL", reason=
         + (f"\n原因: {reason}" if reason else "")
     )
 
-    # 实盘环境下才发送实际订单（此处为市价单）
-    if not DRY_RUN:
-        place_order(symbol, "SELL", amount, order_type="MARKET")
-
     # 写入交易记录 CSV 文件
     record_trade_to_csv(
         symbol, action, price, amount=amount,
@@ -150,14 +264,87 @@ def finalize_trade(symbol, price, holding_info, position, action="SELL", reason=
         buy_fee=buy_fee, sell_fee=sell_fee
     )
 
-    # 清空仓位状态
-    reset_position(symbol, position)
+    # 全部成交则清空仓位状态，部分成交则保留剩余数量，并累计已实现盈亏
+    remaining = held_amount - amount
+    closed_profit = None
+    if remaining > 0 and not fill["complete"]:
+        holding_info.amount = remaining
+        holding_info.buy_fee = held_buy_fee - buy_fee
+        holding_info.realized_pnl = (holding_info.realized_pnl or 0.0) + net_profit
+        log(f"⚠️ {symbol} 部分成交，剩余持仓 {remaining}")
+    else:
+        closed_profit = (holding_info.realized_pnl or 0.0) + net_profit
+        reset_position(symbol, position)
+
+    # 更新风控汇总：剩余持仓成本；全部平仓时按整笔持仓的合计盈亏更新已实现盈亏和连续止损计数
+    # （部分成交不计数，否则一笔分多次成交的止损会被算成多次，提前触发熔断）
+    holding_info = position.ensure(symbol)
+    risk_engine.set_exposure(symbol, holding_info.entry_price * holding_info.amount if holding_info.holding else 0.0)
+    if closed_profit is not None:
+        risk_engine.record_close(symbol, closed_profit, action)
     save_position(position)
 
 
 def handle_sell(symbol, price, holding_info, position):
     finalize_trade(symbol, price, holding_info, position, action="SELL")
 
-def handle_stop_loss(symbol, price, holding_info, position):
-    reason = holding_info.get("stop_reason", "unknown")
+def handle_stop_loss(symbol, price, holding_info, position, reason="unknown"):
     finalize_trade(symbol, price, holding_info, position, action="STOP_LOSS", reason=reason, ignore_min_profit=True)
+
+def process_order_events(position):
+    """
+    处理后台订单管理器汇总的限价单结束事件（在主循环线程中调用，避免跨线程修改持仓）。
+    """
+    for event in order_manager.drain_events():
+        symbol = event["symbol"]
+        tag = event.get("tag") or {}
+        holding_info = position.ensure(symbol)
+        holding_info.pending_order = None
+
+        fill = {
+            "filled": event["filled"],
+            "average": event["average"],
+            "fee": event["fee"],
+            "complete": event["status"] == "closed",
+            "venue": event.get("venue"),
+        }
+        if tag.get("action", "BUY" if event["side"] == "BUY" else "SELL") == "BUY":
+            apply_buy_fill(symbol, fill, position)
+        else:
+            settle_sell(symbol, fill, holding_info, position, action=tag.get("action", "SELL"), reason=tag.get("reason"))
+        if tag.get("resume"):
+            # 执行算法还有状态未确认的子单：保持挂单标记，下次启动由 resume_pending_orders 结算
+            position[symbol].pending_order = tag["resume"]
+            log(f"⚠️ {symbol} 母单 {tag['resume']} 有未确认的子单，暂停该币种交易直到下次启动结算")
+        save_position(position)
+
+def resume_pending_orders(position):
+    """
+    启动时接管上次运行遗留的挂单：仍未完成的挂单立即按超时处理（撤单并结算已成交部分），
+    已结束的挂单直接结算；执行算法母单按保存的子单结算；查询失败则清除挂单标记。
+    """
+    for symbol, holding_info in position.items():
+        order_id = holding_info.pending_order
+        if not order_id:
+            continue
+        if str(order_id).startswith("algo-"):
+            if not resume_execution(order_id):
+                log(f"⚠️ 找不到执行算法母单 {symbol} {order_id} 的状态，清除挂单标记")
+                holding_info.pending_order = None
+            continue
+        try:
+            # 卖出挂单在持仓的开仓交易所；买入挂单按币种配置（"best" 只路由市价单，限价单在默认交易所）
+            venue = holding_info.venue if holding_info.holding else None
+            venue = venue or SYMBOL_CONFIGS.get(symbol, {}).get("venue")
+            venue = None if venue == "best" else venue
+            order = get_order(order_id, symbol, venue)
+        except Exception as e:
+            log(f"⚠️ 无法查询遗留挂单 {symbol} {order_id}: {e}，清除挂单标记")
+            holding_info.pending_order = None
+            continue
+
+        action = "BUY" if order["side"] == "buy" else "SELL"
+        order_manager.track(order, symbol, action, timeout_seconds=0, tag={"action": action}, venue=venue)
+        if order.get("status") != "open":
+            order_manager.handle_order_update(order)
+    save_position(position)
@@ -1,87 +1,233 @@
 # 📁 core/strategy_runner.py
 
-import time
-from config.config import SYMBOL_CONFIGS, INTERVAL
+from config.config import (
+    SYMBOL_CONFIGS, SYMBOL_CONFIG_FILE, INTERVAL, MAX_ERROR_BACKOFF, STRATEGY_TIMEFRAME, ORDER_BOOK_STREAM,
+    RECONCILE_ON_STARTUP
+)
+from config.symbol_loader import SymbolConfigWatcher
 from config.logger import log
+from config import clock
 from config.position import load_position, save_position, update_trailing_stop
-from binance.services import get_ticker_price
-from core.signal_handler import handle_buy, handle_sell, handle_stop_loss
+from binance.services import get_ticker, reset_precision_cache
+from binance.exchange import get_exchange
+from binance.depth_stream import depth_stream
+from binance.order_manager import order_manager
+from binance.venues import venues
+from binance.execution import step_executions
+from binance.simulator import SimulatedExchange
+from core.risk_engine import risk_engine
+from core.reconciler import reconciler
+from core.journal import journal
+from core.metrics import metrics, start_metrics_server
+from core.profiler import allocation_tracker, install_signal_handlers
+from core.scheduler import scheduler
+from core.signal_handler import (
+    handle_buy, handle_sell, handle_stop_loss, process_order_events, resume_pending_orders
+)
 
 from strategies.simple_threshold_strategy import SimpleThresholdStrategy
 from strategies.macd_kdj_strategy import MACDKDJStrategy
-from data.indicator_fetcher import get_strategy_indicators
+from data.indicator_fetcher import get_strategy_indicators, reset_indicator_state
+from data.data_quality import is_ticker_stale, reset_candle_cache
+from data.order_book import order_books
 
 
-def ensure_position(symbol, position):
+def on_symbol_config_changed(symbol, old_config, new_config):
     """
-    确保每个币种的持仓结构存在，避免后续操作报错。
+    币种配置热加载回调：只针对参数发生变化的币种重建相关状态。
+    持仓状态保留不动。
     """
-    if symbol not in position:
-        position[symbol] = {
-            "holding": False,
-            "entry_price": None,
-            "trailing_stop_price": None,
-            "max_price": None
-        }
-
-def run_loop():
+    if new_config is None:
+        log(f"➖ {symbol} 已从配置中移除，停止监控（已有持仓保留在 position.json 中）")
+        metrics.forget_symbol(symbol)
+        reset_candle_cache(symbol)
+    elif old_config is None:
+        log(f"➕ 新增监控币种 {symbol}")
+
+    # 增量深度推送按最新的币种列表订阅（未启动时只记录列表）
+    depth_stream.set_symbols(SYMBOL_CONFIGS)
+
+    # 指标参数可能变化，丢弃该币种的指标历史，下一轮立即按新参数重建
+    reset_indicator_state(symbol)
+    scheduler.forget(symbol)
+
+    # 模拟交易所的市场精度来自币种配置，需要重建（TRADING_VENUES 中的各个模拟交易所也一样）
+    clients = {id(client): client for client in [get_exchange()] + [
+        venues.get(name).client for name in venues.names(trading_only=True)
+    ]}
+    simulators = [client for client in clients.values() if isinstance(client, SimulatedExchange)]
+    for exchange in simulators:
+        exchange.load_markets(reload=True)
+    if simulators:
+        reset_precision_cache(symbol)
+
+def evaluate_symbol(strategy, symbol, config, position):
+    """
+    对单个币种执行一次完整的策略判断：取价格和指标 → 更新移动止损 → 买入 / 卖出 / 止损。
+    返回本次使用的价格（有挂单等待结算时返回 None），异常向上抛出由调度器退避重试。
+    """
+    # ✅ 初始化该币种仓位结构
+    holding_info = position.ensure(symbol)
+
+    # 有挂单未完成时不再重复下单，等待订单管理器结算
+    if holding_info.pending_order:
+        log(f"⏳ {symbol} 存在未完成挂单，跳过本轮策略判断")
+        journal.record_decision(symbol, "WAIT")
+        return None
+
+    # 获取实时价格
+    ticker = get_ticker(symbol)
+    price = ticker["last"]
+    metrics.observe_price(symbol, price)
+    log(f"📈 当前 {symbol} 价格：{price:.6f} USDT")
+
+    # 获取技术指标（MACD / KDJ / ATR）
+    indicators = get_strategy_indicators(
+        symbol=symbol,
+        timeframe=STRATEGY_TIMEFRAME,
+        limit=200,
+        macd_params=config.get("macd_params", (12, 26, 9)),
+        kdj_params=config.get("kdj_params", (9, 3, 3)),
+        atr_window=config.get("atr_window", 14)
+    )
+
+    # 行情快照过期时价格不可信，本轮不做任何判断
+    if is_ticker_stale(symbol, ticker, indicators.timestamp or None):
+        journal.record_decision(symbol, "SKIP", price, "stale_ticker")
+        return price
+
+    # ✅ 更新移动止损线和最大价格
+    if update_trailing_stop(holding_info, price, config["trailing_stop_pct"]):
+        # 保存最新仓位状态
+        save_position(position)
+
+    # K 线数据不完整（为空 / 有缺口 / 交易所延迟）时不开仓、不按技术面卖出，只检查止损
+    degraded = indicators.degraded
+    if degraded:
+        log(f"⚠️ {symbol} 指标数据不完整（{', '.join(indicators.issues)}），本轮只检查止损")
+
+    # 本地盘口摘要（BookTop），未同步 / 过期 / 录制回放时为 None
+    order_book = order_books.top(symbol)
+
+    # 策略判断
+    if not degraded and strategy.should_buy(symbol, price, holding_info, indicators=indicators, order_book=order_book):
+        journal.record_decision(symbol, "BUY", price)
+        handle_buy(symbol, price, position)
+
+    elif not degraded and strategy.should_sell(symbol, price, holding_info, indicators=indicators, order_book=order_book):
+        journal.record_decision(symbol, "SELL", price)
+        handle_sell(symbol, price, holding_info, position)
+
+    elif stop_reason := strategy.evaluate_stop_loss(symbol, price, holding_info, indicators=indicators, order_book=order_book):
+        # ✅ 止损原因由策略单独返回（便于日志/记录）
+        journal.record_decision(symbol, "STOP_LOSS", price, stop_reason)
+        handle_stop_loss(symbol, price, holding_info, position, reason=stop_reason)
+
+    else:
+        journal.record_decision(symbol, "HOLD", price, ",".join(indicators.issues) or None)
+        log(f"⌛ {symbol} 无操作（未触发策略买卖条件）")
+
+    return price
+
+def publish_metrics(position, cycle_duration):
+    """每轮结束时在主线程发布指标，HTTP 线程抓取时只读注册表，不访问持仓 / 风控对象"""
+    metrics.observe_cycle(cycle_duration)
+    metrics.set("bot_open_positions", sum(1 for record in position.values() if record.holding))
+
+    risk = risk_engine.snapshot()
+    metrics.set("bot_gross_exposure_usdt", risk["gross_exposure"])
+    metrics.set("bot_realized_pnl_today_usdt", risk["realized_pnl_today"])
+    metrics.set("bot_circuit_breaker_active", int(risk["circuit_breaker_active"]))
+
+    for symbol, state in scheduler.snapshot().items():
+        metrics.set("bot_symbol_consecutive_errors", state["errors"], symbol=symbol)
+
+def run_loop(max_cycles: int = None):
     """
     主运行循环函数，负责：
     - 获取价格和技术指标
     - 执行买入 / 卖出 / 止损操作
     - 更新仓位信息并保存
-    - 每 INTERVAL 秒执行一次
+    - 处理后台订单管理器汇总的限价单成交
+    - 启动时按交易所成交记录修正本地持仓（core/reconciler.py，模拟交易所和回放时跳过）
+    - 热加载 config/symbols.toml 中的币种配置
+    - 按 core/scheduler.py 的自适应调度只判断到期的币种（K 线收盘对齐、接近止损时加密检查、出错退避），
+      空闲时最多等待 INTERVAL 秒，以便及时结算挂单和应用配置变更
+    - 开启录制 / 回放时（core/journal.py）记录或比对每轮的行情和决策
+    - 每轮结束时发布监控指标，并在后台线程提供 /metrics 与 /healthz（core/metrics.py，回放时不启动）
+    - 按信号 / 接口触发 CPU 采样和逐轮内存分配跟踪（core/profiler.py）
+    - 订阅增量深度推送维护本地盘口（data/order_book.py），供策略和下单滑点检查使用（录制 / 回放时不启动）
+
+    参数:
+        max_cycles (int): 最多运行的轮数，None 表示一直运行（回放时为录制的轮数）
     """
     strategy = MACDKDJStrategy()
     position = load_position()
 
+    # 以交易所成交记录为准修正崩溃遗留的不一致（模拟交易所每次启动都是新账户，无需对账）
+    if RECONCILE_ON_STARTUP and not journal.replaying and not isinstance(get_exchange(), SimulatedExchange):
+        reconciler.run(position)
+
+    # 按已有持仓重建风控敞口
+    risk_engine.rebuild(position)
+
+    # 接管上次遗留的挂单，并启动后台订单轮询线程
+    resume_pending_orders(position)
+    if not journal.replaying:
+        # 录制时与回放一样由主循环同步轮询挂单，保证挂单结算所在的轮次可以复现
+        if not journal.recording:
+            order_manager.start()
+        start_metrics_server()
+        if ORDER_BOOK_STREAM and not journal.recording:
+            depth_stream.start(SYMBOL_CONFIGS)
+    install_signal_handlers()
+
+    # 币种配置热加载
+    config_watcher = SymbolConfigWatcher(SYMBOL_CONFIG_FILE, SYMBOL_CONFIGS)
+    config_watcher.register_hook(on_symbol_config_changed)
+
     log("🚀 模拟量化交易机器人启动！")
 
-    while True:
+    cycles = 0
+    loop_errors = 0
+    while max_cycles is None or cycles < max_cycles:
+        cycles += 1
         try:
-            for symbol, config in SYMBOL_CONFIGS.items():
-                # ✅ 初始化该币种仓位结构
-                ensure_position(symbol, position)
-
-                # 获取实时价格
-                price = get_ticker_price(symbol)
-                log(f"📈 当前 {symbol} 价格：{price:.6f} USDT")
-
-                holding_info = position[symbol]
-
-                # ✅ 更新移动止损线和最大价格
-                if update_trailing_stop(position[symbol], price, config["trailing_stop_pct"]):
-                    # 保存最新仓位状态
-                     save_position(position)
-                
-                # 获取技术指标（MACD / KDJ / ATR）
-                indicators = get_strategy_indicators(
-                    symbol=symbol,
-                    timeframe="1m",
-                    limit=200,
-                    macd_params=config.get("macd_params", (12, 26, 9)),
-                    kdj_params=config.get("kdj_params", (9, 3, 3)),
-                    atr_window=config.get("atr_window", 14)
-                )
-
-                # 策略判断
-                if strategy.should_buy(symbol, price, holding_info, indicators=indicators):
-                    handle_buy(symbol, price, position)
-
-                elif strategy.should_sell(symbol, price, holding_info, indicators=indicators):
-                    handle_sell(symbol, price, holding_info, position)
-
-                elif strategy.should_stop_loss(symbol, price, holding_info, indicators=indicators):
-                    # ✅ 添加止损原因到持仓（便于日志/记录）
-                    stop_reason = indicators.get("stop_reason", "unknown")
-                    position[symbol]["stop_reason"] = stop_reason
-                    handle_stop_loss(symbol, price, holding_info, position)
-
-                else:
-                    log(f"⌛ {symbol} 无操作（未触发策略买卖条件）")
-
-            time.sleep(INTERVAL)
+            # ✅ 在两轮之间应用配置变更（对本轮而言是原子的）
+            journal.begin_cycle(config_watcher)
+            cycle_start = clock.now()
+
+            # 录制 / 回放时不启动后台线程，由主循环同步轮询挂单、推进执行算法，保证顺序确定
+            if journal.recording or journal.replaying:
+                order_manager.poll()
+                step_executions()
+
+            # ✅ 先结算上一轮挂出的限价单
+            process_order_events(position)
+
+            for symbol in scheduler.due(SYMBOL_CONFIGS, cycle_start):
+                config = SYMBOL_CONFIGS[symbol]
+                try:
+                    price = evaluate_symbol(strategy, symbol, config, position)
+                except Exception as e:
+                    delay = scheduler.on_error(symbol, cycle_start)
+                    log(f"❌ {symbol} 处理出错：{e}，{delay:.0f} 秒后重试")
+                    continue
+                scheduler.on_success(symbol, cycle_start, scheduler.interval_for(position.ensure(symbol), price, config))
+
+            journal.end_cycle()
+            publish_metrics(position, clock.now() - cycle_start)
+            allocation_tracker.on_cycle(cycles)
+            loop_errors = 0
+
+            # 按最早到期的币种计算等待时间（扣除本轮耗时）
+            wake = min(scheduler.next_wake(SYMBOL_CONFIGS, cycle_start), cycle_start + INTERVAL)
+            clock.sleep(max(wake - clock.now(), 0))
 
         except Exception as e:
-            log(f"❌ 出现错误：{e}")
-            time.sleep(5)
\ No newline at end of file
+            loop_errors += 1
+            metrics.inc("bot_cycle_errors_total")
+            delay = min(INTERVAL * 2 ** (loop_errors - 1), MAX_ERROR_BACKOFF)
+            log(f"❌ 出现错误：{e}，{delay:.0f} 秒后重试")
+            journal.end_cycle()
+            clock.sleep(delay)
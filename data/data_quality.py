@@ -0,0 +1,202 @@
+# 📁 data/data_quality.py
+
+import threading
+
+from binance.exchange import get_exchange
+from binance.simulator import timeframe_to_ms
+from config import clock as clock_module
+from config.config import MAX_CACHED_SYMBOLS
+from config.logger import log
+from data.lru_cache import LRUCache
+
+# 每次获取 K 线时最多补拉的缺口数量（避免交易所异常时请求风暴）
+MAX_BACKFILL_REQUESTS = 3
+
+# 最新 K 线的开盘时间落后当前时间超过 N 个周期，视为交易所行情延迟
+MAX_CANDLE_LAG_PERIODS = 2
+
+# 行情快照的时间戳落后当前时间超过该秒数，视为过期
+MAX_TICKER_AGE_SECONDS = 30
+
+# 行情快照早于最新 K 线开盘时间的容忍度（毫秒），避免整分钟切换时先取快照、后取 K 线造成误判
+TICKER_CANDLE_TOLERANCE_MS = 5000
+
+# 数据质量计数（累计值，供日志 / 监控读取）
+_stats = {
+    "empty_responses": 0,     # K 线请求返回空数据
+    "gaps_detected": 0,       # 发现的 K 线缺口数量
+    "candles_missing": 0,     # 缺口中缺少的 K 线根数
+    "candles_backfilled": 0,  # 通过补拉找回的 K 线根数
+    "gaps_unfilled": 0,       # 补拉后仍然存在的缺口数量
+    "lagging_candles": 0,     # 最新 K 线明显落后（交易所延迟）
+    "stale_tickers": 0,       # 过期的行情快照
+}
+_stats_lock = threading.Lock()
+
+# 每个「币种@周期」缓存的 K 线窗口：(symbol, timeframe) -> RingBuffer（容量 = limit，列为 OHLCV，键为开盘时间）
+# 只在主循环线程中访问
+_candle_buffers = LRUCache(MAX_CACHED_SYMBOLS)
+
+
+def _count(name: str, n: int = 1):
+    with _stats_lock:
+        _stats[name] += n
+
+
+def get_data_quality_stats() -> dict:
+    """返回数据质量计数的副本"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_candle_cache(symbol: str = None):
+    """丢弃某个币种（None 表示全部）缓存的 K 线窗口，下一次全量拉取"""
+    for key in _candle_buffers.keys():
+        if symbol is None or key[0] == symbol:
+            _candle_buffers.pop(key)
+
+
+def normalize_candles(candles) -> list:
+    """按开盘时间排序并去重（同一时间戳保留最后一条，即最新的未收盘 K 线）"""
+    by_time = {}
+    for candle in candles or ():
+        by_time[int(candle[0])] = candle
+    return [by_time[t] for t in sorted(by_time)]
+
+
+def find_gaps(candles: list, timeframe_ms: int) -> list:
+    """
+    检查 K 线连续性，返回缺口列表 [(第一根缺失的开盘时间, 缺失根数), ...]。
+    candles 需已按时间排序。
+    """
+    gaps = []
+    for prev, cur in zip(candles, candles[1:]):
+        missing = (int(cur[0]) - int(prev[0])) // timeframe_ms - 1
+        if missing > 0:
+            gaps.append((int(prev[0]) + timeframe_ms, missing))
+    return gaps
+
+
+def _backfill(symbol: str, timeframe: str, candles: list, gaps: list) -> list:
+    """按缺口范围定向补拉 K 线并合并，补拉失败时保留原数据"""
+    exchange = get_exchange()
+    fetched = []
+    for since, missing in gaps[:MAX_BACKFILL_REQUESTS]:
+        try:
+            fetched.extend(exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=missing) or [])
+        except Exception as e:
+            log(f"⚠️ {symbol}@{timeframe} 补拉 K 线失败（since={since}）: {e}")
+    if not fetched:
+        return candles
+
+    known = {int(c[0]) for c in candles}
+    window_start, window_end = int(candles[0][0]), int(candles[-1][0])
+    added = [c for c in fetched if window_start < int(c[0]) < window_end and int(c[0]) not in known]
+    if added:
+        _count("candles_backfilled", len(added))
+    return normalize_candles(candles + added)
+
+
+def _fetch_window(symbol: str, timeframe: str, limit: int, timeframe_ms: int) -> list:
+    """
+    获取最近 limit 根 K 线：已有缓存时只增量拉取缓存中最后一根（上次未收盘）K 线及之后的数据，
+    与缓存合并；没有缓存、缓存容量与 limit 不同、缓存已落后整个窗口或增量结果为空时全量拉取。
+    """
+    exchange = get_exchange()
+    buffer = _candle_buffers.get((symbol, timeframe))
+    if buffer is not None and buffer.capacity == limit and len(buffer):
+        last_key = buffer.last_key
+        behind = int(clock_module.now() * 1000 - last_key) // timeframe_ms
+        if 0 <= behind < limit - 1:
+            fetched = normalize_candles(
+                exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=last_key, limit=behind + 2)
+            )
+            fresh = [c for c in fetched if int(c[0]) >= last_key]
+            if fresh:
+                first_fresh = int(fresh[0][0])
+                cached = [
+                    [key, *row]
+                    for key, row in zip(buffer.keys().tolist(), buffer.to_array().tolist())
+                    if key < first_fresh
+                ]
+                return (cached + fresh)[-limit:]
+
+    return normalize_candles(exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit))
+
+
+def _store_window(symbol: str, timeframe: str, limit: int, candles: list):
+    """把本次的 K 线窗口写回缓存（固定容量，内存不随运行时间增长）"""
+    import numpy as np
+    from data.ring_buffer import RingBuffer
+
+    key = (symbol, timeframe)
+    buffer = _candle_buffers.get(key)
+    if buffer is None or buffer.capacity != limit:
+        buffer = RingBuffer(limit, 5)
+        _candle_buffers.put(key, buffer)
+    window = np.asarray(candles, dtype=float)
+    buffer.load(window[:, 0].astype(np.int64), window[:, 1:6])
+
+
+def load_candles(symbol: str, timeframe: str = "1m", limit: int = 200):
+    """
+    获取 K 线并做数据质量检查：
+    - 每个币种只缓存最近 limit 根 K 线（环形缓冲区），之后每次只增量拉取新 K 线（见 _fetch_window）
+    - 排序去重
+    - 检查连续性，发现缺口时按范围补拉（since + limit），补拉后仍有缺口则记为问题
+    - 检查最新 K 线是否明显落后当前时间（交易所延迟）
+
+    返回 (candles, issues)：issues 为问题标签元组（"empty" / "gap" / "lagging"），为空表示数据完好。
+    """
+    timeframe_ms = timeframe_to_ms(timeframe)
+    candles = _fetch_window(symbol, timeframe, limit, timeframe_ms)
+    if not candles:
+        _count("empty_responses")
+        log(f"⚠️ {symbol}@{timeframe} K 线数据为空")
+        return candles, ("empty",)
+
+    issues = []
+
+    gaps = find_gaps(candles, timeframe_ms)
+    if gaps:
+        _count("gaps_detected", len(gaps))
+        _count("candles_missing", sum(missing for _, missing in gaps))
+        candles = _backfill(symbol, timeframe, candles, gaps)
+        remaining = find_gaps(candles, timeframe_ms)
+        if remaining:
+            _count("gaps_unfilled", len(remaining))
+            issues.append("gap")
+            log(f"⚠️ {symbol}@{timeframe} K 线存在 {len(remaining)} 处缺口，补拉后仍不完整")
+        else:
+            log(f"🩹 {symbol}@{timeframe} 已补齐 {len(gaps)} 处 K 线缺口")
+
+    lag_ms = clock_module.now() * 1000 - int(candles[-1][0])
+    if lag_ms > MAX_CANDLE_LAG_PERIODS * timeframe_ms:
+        _count("lagging_candles")
+        issues.append("lagging")
+        log(f"⚠️ {symbol}@{timeframe} 最新 K 线落后 {lag_ms / 1000:.0f} 秒，交易所行情可能延迟")
+
+    _store_window(symbol, timeframe, limit, candles)
+    return candles, tuple(issues)
+
+
+def is_ticker_stale(symbol: str, ticker: dict, last_candle_ms: int = None) -> bool:
+    """
+    检查行情快照是否过期：
+    - 时间戳落后当前时间超过 MAX_TICKER_AGE_SECONDS
+    - 或者早于最新一根已收盘 K 线的收盘时间（K 线比行情快照更新，说明快照没有刷新）
+    没有时间戳的快照无法判断，视为有效。
+    """
+    timestamp = ticker.get("timestamp") if ticker else None
+    if not timestamp:
+        return False
+
+    stale = clock_module.now() * 1000 - timestamp > MAX_TICKER_AGE_SECONDS * 1000
+    if not stale and last_candle_ms is not None:
+        # last_candle_ms 为最新（未收盘）K 线的开盘时间，即上一根 K 线的收盘时间
+        stale = timestamp < last_candle_ms - TICKER_CANDLE_TOLERANCE_MS
+
+    if stale:
+        _count("stale_tickers")
+        log(f"⚠️ {symbol} 行情快照已过期（时间戳 {timestamp}），跳过本轮策略判断")
+    return stale
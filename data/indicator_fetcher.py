@@ -1,24 +1,44 @@
 # 📁 modules/data/indicator_fetcher.py
 
-import pandas as pd
-import numpy as np
-from ta.trend import MACD
-from ta.momentum import StochasticOscillator
-from ta.volatility import AverageTrueRange
-from binance.exchange import exchange
+from typing import TYPE_CHECKING
+
+from config.config import MAX_CACHED_SYMBOLS
 from config.logger import log
+from data.data_quality import load_candles
+from data.lru_cache import LRUCache
+
+# pandas / ta / numpy 导入较慢，只在真正计算指标时才加载
+if TYPE_CHECKING:
+    import pandas as pd
+    from data.indicator_snapshot import IndicatorSnapshot
+
+# 每个币种保留的指标历史长度（环形缓冲区容量）
+INDICATOR_HISTORY_SIZE = 64
+
+# 每个币种的指标环形缓冲区：symbol -> RingBuffer（最多 MAX_CACHED_SYMBOLS 个币种，超出时淘汰最久未使用的）
+_indicator_buffers = LRUCache(MAX_CACHED_SYMBOLS)
+
+
+def reset_indicator_state(symbol: str):
+    """丢弃某个币种的指标历史（指标参数变化时调用，下一轮按新参数重建）"""
+    _indicator_buffers.pop(symbol, None)
+
+def _to_dataframe(ohlcv: list) -> "pd.DataFrame":
+    import pandas as pd
 
-def fetch_ohlcv(symbol: str = "BTC/USDT", timeframe: str = "1m", limit: int = 200) -> pd.DataFrame:
-    """
-    从 Binance 获取历史 K 线数据。
-    """
-    ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
     df = pd.DataFrame(ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"])
     df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
     df[["open", "high", "low", "close", "volume"]] = df[["open", "high", "low", "close", "volume"]].astype(float)
     return df
 
-def _calculate_kdj(df: pd.DataFrame, n: int = 9, k_smooth: int = 3, d_smooth: int = 3) -> pd.DataFrame:
+def fetch_ohlcv(symbol: str = "BTC/USDT", timeframe: str = "1m", limit: int = 200) -> "pd.DataFrame":
+    """
+    从 Binance 获取历史 K 线数据（已排序去重，缺口已尽量补齐，见 data/data_quality.py）。
+    """
+    candles, _ = load_candles(symbol, timeframe=timeframe, limit=limit)
+    return _to_dataframe(candles)
+
+def _calculate_kdj(df: "pd.DataFrame", n: int = 9, k_smooth: int = 3, d_smooth: int = 3) -> "pd.DataFrame":
     """
     KDJ计算核心逻辑（私有函数）
     参数:
@@ -26,28 +46,30 @@ def _calculate_kdj(df: pd.DataFrame, n: int = 9, k_smooth: int = 3, d_smooth: in
         k_smooth: K值平滑周期
         d_smooth: D值平滑周期
     """
+    import numpy as np
+
     # 计算n日内的最低价和最高价
     low_min = df['low'].rolling(window=n).min()
     high_max = df['high'].rolling(window=n).max()
     
     # 计算RSV（未成熟随机值）
     rsv = (df['close'] - low_min) / (high_max - low_min) * 100
-    rsv = rsv.replace([np.inf, -np.inf], np.nan).ffill()  # 处理异常值
+    rsv = rsv.replace([np.inf, -np.inf], np.nan).ffill().to_numpy(dtype=float)  # 处理异常值
     
     # 初始化K和D数组
     K, D = np.zeros(len(df)), np.zeros(len(df))
     K[:n-1] = np.nan  # 前n-1个数据点无效
     
-    # 递归计算K值和D值
+    # 递归计算K值和D值（逐行读取 NumPy 数组，避免每行一次 Series.iloc 的开销）
     for i in range(n-1, len(df)):
         if i == n-1:
-            K[i] = rsv.iloc[i]
+            K[i] = rsv[i]
             D[i] = K[i]
         else:
             # 根据平滑周期动态计算权重
             k_alpha = 1 / k_smooth
             d_alpha = 1 / d_smooth
-            K[i] = (1 - k_alpha) * K[i-1] + k_alpha * rsv.iloc[i]
+            K[i] = (1 - k_alpha) * K[i-1] + k_alpha * rsv[i]
             D[i] = (1 - d_alpha) * D[i-1] + d_alpha * K[i]
     
     df['K'] = K
@@ -62,14 +84,29 @@ def get_strategy_indicators(
     macd_params: tuple = (12, 26, 9),
     kdj_params: tuple = (9, 3, 3),
     atr_window: int = 14
-) -> dict:
+) -> "IndicatorSnapshot":
     """
-    获取多指标组合（MACD + KDJ + ATR）
+    获取多指标组合（MACD + KDJ + ATR），返回不可变的 IndicatorSnapshot。
+
+    每个币种的指标历史保存在固定容量的环形缓冲区中，每根 K 线（按开盘时间）一行：
+    未收盘 K 线的多次更新原地覆盖最后一行，收盘后最后一次按收盘值覆盖，之后只追加新 K 线，
+    因此 snapshot.previous() 始终是上一根已收盘 K 线，而不是收盘前最后一次轮询的值。
+    K 线数据不完整（为空 / 补拉后仍有缺口 / 交易所延迟）时，快照标记为 degraded。
     参数示例:
         macd_params: (fast, slow, signal)
         kdj_params: (n_period, k_smooth, d_smooth)
     """
-    df = fetch_ohlcv(symbol=symbol, timeframe=timeframe, limit=limit)
+    import numpy as np
+    import pandas as pd
+    from ta.trend import MACD
+    from ta.volatility import AverageTrueRange
+    from data.indicator_snapshot import IndicatorSnapshot, INDICATOR_NAMES
+    from data.ring_buffer import RingBuffer
+
+    candles, issues = load_candles(symbol, timeframe=timeframe, limit=limit)
+    if not candles:
+        return IndicatorSnapshot(symbol, timeframe, 0, np.empty((0, len(INDICATOR_NAMES))), issues)
+    df = _to_dataframe(candles)
     
     # ===== MACD =====
     macd = MACD(
@@ -98,20 +135,37 @@ def get_strategy_indicators(
     )
     df["ATR"] = atr.average_true_range()
     
-    # 结果处理
-    indicators = {
-        "DIF": df["DIF"].dropna().tolist(),
-        "DEA": df["DEA"].dropna().tolist(),
-        "K": df["K"].dropna().tolist(),
-        "D": df["D"].dropna().tolist(),
-        "J": df["J"].dropna().tolist(),
-        "ATR": df["ATR"].dropna().tolist(),
-    }
-    
+    # 结果处理：只保留六个指标都有效的行，写入环形缓冲区
+    valid = df.dropna(subset=list(INDICATOR_NAMES))
+    keys = ((valid["timestamp"] - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)).to_numpy()
+    rows = valid[list(INDICATOR_NAMES)].to_numpy(dtype=float)
+
+    buffer = _indicator_buffers.get(symbol)
+    if buffer is None:
+        buffer = RingBuffer(INDICATOR_HISTORY_SIZE, len(INDICATOR_NAMES))
+        _indicator_buffers.put(symbol, buffer)
+    last_key = buffer.last_key
+    if last_key is not None and len(keys) and keys[0] > last_key:
+        # 窗口不含最后一行（长时间停顿后恢复）：拿不到该 K 线的收盘值，与已有历史不连续，丢弃旧历史
+        buffer.clear()
+        last_key = None
+    if last_key is None:
+        buffer.extend(keys, rows)
+    else:
+        # 只写入最后一行及之后的新 K 线（最后一行按最新数据覆盖：未收盘 K 线的更新或收盘值）
+        new_rows = keys >= last_key
+        buffer.extend(keys[new_rows], rows[new_rows])
+
+    if not len(buffer):
+        log(f"⚠️ {symbol}@{timeframe} 指标数据不足，无法计算")
+        return IndicatorSnapshot(symbol, timeframe, 0, buffer.to_array(), issues)
+
+    snapshot = IndicatorSnapshot(symbol, timeframe, buffer.last_key, buffer.to_array(), issues)
+
     # 调试日志
     log(f"\n[指标状态] {symbol}@{timeframe}")
-    log(f"MACD | DIF: {indicators['DIF'][-1]:.4f}, DEA: {indicators['DEA'][-1]:.4f}")
-    log(f"KDJ  | K: {indicators['K'][-1]:.2f}, D: {indicators['D'][-1]:.2f}, J: {indicators['J'][-1]:.2f}")
-    log(f"ATR  | {indicators['ATR'][-1]:.4f}")
-    
-    return indicators
\ No newline at end of file
+    log(f"MACD | DIF: {snapshot.latest('DIF'):.4f}, DEA: {snapshot.latest('DEA'):.4f}")
+    log(f"KDJ  | K: {snapshot.latest('K'):.2f}, D: {snapshot.latest('D'):.2f}, J: {snapshot.latest('J'):.2f}")
+    log(f"ATR  | {snapshot.latest('ATR'):.4f}")
+
+    return snapshot
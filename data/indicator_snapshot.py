@@ -0,0 +1,74 @@
+# 📁 data/indicator_snapshot.py
+
+import numpy as np
+
+# 快照中的指标列顺序
+INDICATOR_NAMES = ("DIF", "DEA", "K", "D", "J", "ATR")
+_COLUMNS = {name: i for i, name in enumerate(INDICATOR_NAMES)}
+
+
+class IndicatorSnapshot:
+    """
+    某一时刻的指标快照（不可变）：按时间顺序保存最近 N 根 K 线的 DIF / DEA / K / D / J / ATR。
+
+    - values 为只读的 NumPy 数组，形状 (N, 6)，列顺序见 INDICATOR_NAMES
+    - 最新一行和上一行在创建时缓存为 Python float，latest / previous / crossed_above /
+      crossed_below 都是 O(1) 且不分配新对象，供策略热路径使用
+    - degraded 表示计算所用的 K 线数据不完整（为空 / 有缺口 / 交易所延迟），issues 为具体问题标签
+    """
+
+    __slots__ = ("symbol", "timeframe", "timestamp", "values", "issues", "_latest", "_previous")
+
+    def __init__(self, symbol: str, timeframe: str, timestamp: int, values: np.ndarray, issues: tuple = ()):
+        if values.flags.writeable:
+            values = values.copy()
+            values.flags.writeable = False
+        object.__setattr__(self, "symbol", symbol)
+        object.__setattr__(self, "timeframe", timeframe)
+        object.__setattr__(self, "timestamp", timestamp)
+        object.__setattr__(self, "values", values)
+        object.__setattr__(self, "issues", tuple(issues))
+        object.__setattr__(self, "_latest", tuple(values[-1].tolist()) if len(values) >= 1 else None)
+        object.__setattr__(self, "_previous", tuple(values[-2].tolist()) if len(values) >= 2 else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("IndicatorSnapshot is immutable")
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def degraded(self) -> bool:
+        """数据质量是否有问题"""
+        return bool(self.issues)
+
+    def __repr__(self):
+        latest = ", ".join(f"{n}={v:.4f}" for n, v in zip(INDICATOR_NAMES, self._latest or ()))
+        flag = f", degraded={','.join(self.issues)}" if self.issues else ""
+        return f"IndicatorSnapshot({self.symbol}@{self.timeframe}, n={len(self)}, {latest}{flag})"
+
+    def is_ready(self, min_length: int = 2) -> bool:
+        """指标是否足够用于判断金叉/死叉（至少 2 根 K 线）"""
+        return len(self.values) >= min_length
+
+    def latest(self, name: str) -> float:
+        """当前周期的指标值"""
+        return self._latest[_COLUMNS[name]]
+
+    def previous(self, name: str) -> float:
+        """上一周期的指标值"""
+        return self._previous[_COLUMNS[name]]
+
+    def series(self, name: str) -> np.ndarray:
+        """某个指标的完整历史（只读视图）"""
+        return self.values[:, _COLUMNS[name]]
+
+    def crossed_above(self, fast: str, slow: str) -> bool:
+        """金叉：上一周期 fast < slow，当前周期 fast > slow"""
+        i, j = _COLUMNS[fast], _COLUMNS[slow]
+        return self._previous[i] < self._previous[j] and self._latest[i] > self._latest[j]
+
+    def crossed_below(self, fast: str, slow: str) -> bool:
+        """死叉：上一周期 fast > slow，当前周期 fast < slow"""
+        i, j = _COLUMNS[fast], _COLUMNS[slow]
+        return self._previous[i] > self._previous[j] and self._latest[i] < self._latest[j]
@@ -0,0 +1,48 @@
+# 📁 data/lru_cache.py
+
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    固定容量的 LRU 缓存（按最近访问顺序淘汰），用于按币种缓存的数据：
+    币种数量增加（或配置中移除的币种不再访问）时，最久未使用的条目被淘汰，内存有上限。
+
+    get / put / pop 均为 O(1)；不加锁，调用方需在单一线程中使用或自行加锁。
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def get(self, key, default=None):
+        """读取并标记为最近使用"""
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def put(self, key, value):
+        """写入并标记为最近使用，超过容量时淘汰最久未使用的条目"""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+
+    def keys(self):
+        return list(self._data)
@@ -0,0 +1,323 @@
+# 📁 data/order_book.py
+
+import bisect
+import queue
+import threading
+import time
+from collections import Counter, deque, namedtuple
+
+from config import clock as clock_module
+from config.logger import log
+
+# 未同步（等待快照）期间每个币种缓存的增量事件上限
+MAX_PENDING_EVENTS = 1000
+
+# 超过该秒数没有收到增量更新的盘口视为过期，不再对外提供
+MAX_BOOK_AGE_SECONDS = 10
+
+# 重新同步时 REST 快照的深度（Binance 现货 limit=1000 权重为 10）
+SNAPSHOT_DEPTH = 1000
+
+# 快照拉取失败后的重试间隔（秒）
+RESYNC_RETRY_SECONDS = 1
+
+# 计算深度不平衡度时默认使用的档位数
+IMBALANCE_LEVELS = 10
+
+# 盘口摘要：最优买卖价、价差、不平衡度（(买量 - 卖量) / (买量 + 卖量)，范围 -1 ~ 1）
+BookTop = namedtuple("BookTop", "symbol best_bid best_ask mid spread spread_bps imbalance updated_at")
+
+
+class OrderBookGap(Exception):
+    """增量事件的序号与本地盘口不连续，需要重新同步"""
+
+
+class _BookSide:
+    """
+    一侧盘口：有序价格列表（二分查找定位档位）+ 价格 -> 数量字典。
+    买盘按价格取负存储，两侧都是列表开头为最优价。
+
+    复杂度：更新已有档位的数量只改字典，O(1)；新增 / 删除档位时二分定位 O(log n)，
+    但列表插入 / 删除需要移动后面的元素，为 O(n)（一次 memmove，1000 档以内开销很小）。
+    最优价 O(1)，前 k 档 O(k)。
+    """
+
+    def __init__(self, descending: bool):
+        self._sign = -1 if descending else 1
+        self._keys = []
+        self._sizes = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def set(self, price: float, size: float):
+        """更新一个档位，数量为 0 表示删除该档位"""
+        key = self._sign * price
+        if size <= 0:
+            if self._sizes.pop(key, None) is not None:
+                del self._keys[bisect.bisect_left(self._keys, key)]
+            return
+        if key not in self._sizes:
+            bisect.insort(self._keys, key)
+        self._sizes[key] = size
+
+    def clear(self):
+        self._keys.clear()
+        self._sizes.clear()
+
+    def best(self):
+        """最优档位 (price, size)，没有档位时返回 None"""
+        if not self._keys:
+            return None
+        key = self._keys[0]
+        return self._sign * key, self._sizes[key]
+
+    def levels(self, limit: int = None) -> list:
+        """从最优价开始的档位列表 [(price, size), ...]"""
+        keys = self._keys[:limit] if limit else self._keys
+        return [(self._sign * key, self._sizes[key]) for key in keys]
+
+    def volume(self, limit: int) -> float:
+        return sum(self._sizes[key] for key in self._keys[:limit])
+
+
+class LocalOrderBook:
+    """
+    本地维护的 L2 盘口：先加载 REST 快照（lastUpdateId），之后按 Binance 增量深度事件
+    （U = 第一个更新序号，u = 最后一个更新序号，b / a = 变化的档位，数量为 0 表示删除）更新：
+
+    - u <= 本地序号：过期事件，忽略
+    - U > 本地序号 + 1：中间丢失了事件，抛出 OrderBookGap，由管理器重新同步
+    - 其余事件按顺序应用（快照后的第一个事件满足 U <= lastUpdateId + 1 <= u）
+
+    每次应用后检查买一 < 卖一，出现交叉盘口同样视为需要重新同步。
+    本类不加锁，由 OrderBookManager 统一加锁访问。
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = _BookSide(descending=True)
+        self.asks = _BookSide(descending=False)
+        self.last_update_id = None
+        self.updated_at = None
+
+    def load_snapshot(self, bids, asks, last_update_id: int):
+        self.bids.clear()
+        self.asks.clear()
+        for price, size in bids:
+            self.bids.set(float(price), float(size))
+        for price, size in asks:
+            self.asks.set(float(price), float(size))
+        self.last_update_id = int(last_update_id)
+        self.updated_at = clock_module.now()
+
+    def apply(self, event: dict) -> bool:
+        """应用一条增量事件，返回是否生效（过期事件返回 False）"""
+        first, last = int(event["U"]), int(event["u"])
+        if last <= self.last_update_id:
+            return False
+        if first > self.last_update_id + 1:
+            raise OrderBookGap(f"{self.symbol} 增量序号不连续：本地 {self.last_update_id}，事件 U={first}")
+
+        for price, size in event.get("b", ()):
+            self.bids.set(float(price), float(size))
+        for price, size in event.get("a", ()):
+            self.asks.set(float(price), float(size))
+        self.last_update_id = last
+        self.updated_at = clock_module.now()
+
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid and ask and bid[0] >= ask[0]:
+            raise OrderBookGap(f"{self.symbol} 盘口交叉：买一 {bid[0]} >= 卖一 {ask[0]}")
+        return True
+
+    def top(self, levels: int = IMBALANCE_LEVELS):
+        """盘口摘要，任一侧为空时返回 None"""
+        bid, ask = self.bids.best(), self.asks.best()
+        if not bid or not ask:
+            return None
+        mid = (bid[0] + ask[0]) / 2
+        bid_volume, ask_volume = self.bids.volume(levels), self.asks.volume(levels)
+        total = bid_volume + ask_volume
+        return BookTop(
+            self.symbol, bid[0], ask[0], mid, ask[0] - bid[0], (ask[0] - bid[0]) / mid * 10000,
+            (bid_volume - ask_volume) / total if total else 0.0, self.updated_at
+        )
+
+    def estimate_fill(self, side: str, amount: float):
+        """
+        按当前盘口逐档估算市价单成交：返回 (成交均价, 可成交数量, 相对中间价的滑点比例)。
+        盘口为空时返回 None。
+        """
+        top = self.top()
+        if top is None:
+            return None
+        levels = self.asks.levels() if side.upper() == "BUY" else self.bids.levels()
+        filled = cost = 0.0
+        for price, size in levels:
+            take = min(size, amount - filled)
+            filled += take
+            cost += take * price
+            if filled >= amount:
+                break
+        if not filled:
+            return None
+        average = cost / filled
+        slippage = (average - top.mid) / top.mid if side.upper() == "BUY" else (top.mid - average) / top.mid
+        return average, filled, slippage
+
+    def to_dict(self, limit: int = None) -> dict:
+        """ccxt 风格的盘口结构"""
+        return {
+            "symbol": self.symbol,
+            "bids": self.bids.levels(limit),
+            "asks": self.asks.levels(limit),
+            "timestamp": int(self.updated_at * 1000) if self.updated_at else None,
+            "nonce": self.last_update_id,
+        }
+
+
+class OrderBookManager:
+    """
+    多币种本地盘口管理器：
+
+    - on_event() 由行情推送线程调用（binance/depth_stream.py），已同步的盘口直接应用增量事件
+    - 未同步或发现序号缺口时，事件先进入缓冲区，由后台线程拉取 REST 快照后重放缓冲的事件完成同步
+      （快照比缓冲区中的第一个事件还旧时重新拉取）
+    - top() / estimate_fill() / snapshot() 只读本地数据，不发网络请求；
+      盘口未同步或超过 MAX_BOOK_AGE_SECONDS 没有更新时返回 None，调用方自行降级
+
+    snapshot_fetcher(symbol, depth) 返回带 nonce（lastUpdateId）的 ccxt 盘口结构，
+    默认使用真实行情客户端（模拟交易时为 SimulatedExchange 的行情来源）。
+    """
+
+    def __init__(self, snapshot_fetcher=None, max_age: float = MAX_BOOK_AGE_SECONDS, depth: int = SNAPSHOT_DEPTH):
+        self.max_age = max_age
+        self.depth = depth
+        self._fetch_snapshot = snapshot_fetcher or _fetch_snapshot
+        self._books = {}          # symbol -> 已同步的 LocalOrderBook
+        self._pending = {}        # symbol -> 等待快照期间缓冲的事件
+        self._resyncing = set()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._stats = Counter()
+
+    # ===== 写入（行情推送线程） =====
+
+    def on_event(self, symbol: str, event: dict):
+        with self._lock:
+            self._stats["events"] += 1
+            book = self._books.get(symbol)
+            if book is not None:
+                try:
+                    book.apply(event)
+                    return
+                except OrderBookGap as e:
+                    self._stats["gaps"] += 1
+                    del self._books[symbol]
+                    log(f"⚠️ {e}，重新同步盘口")
+
+            pending = self._pending.setdefault(symbol, deque(maxlen=MAX_PENDING_EVENTS))
+            pending.append(event)
+            if symbol in self._resyncing:
+                return
+            self._resyncing.add(symbol)
+
+        self._queue.put(symbol)
+        self._ensure_worker()
+
+    def reset(self, symbol: str = None):
+        """丢弃某个币种（None 表示全部）的盘口，下一条事件到达时重新同步（行情连接断开重连时调用）"""
+        with self._lock:
+            for name in [symbol] if symbol else list(self._books) + list(self._pending):
+                self._books.pop(name, None)
+                self._pending.pop(name, None)
+                self._resyncing.discard(name)
+
+    # ===== 重新同步（后台线程） =====
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="order-book-resync", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            symbol = self._queue.get()
+            if not self._resync(symbol):
+                time.sleep(RESYNC_RETRY_SECONDS)
+                self._queue.put(symbol)
+
+    def _resync(self, symbol: str) -> bool:
+        """拉取快照并重放缓冲的事件，返回是否完成（失败时稍后重试）"""
+        try:
+            snapshot = self._fetch_snapshot(symbol, self.depth)
+            if snapshot.get("nonce") is None:
+                raise ValueError("快照缺少 lastUpdateId（nonce）")
+        except Exception as e:
+            log(f"⚠️ {symbol} 盘口快照拉取失败: {e}")
+            return False
+
+        with self._lock:
+            if symbol not in self._resyncing:
+                return True   # 期间被 reset
+            book = LocalOrderBook(symbol)
+            book.load_snapshot(snapshot["bids"], snapshot["asks"], snapshot["nonce"])
+            pending = self._pending.get(symbol) or deque()
+            while pending:
+                try:
+                    book.apply(pending[0])
+                except OrderBookGap:
+                    # 快照早于缓冲的第一个事件（或缓冲区溢出丢了事件），重新拉取快照
+                    self._stats["stale_snapshots"] += 1
+                    return False
+                pending.popleft()
+
+            self._books[symbol] = book
+            self._pending.pop(symbol, None)
+            self._resyncing.discard(symbol)
+            self._stats["resyncs"] += 1
+        log(f"📚 {symbol} 本地盘口已同步（lastUpdateId={book.last_update_id}，{len(book.bids)}/{len(book.asks)} 档）")
+        return True
+
+    # ===== 读取（任意线程，不发网络请求） =====
+
+    def _fresh(self, symbol: str):
+        book = self._books.get(symbol)
+        if book is None or clock_module.now() - book.updated_at > self.max_age:
+            return None
+        return book
+
+    def top(self, symbol: str, levels: int = IMBALANCE_LEVELS):
+        """最优买卖价 / 价差 / 深度不平衡度（BookTop），盘口不可用时返回 None"""
+        with self._lock:
+            book = self._fresh(symbol)
+            return book.top(levels) if book else None
+
+    def estimate_fill(self, symbol: str, side: str, amount: float):
+        """估算市价单的 (成交均价, 可成交数量, 滑点比例)，盘口不可用时返回 None"""
+        with self._lock:
+            book = self._fresh(symbol)
+            return book.estimate_fill(side, amount) if book else None
+
+    def snapshot(self, symbol: str, limit: int = None):
+        """ccxt 风格的盘口副本，盘口不可用时返回 None"""
+        with self._lock:
+            book = self._fresh(symbol)
+            return book.to_dict(limit) if book else None
+
+    def stats(self) -> dict:
+        """同步状态与计数（日志 / 监控用）"""
+        with self._lock:
+            synced = {symbol: self._fresh(symbol) is not None for symbol in set(self._books) | set(self._pending)}
+            return {"synced": synced, **self._stats}
+
+
+def _fetch_snapshot(symbol: str, depth: int) -> dict:
+    from binance.exchange import get_market_data_source
+    return get_market_data_source().fetch_order_book(symbol, limit=depth)
+
+
+# 全局盘口管理器
+order_books = OrderBookManager()
@@ -0,0 +1,84 @@
+# 📁 data/ring_buffer.py
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    固定容量的二维环形缓冲区（NumPy 实现），每行一条记录，每列一个字段。
+
+    - 内存在创建时一次性分配，写满后覆盖最旧的记录，长时间运行内存不增长
+    - 每行附带一个整数键（如 K 线开盘时间戳），append 时键与最后一行相同则原地覆盖（未收盘 K 线的更新），
+      比最后一行更旧的键直接忽略，保证 row(-2) 始终是上一根已收盘 K 线
+    - to_array() 返回按时间顺序排列的只读副本
+    """
+
+    def __init__(self, capacity: int, width: int, dtype=np.float64):
+        self.capacity = capacity
+        self.width = width
+        self._data = np.full((capacity, width), np.nan, dtype=dtype)
+        self._keys = np.zeros(capacity, dtype=np.int64)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_key(self):
+        """最后一行的键，缓冲区为空时返回 None"""
+        if not self._size:
+            return None
+        return int(self._keys[(self._start + self._size - 1) % self.capacity])
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+    def append(self, key: int, row):
+        """追加一行；键与最后一行相同则覆盖最后一行，比最后一行旧则忽略"""
+        last_key = self.last_key
+        if last_key is not None and key < last_key:
+            return
+        if key == last_key:
+            index = (self._start + self._size - 1) % self.capacity
+        elif self._size < self.capacity:
+            index = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            index = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._data[index] = row
+        self._keys[index] = key
+
+    def extend(self, keys, rows):
+        """批量追加（只保留最后 capacity 行）"""
+        keys, rows = keys[-self.capacity:], rows[-self.capacity:]
+        for key, row in zip(keys, rows):
+            self.append(int(key), row)
+
+    def load(self, keys, rows):
+        """整体替换为给定的行（只保留最后 capacity 行），向量化写入"""
+        keys, rows = keys[-self.capacity:], rows[-self.capacity:]
+        size = len(keys)
+        self._data[:size] = rows
+        self._keys[:size] = keys
+        self._start = 0
+        self._size = size
+
+    def row(self, offset: int = -1) -> np.ndarray:
+        """按从新到旧的偏移取一行视图，offset=-1 为最新一行"""
+        if not -self._size <= offset < 0:
+            raise IndexError("ring buffer offset out of range")
+        return self._data[(self._start + self._size + offset) % self.capacity]
+
+    def to_array(self) -> np.ndarray:
+        """按时间顺序返回全部行的只读副本"""
+        order = (self._start + np.arange(self._size)) % self.capacity
+        values = self._data[order]
+        values.flags.writeable = False
+        return values
+
+    def keys(self) -> np.ndarray:
+        order = (self._start + np.arange(self._size)) % self.capacity
+        return self._keys[order]
@@ -1,32 +1,84 @@
-import asyncio
-from telegram import Bot
+import queue
+import threading
 from config.config import TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
 from config.logger import log
 
+# 待发送消息队列，由后台线程逐条发送，不阻塞交易主循环
+_queue = queue.Queue(maxsize=1000)
+_worker = None
+_worker_lock = threading.Lock()
+_bot = None
+_enabled = True
 
-bot = Bot(token=TELEGRAM_TOKEN)
+
+def get_bot():
+    """
+    延迟创建 Telegram Bot（首次发送时才导入 python-telegram-bot）。
+    未配置 TELEGRAM_TOKEN / TELEGRAM_CHAT_ID 时返回 None，通知功能自动关闭。
+    """
+    global _bot
+    if _bot is None and TELEGRAM_TOKEN and TELEGRAM_CHAT_ID:
+        from telegram import Bot
+        _bot = Bot(token=TELEGRAM_TOKEN)
+    return _bot
 
 async def send_telegram_message_async(message: str):
     try:
-        await bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
+        await get_bot().send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
+        log(f"[Telegram] ✅ 已异步发送消息：{message}")
     except Exception as e:
         log(f"[Telegram] ❌ 异步发送失败：{e}")
 
-# 保持一个全局复用的 event loop
-def send_telegram_message(message: str):
+def _run_worker():
+    """后台发送线程：持有一个专用 event loop，按顺序发送队列中的消息"""
+    import asyncio
+
     try:
+        bot = get_bot()
+        if bot is None:
+            log("[Telegram] ⚠️ 未配置 TELEGRAM_TOKEN / TELEGRAM_CHAT_ID，通知已关闭")
+    except Exception as e:
+        log(f"[Telegram] ❌ 初始化失败，通知已关闭：{e}")
+        bot = None
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    while True:
+        message = _queue.get()
         try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            if bot is not None:
+                loop.run_until_complete(send_telegram_message_async(message))
+        except Exception as e:
+            log(f"[Telegram] ❌ 异步运行错误：{e}")
+        finally:
+            _queue.task_done()
 
-        if loop.is_closed():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+def set_enabled(enabled: bool):
+    """开启 / 关闭通知（回放模式下关闭，避免重复推送历史交易）"""
+    global _enabled
+    _enabled = enabled
 
-        loop.run_until_complete(send_telegram_message_async(message))
-        log(f"[Telegram] ✅ 已异步发送消息：{message}")
+def _ensure_worker():
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(target=_run_worker, name="telegram-sender", daemon=True)
+                _worker.start()
 
-    except Exception as e:
-        log(f"[Telegram] ❌ 异步运行错误：{e}")
+def send_telegram_message(message: str):
+    """
+    将消息放入发送队列后立即返回，由后台线程异步发送。
+    队列已满（Telegram 长时间不可用）时丢弃消息并记录日志。
+    """
+    if not _enabled:
+        return
+    _ensure_worker()
+    try:
+        _queue.put_nowait(message)
+    except queue.Full:
+        log(f"[Telegram] ⚠️ 发送队列已满，丢弃消息：{message}")
+
+def queue_depth() -> int:
+    """当前待发送的消息数量"""
+    return _queue.qsize()
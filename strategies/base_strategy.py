@@ -1,44 +1,70 @@
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Optional
+
+from config.position import Position
+
+if TYPE_CHECKING:
+    from strategies.batch import StrategyBatch, BatchSignals
 
 class BaseStrategy(ABC):
     """
     策略基类，所有策略需继承此类，并实现 should_buy、should_sell 和 should_stop_loss 方法。
 
-    所有方法都支持 **kwargs，用于接收扩展参数，例如技术指标、市场情绪等。
+    所有方法都支持 **kwargs，用于接收扩展参数，例如技术指标快照（indicators=IndicatorSnapshot）、
+    本地盘口摘要（order_book=BookTop，盘口不可用时为 None）、市场情绪等。
+    止损原因通过 evaluate_stop_loss 的返回值单独给出，策略不应把结果写回指标或持仓。
+    需要一次扫描大量币种或整段历史（回测）的策略可以实现 evaluate_batch（NumPy 向量化）。
     """
 
     @abstractmethod
-    def should_buy(self, symbol: str, price: float, position: dict, **kwargs) -> bool:
+    def should_buy(self, symbol: str, price: float, position: Position, **kwargs) -> bool:
         """
         判断是否应该买入。
         :param symbol: 交易标的（如 BTC/USDT）
         :param price: 当前价格
-        :param position: 当前持仓状态
+        :param position: 当前持仓记录（Position）
         :param kwargs: 可选的扩展参数（如技术指标）
         :return: 是否买入
         """
         pass
 
     @abstractmethod
-    def should_sell(self, symbol: str, price: float, position: dict, **kwargs) -> bool:
+    def should_sell(self, symbol: str, price: float, position: Position, **kwargs) -> bool:
         """
         判断是否应该卖出。
         :param symbol: 交易标的
         :param price: 当前价格
-        :param position: 当前持仓状态
+        :param position: 当前持仓记录（Position）
         :param kwargs: 可选扩展参数
         :return: 是否卖出
         """
         pass
 
     @abstractmethod
-    def should_stop_loss(self, symbol: str, price: float, position: dict, **kwargs) -> bool:
+    def should_stop_loss(self, symbol: str, price: float, position: Position, **kwargs) -> bool:
         """
         判断是否应该止损。
         :param symbol: 交易标的
         :param price: 当前价格
-        :param position: 当前持仓状态
+        :param position: 当前持仓记录（Position）
         :param kwargs: 可选扩展参数
         :return: 是否止损
         """
         pass
+
+    def evaluate_stop_loss(self, symbol: str, price: float, position: Position, **kwargs) -> Optional[str]:
+        """
+        判断是否止损并给出原因。
+        默认实现基于 should_stop_loss，触发时返回 "stop_loss"；支持多种止损方式的策略应覆盖此方法返回具体原因。
+        :return: 止损原因，未触发返回 None
+        """
+        return "stop_loss" if self.should_stop_loss(symbol, price, position, **kwargs) else None
+
+    def evaluate_batch(self, batch: "StrategyBatch") -> "BatchSignals":
+        """
+        批量判断：对 StrategyBatch 中的 N 行（N 个币种或 N 根 K 线）一次性给出买入 / 卖出 / 止损信号向量。
+        结果与逐行调用 should_buy / should_sell / evaluate_stop_loss 一致。
+        :param batch: 对齐的指标、价格和持仓数组
+        :return: BatchSignals
+        """
+        raise NotImplementedError(f"{type(self).__name__} 不支持批量判断")
@@ -0,0 +1,153 @@
+# 📁 strategies/batch.py
+
+import numpy as np
+
+from config.config import SYMBOL_CONFIGS
+from data.indicator_snapshot import INDICATOR_NAMES
+
+_NAN_ROW = np.full(len(INDICATOR_NAMES), np.nan)
+
+
+def _as_float(value) -> float:
+    """None 转为 NaN（NaN 参与比较恒为 False），其余数值（包括 0）转为 float"""
+    return np.nan if value is None else float(value)
+
+
+class StrategyBatch:
+    """
+    批量策略输入：N 行对齐的数组，每行是一个独立的判断点。
+
+    - 横截面（实盘扫描）：每行一个币种，见 from_snapshots
+    - 时间序列（回测）：每行一根 K 线，见 from_history
+
+    字段（形状均为 (N,) 或 (N, 6)，列顺序见 INDICATOR_NAMES）：
+        symbols: 每行对应的交易对（用于读取币种配置）
+        price: 当前价格
+        current / previous: 当前周期 / 上一周期的指标值，缺失为 NaN
+        holding: 是否持仓
+        entry_price / amount / buy_fee / max_price / trailing_stop_price: 持仓字段，缺失为 NaN
+    """
+
+    __slots__ = ("symbols", "price", "current", "previous", "holding", "entry_price",
+                 "amount", "buy_fee", "max_price", "trailing_stop_price", "_config_cache")
+
+    def __init__(self, symbols, price, current, previous, holding=None, entry_price=None,
+                 amount=None, buy_fee=None, max_price=None, trailing_stop_price=None):
+        n = len(symbols)
+        self.symbols = list(symbols)
+        self.price = np.asarray(price, dtype=float)
+        self.current = np.asarray(current, dtype=float).reshape(n, len(INDICATOR_NAMES))
+        self.previous = np.asarray(previous, dtype=float).reshape(n, len(INDICATOR_NAMES))
+        self.holding = np.zeros(n, dtype=bool) if holding is None else np.asarray(holding, dtype=bool)
+
+        def column(values):
+            return np.full(n, np.nan) if values is None else np.broadcast_to(np.asarray(values, dtype=float), (n,))
+
+        self.entry_price = column(entry_price)
+        self.amount = column(amount)
+        self.buy_fee = column(buy_fee)
+        self.max_price = column(max_price)
+        self.trailing_stop_price = column(trailing_stop_price)
+        self._config_cache = {}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @classmethod
+    def from_snapshots(cls, snapshots: dict, prices: dict, positions: dict) -> "StrategyBatch":
+        """
+        由各币种的 IndicatorSnapshot、最新价格和持仓记录构造横截面批次。
+        指标不足两根 K 线的币种对应行为 NaN，不会触发任何指标相关信号。
+        """
+        symbols = list(snapshots)
+        current = np.empty((len(symbols), len(INDICATOR_NAMES)))
+        previous = np.empty_like(current)
+        records = [positions.get(symbol) for symbol in symbols]
+        for i, symbol in enumerate(symbols):
+            snapshot = snapshots[symbol]
+            values = snapshot.values if snapshot is not None else ()
+            current[i] = values[-1] if len(values) >= 1 else _NAN_ROW
+            previous[i] = values[-2] if len(values) >= 2 else _NAN_ROW
+
+        def field(name):
+            return [_as_float(getattr(p, name)) if p is not None else np.nan for p in records]
+
+        return cls(
+            symbols,
+            price=[prices[symbol] for symbol in symbols],
+            current=current,
+            previous=previous,
+            holding=[bool(p is not None and p.holding) for p in records],
+            entry_price=field("entry_price"),
+            amount=field("amount"),
+            buy_fee=field("buy_fee"),
+            max_price=field("max_price"),
+            trailing_stop_price=field("trailing_stop_price"),
+        )
+
+    @classmethod
+    def from_history(cls, symbol: str, values, prices, **position_fields) -> "StrategyBatch":
+        """
+        由单个币种的指标历史构造时间序列批次（回测）：values 形状 (T, 6)，prices 形状 (T,)。
+        第 t 行的上一周期为第 t-1 行，第一行的上一周期为 NaN。
+        持仓字段可传标量（整段相同）或长度为 T 的数组。
+        """
+        values = np.asarray(values, dtype=float)
+        previous = np.vstack([_NAN_ROW, values[:-1]]) if len(values) else values
+        return cls([symbol] * len(values), prices, values, previous, **position_fields)
+
+    def config(self, key: str, default) -> np.ndarray:
+        """按行读取币种配置中的数值参数（每个币种只查一次）"""
+        cached = self._config_cache.get(key)
+        if cached is None:
+            per_symbol = {s: SYMBOL_CONFIGS.get(s, {}).get(key, default) for s in set(self.symbols)}
+            cached = self._config_cache[key] = np.array([per_symbol[s] for s in self.symbols], dtype=float)
+        return cached
+
+    def config_values(self, key: str, default) -> list:
+        """按行读取币种配置中的非数值参数（如 stop_loss_priority）"""
+        per_symbol = {s: SYMBOL_CONFIGS.get(s, {}).get(key, default) for s in set(self.symbols)}
+        return [per_symbol[s] for s in self.symbols]
+
+    def indicator(self, name: str, previous: bool = False) -> np.ndarray:
+        """某个指标的当前周期（或上一周期）列"""
+        values = self.previous if previous else self.current
+        return values[:, INDICATOR_NAMES.index(name)]
+
+    def crossed_above(self, fast: str, slow: str) -> np.ndarray:
+        """金叉：上一周期 fast < slow，当前周期 fast > slow"""
+        return ((self.indicator(fast, True) < self.indicator(slow, True))
+                & (self.indicator(fast) > self.indicator(slow)))
+
+    def crossed_below(self, fast: str, slow: str) -> np.ndarray:
+        """死叉：上一周期 fast > slow，当前周期 fast < slow"""
+        return ((self.indicator(fast, True) > self.indicator(slow, True))
+                & (self.indicator(fast) < self.indicator(slow)))
+
+
+class BatchSignals:
+    """
+    批量策略输出，与 StrategyBatch 的行一一对应：
+        buy / sell / stop_loss: 布尔向量（各自独立计算，与单币种接口语义一致；
+                               实盘按 买入 → 卖出 → 止损 的顺序取第一个成立的动作）
+        stop_reason: 止损原因（字符串），未触发为 None
+    """
+
+    __slots__ = ("symbols", "buy", "sell", "stop_loss", "stop_reason")
+
+    def __init__(self, symbols, buy, sell, stop_loss, stop_reason=None):
+        self.symbols = symbols
+        self.buy = buy
+        self.sell = sell
+        self.stop_loss = stop_loss
+        if stop_reason is None:
+            stop_reason = np.where(stop_loss, "stop_loss", None).astype(object)
+        self.stop_reason = stop_reason
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def actions(self) -> list:
+        """按实盘优先级给出每行的动作：buy / sell / stop_loss / None"""
+        action = np.where(self.buy, "buy", np.where(self.sell, "sell", np.where(self.stop_loss, "stop_loss", None)))
+        return action.tolist()
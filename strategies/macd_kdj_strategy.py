@@ -1,8 +1,19 @@
 # 📁 strategies/macd_kdj_strategy.py
 
+from typing import TYPE_CHECKING, Optional
+
 from strategies.base_strategy import BaseStrategy
 from config.config import SYMBOL_CONFIGS, TRADE_FEE_RATE
 from config.logger import log
+from config.position import Position
+
+if TYPE_CHECKING:
+    from data.indicator_snapshot import IndicatorSnapshot
+    from strategies.batch import StrategyBatch, BatchSignals
+
+# 支持的止损方式（批量判断时的列顺序），以及默认优先级
+STOP_METHODS = ("trailing", "fixed", "atr", "macd", "drawdown")
+DEFAULT_STOP_PRIORITY = ["trailing", "fixed", "atr", "macd", "drawdown"]
 
 
 class MACDKDJStrategy(BaseStrategy):
@@ -13,34 +24,26 @@ class MACDKDJStrategy(BaseStrategy):
     - 止损：价格 < entry_price - ATR * atr_stop_multiplier
     """
 
-    def should_buy(self, symbol: str, price: float, position: dict, **kwargs) -> bool:
-        if position.get("holding", False):
+    def should_buy(self, symbol: str, price: float, position: Position, **kwargs) -> bool:
+        if position.holding:
             return False
 
-        indicators = kwargs.get("indicators", {})
+        indicators = kwargs.get("indicators")
         config = SYMBOL_CONFIGS[symbol]
         max_j = config.get("max_j_buy", 70)
 
         if not self._check_indicators(indicators):
             return False
 
-        # 获取前一周期和当前周期的 MACD DIF/DEA 值
-        dif_y, dea_y = indicators["DIF"][-2], indicators["DEA"][-2]  # 上一个周期
-        dif, dea = indicators["DIF"][-1], indicators["DEA"][-1]      # 当前周期
-
-        # 获取前一周期和当前周期的 KDJ K/D 值
-        k_y, d_y = indicators["K"][-2], indicators["D"][-2]
-        k, d = indicators["K"][-1], indicators["D"][-1]
-
         # 当前周期的 J 值
-        j = indicators["J"][-1]
+        j = indicators.latest("J")
 
         # 判断条件：MACD 金叉 或 KDJ 金叉 且 J 值未过热
         return (
-            ((dif_y < dea_y and dif > dea) or (k_y < d_y and k > d)) #and j < max_j
+            (indicators.crossed_above("DIF", "DEA") or indicators.crossed_above("K", "D")) #and j < max_j
         )
 
-    def should_sell(self, symbol: str, price: float, position: dict, **kwargs) -> bool:
+    def should_sell(self, symbol: str, price: float, position: Position, **kwargs) -> bool:
         """
         判断是否应该主动卖出（非止损行为）。
         该方法综合技术面卖出信号 + 最小利润过滤，确保：
@@ -51,45 +54,41 @@ class MACDKDJStrategy(BaseStrategy):
         参数：
             symbol (str): 交易对，如 "BTC/USDT"
             price (float): 当前市场价格
-            position (dict): 当前币种持仓信息
+            position (Position): 当前币种持仓记录
             kwargs:
-                indicators (dict): 指标数据，如 MACD、KDJ、ATR 等
+                indicators (IndicatorSnapshot): 指标快照，如 MACD、KDJ、ATR 等
 
         返回：
             bool: 是否满足主动卖出条件（True 表示应当卖出）
         """
 
         # 1️⃣ 如果当前没有持仓状态（未买入），则不考虑卖出
-        if not position.get("holding", False):
+        if not position.holding:
             return False
 
         # 2️⃣ 获取传入的指标数据（由外部传入，如 MACD、KDJ 等）
-        indicators = kwargs.get("indicators", {})
+        indicators = kwargs.get("indicators")
         config = SYMBOL_CONFIGS[symbol]  # 获取当前币种的策略配置
         min_j = config.get("min_j_sell", 90)  # 卖出时 J 值过热的阈值（技术面）
 
-        # 3️⃣ 检查指标数据是否齐全，避免出现 index 或 key 错误
+        # 3️⃣ 检查指标数据是否齐全（至少两根 K 线），避免出现越界错误
         if not self._check_indicators(indicators):
             return False
 
-        # 4️⃣ 取出 MACD 的前一周期 和 当前周期数据，用于判断死叉
-        dif_y, dea_y = indicators["DIF"][-2], indicators["DEA"][-2]  # 上一根K线的 DIF/DEA
-        dif, dea = indicators["DIF"][-1], indicators["DEA"][-1]      # 当前K线的 DIF/DEA
-
-        # 5️⃣ 取出当前周期的 KDJ 的 J 值
-        j = indicators["J"][-1]
+        # 4️⃣ 取出当前周期的 KDJ 的 J 值
+        j = indicators.latest("J")
 
-        # 6️⃣ 技术面判断：如果出现 MACD 死叉 或 J > min_j（过热），触发卖出信号
-        technical_signal = (dif_y > dea_y and dif < dea) or (j > min_j)
+        # 5️⃣ 技术面判断：如果出现 MACD 死叉 或 J > min_j（过热），触发卖出信号
+        technical_signal = indicators.crossed_below("DIF", "DEA") or (j > min_j)
 
-        # 7️⃣ 如果技术面不满足，则不考虑利润，直接返回 False
+        # 6️⃣ 如果技术面不满足，则不考虑利润，直接返回 False
         if not technical_signal:
             return False
 
-        # 8️⃣ 技术面满足后，判断当前是否达到设定的最小盈利门槛（避免小赚就卖）
-        entry_price = position.get("entry_price")               # 原始买入价格
-        amount = position.get("amount", 0.01)                   # 持仓数量（默认 0.01）
-        buy_fee = position.get("buy_fee", 0.0)                  # 原始买入手续费
+        # 7️⃣ 技术面满足后，判断当前是否达到设定的最小盈利门槛（避免小赚就卖）
+        entry_price = position.entry_price                        # 原始买入价格
+        amount = position.amount                                  # 持仓数量
+        buy_fee = position.buy_fee or 0.0                         # 原始买入手续费
         fee_rate = config.get("fee_rate", TRADE_FEE_RATE)       # 当前手续费率
        # min_profit = config.get("min_profit", 0.5)              # 最小净利润限制（如 0.5 USDT）
 
@@ -98,10 +97,10 @@ class MACDKDJStrategy(BaseStrategy):
          # 计算最小利润金额
         min_profit_value = entry_price * amount * (min_profit_pct / 100)
         
-         # 9️⃣ 计算当前卖出价格下的毛收入（price * 数量）
+         # 8️⃣ 计算当前卖出价格下的毛收入（price * 数量）
         sell_total = price * amount
 
-        # 🔟 卖出手续费 = 总卖出金额 * 费率
+        # 9️⃣ 卖出手续费 = 总卖出金额 * 费率
         sell_fee = sell_total * fee_rate
 
         # 🔁 计算净利润 = 卖出收入 - 买入成本 - 手续费
@@ -115,72 +114,130 @@ class MACDKDJStrategy(BaseStrategy):
         # ✅ 技术面满足、利润也达标，允许卖出
         return True
 
-    def should_stop_loss(self, symbol: str, price: float, position: dict, **kwargs) -> bool:
+    def should_stop_loss(self, symbol: str, price: float, position: Position, **kwargs) -> bool:
+        """
+        综合止损判断函数，触发原因通过 evaluate_stop_loss 获取。
+        """
+        return self.evaluate_stop_loss(symbol, price, position, **kwargs) is not None
+
+    def evaluate_stop_loss(self, symbol: str, price: float, position: Position, **kwargs) -> Optional[str]:
         """
         综合止损判断函数，支持多种止损逻辑，并可配置优先级顺序。
+        返回第一个触发的止损方式（fixed / atr / macd / drawdown / trailing），未触发返回 None。
         """
 
-        entry_price = position.get("entry_price")
-        if not position.get("holding", False) or not entry_price:
-            return False
+        entry_price = position.entry_price
+        if not position.holding or not entry_price:
+            return None
 
         config = SYMBOL_CONFIGS[symbol]
-        indicators = kwargs.get("indicators", {})
-        atr_values = indicators.get("ATR", [])
+        indicators = kwargs.get("indicators")
+        has_indicators = indicators is not None and indicators.is_ready(1)
 
         # 止损优先级顺序（可配置）
-        priorities = config.get("stop_loss_priority", ["trailing", "fixed", "atr", "macd", "drawdown"])
+        priorities = config.get("stop_loss_priority", DEFAULT_STOP_PRIORITY)
 
         for method in priorities:
             if method == "fixed":
                 fix_stop_pct = config.get("fixed_stop_loss_pct", 0.02)
                 if price < entry_price * (1 - fix_stop_pct):
                     log("🔻 触发固定百分比止损")
-                    indicators["stop_reason"] = "fixed"
-                    return True
+                    return "fixed"
 
             elif method == "atr":
                 atr_multiplier = config.get("atr_stop_multiplier", 2.0)
-                if atr_values and len(atr_values) >= 1:
-                    latest_atr = atr_values[-1]
+                if has_indicators:
+                    latest_atr = indicators.latest("ATR")
                     stop_price = entry_price - atr_multiplier * latest_atr
                     if price < stop_price:
                         log("🔻 触发 ATR 动态止损")
-                        indicators["stop_reason"] = "atr"
-                        return True
+                        return "atr"
 
             elif method == "macd":
                 if self._check_indicators(indicators):
-                    dif_y, dea_y = indicators["DIF"][-2], indicators["DEA"][-2]
-                    dif, dea = indicators["DIF"][-1], indicators["DEA"][-1]
-                    if dif_y > dea_y and dif < dea and price < entry_price:
+                    if indicators.crossed_below("DIF", "DEA") and price < entry_price:
                         log("🔻 触发 MACD 死叉趋势止损")
-                        indicators["stop_reason"] = "macd"
-                        return True
+                        return "macd"
 
             elif method == "drawdown":
-                max_price = position.get("max_price", entry_price)
+                max_price = position.max_price or entry_price
                 drawdown_pct = (max_price - price) / max_price
                 max_drawdown_pct = config.get("max_drawdown_pct", 0.05)
                 if drawdown_pct >= max_drawdown_pct:
                     log(f"🔻 触发最大回撤止损：回撤 {drawdown_pct:.2%}")
-                    indicators["stop_reason"] = "drawdown"
-                    return True
+                    return "drawdown"
 
             elif method == "trailing":
-                trailing_stop_price = position.get("trailing_stop_price")
+                trailing_stop_price = position.trailing_stop_price
                 if trailing_stop_price and price < trailing_stop_price:
                     log(f"🔻 触发移动止损：当前价格 {price:.2f} < 止损线 {trailing_stop_price:.2f}")
-                    indicators["stop_reason"] = "trailing"
-                    return True
+                    return "trailing"
 
-        return False
+        return None
 
+    def evaluate_batch(self, batch: "StrategyBatch") -> "BatchSignals":
+        """
+        批量判断（NumPy 向量化），逐行结果与 should_buy / should_sell / evaluate_stop_loss 一致：
+        - 买入 / 卖出：金叉、死叉、J 值、最小利润均为整列运算
+        - 止损：先算出 (N, 5) 的触发矩阵，再按各币种的 stop_loss_priority 生成排名矩阵，
+          未触发的位置排名置为最大，每行 argmin 即为优先级最高的已触发止损方式
+        批量判断不逐行打印日志。
+        """
+        import numpy as np
+        from strategies.batch import BatchSignals
+
+        price = batch.price
+        holding = batch.holding
+        entry_price = batch.entry_price
+        ready = ~(np.isnan(batch.current).any(axis=1) | np.isnan(batch.previous).any(axis=1))
+        macd_dead = ready & batch.crossed_below("DIF", "DEA")
+        j = batch.indicator("J")
+
+        # ===== 买入：MACD 金叉 或 KDJ 金叉 =====
+        buy = ~holding & ready & (batch.crossed_above("DIF", "DEA") | batch.crossed_above("K", "D"))
+
+        # ===== 卖出：技术面信号 + 最小利润过滤 =====
+        technical_signal = macd_dead | (ready & (j > batch.config("min_j_sell", 90)))
+        amount = batch.amount
+        cost = entry_price * amount
+        sell_total = price * amount
+        sell_fee = sell_total * batch.config("fee_rate", TRADE_FEE_RATE)
+        net_profit = sell_total - cost - np.nan_to_num(batch.buy_fee) - sell_fee
+        min_profit_value = cost * (batch.config("min_profit_pct", 1.0) / 100)
+        sell = holding & technical_signal & (net_profit >= min_profit_value)
+
+        # ===== 止损：触发矩阵 =====
+        active = holding & (np.nan_to_num(entry_price) != 0)
+        max_price = np.where(np.nan_to_num(batch.max_price) != 0, batch.max_price, entry_price)
+        trailing_stop_price = batch.trailing_stop_price
+        with np.errstate(invalid="ignore", divide="ignore"):
+            triggered = np.column_stack([
+                (np.nan_to_num(trailing_stop_price) != 0) & (price < trailing_stop_price),
+                price < entry_price * (1 - batch.config("fixed_stop_loss_pct", 0.02)),
+                price < entry_price - batch.config("atr_stop_multiplier", 2.0) * batch.indicator("ATR"),
+                macd_dead & (price < entry_price),
+                (max_price - price) / max_price >= batch.config("max_drawdown_pct", 0.05),
+            ]) & active[:, None]
+
+        # 排名矩阵：rank[i, m] 为方法 m 在第 i 行优先级中的位置，未启用为 len(STOP_METHODS)
+        disabled = len(STOP_METHODS)
+        priorities = [tuple(p) for p in batch.config_values("stop_loss_priority", DEFAULT_STOP_PRIORITY)]
+        rank_rows = {}
+        for order in set(priorities):
+            position_of = {method: i for i, method in enumerate(order)}
+            rank_rows[order] = [position_of.get(method, disabled) for method in STOP_METHODS]
+        rank = np.array([rank_rows[p] for p in priorities], dtype=np.int64).reshape(len(batch), disabled)
+
+        masked = np.where(triggered, rank, disabled)
+        first = masked.argmin(axis=1)
+        stop_loss = masked[np.arange(len(batch)), first] < disabled
+        stop_reason = np.where(stop_loss, np.array(STOP_METHODS, dtype=object)[first], None)
+
+        return BatchSignals(batch.symbols, buy, sell, stop_loss, stop_reason)
 
     @staticmethod
-    def _check_indicators(indicators: dict) -> bool:
+    def _check_indicators(indicators: "IndicatorSnapshot") -> bool:
         """
-        检查指标是否完整，且每个关键指标序列长度不少于 2（用于计算金叉/死叉）
+        检查指标快照是否存在，且至少包含 2 根 K 线（用于计算金叉/死叉）
         """
-        required_keys = ["DIF", "DEA", "K", "D", "J", "ATR"]
-        return all(key in indicators and len(indicators[key]) >= 2 for key in required_keys)
+        return indicators is not None and indicators.is_ready(2)
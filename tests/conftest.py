@@ -0,0 +1,28 @@
+# 📁 tests/conftest.py
+
+import os
+import sys
+
+import pytest
+
+# 与 tools/ 下的脚本一样，从项目根目录导入模块
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SYMBOL_CONFIG_FILE", os.path.join(ROOT, "config", "symbols.toml"))
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """每个测试在临时目录中运行：日志、持仓、检查点等文件不写入项目目录"""
+    (tmp_path / "logs").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(autouse=True, scope="session")
+def no_telegram():
+    """测试中不发送 Telegram 通知（与回放模式一样关闭）"""
+    from notify import telegram
+    telegram.set_enabled(False)
+    yield
+    telegram.set_enabled(True)
@@ -0,0 +1,110 @@
+# 📁 tests/test_data_quality.py
+
+import pytest
+
+from binance.exchange import set_exchange
+from config import clock as clock_module
+from data import data_quality
+from data.data_quality import load_candles, normalize_candles
+
+MINUTE = 60_000
+SYMBOL = "BTC/USDT"
+
+
+class GappyExchange:
+    """
+    完整的 1m K 线序列；不带 since 的请求返回的窗口中缺少 hidden 里的 K 线（交易所漏数据），
+    带 since 的定向补拉能取到；extra 中的 K 线混在响应里（重复 / 乱序）。记录每次请求。
+    """
+
+    def __init__(self, count, hidden=(), extra=()):
+        self.candles = [[i * MINUTE, 100 + i, 101 + i, 99 + i, 100.5 + i, 1.0] for i in range(count)]
+        self.hidden = {i * MINUTE for i in hidden}
+        self.extra = [list(c) for c in extra]
+        self.requests = []
+
+    def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None):
+        self.requests.append((since, limit))
+        if since is None:
+            rows = [c for c in self.candles[-limit:] if c[0] not in self.hidden]
+            return [list(c) for c in rows + self.extra]
+        return [list(c) for c in self.candles if c[0] >= since][:limit]
+
+
+@pytest.fixture
+def market():
+    clock = clock_module.get_clock()
+    data_quality.reset_candle_cache()
+
+    def make(exchange, now_index):
+        set_exchange(exchange)
+        clock_module.set_clock(clock_module.ReplayClock(now_index * MINUTE / 1000))
+        return exchange
+
+    yield make
+    data_quality.reset_candle_cache()
+    clock_module.set_clock(clock)
+    set_exchange(None)
+
+
+def test_missing_candles_are_refetched_and_merged_in_order(market):
+    exchange = market(GappyExchange(30, hidden=(20, 21, 25)), now_index=29)
+    before = data_quality.get_data_quality_stats()
+
+    candles, issues = load_candles(SYMBOL, "1m", limit=20)
+
+    assert issues == ()
+    assert [c[0] for c in candles] == [i * MINUTE for i in range(10, 30)]
+    assert candles[10] == exchange.candles[20]
+    # 两处缺口各补拉一次，按缺口起点和根数请求
+    assert exchange.requests[1:] == [(20 * MINUTE, 2), (25 * MINUTE, 1)]
+    after = data_quality.get_data_quality_stats()
+    assert after["gaps_detected"] - before["gaps_detected"] == 2
+    assert after["candles_backfilled"] - before["candles_backfilled"] == 3
+
+
+def test_unfillable_gap_is_reported(market):
+    exchange = market(GappyExchange(30, hidden=(20,)), now_index=29)
+    exchange.candles = [c for c in exchange.candles if c[0] != 20 * MINUTE]
+
+    candles, issues = load_candles(SYMBOL, "1m", limit=20)
+
+    assert issues == ("gap",)
+    assert 20 * MINUTE not in [c[0] for c in candles]
+
+
+def test_duplicate_and_out_of_order_candles_are_dropped(market):
+    # 响应中重复返回旧 K 线，并把最后一根（未收盘）以更新后的价格再返回一次
+    latest = [29 * MINUTE, 129, 131, 128, 130.5, 2.0]
+    market(GappyExchange(30, extra=[[15 * MINUTE, 0, 0, 0, 0, 0], latest]), now_index=29)
+
+    candles, issues = load_candles(SYMBOL, "1m", limit=20)
+
+    times = [c[0] for c in candles]
+    assert issues == ()
+    assert times == sorted(set(times))
+    # 同一时间戳保留最后一条
+    assert candles[-1] == latest
+    assert candles[times.index(15 * MINUTE)] == [15 * MINUTE, 0, 0, 0, 0, 0]
+
+
+def test_incremental_fetch_overlapping_the_cache_does_not_duplicate(market):
+    exchange = market(GappyExchange(30), now_index=29)
+    load_candles(SYMBOL, "1m", limit=20)
+
+    # 两分钟后：增量拉取从缓存最后一根开始，与缓存重叠一根
+    exchange.candles = GappyExchange(32).candles
+    exchange.candles[29][4] = 200.0
+    clock_module.get_clock().set(31 * MINUTE / 1000)
+    candles, issues = load_candles(SYMBOL, "1m", limit=20)
+
+    assert exchange.requests[-1] == (29 * MINUTE, 4)
+    assert issues == ()
+    assert [c[0] for c in candles] == [i * MINUTE for i in range(12, 32)]
+    # 上次未收盘的 K 线以最新数据为准
+    assert candles[-3][4] == 200.0
+
+
+def test_normalize_candles_sorts_and_keeps_last_duplicate():
+    rows = [[2, "b"], [1, "a"], [2, "c"], [3, "d"], [1, "e"]]
+    assert normalize_candles(rows) == [[1, "e"], [2, "c"], [3, "d"]]
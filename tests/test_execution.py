@@ -0,0 +1,135 @@
+# 📁 tests/test_execution.py
+
+import pytest
+
+from binance import execution
+from binance.exchange import set_exchange
+from binance.execution import PostOnlyChaser, TWAPExecution, algo_states, resume_execution
+from binance.order_manager import order_manager
+from binance.simulator import SimulatedExchange
+
+
+class FixedPrice:
+    def __init__(self, prices):
+        self.prices = prices
+
+    def fetch_ticker(self, symbol):
+        return {"symbol": symbol, "timestamp": 0, "last": self.prices[symbol]}
+
+
+class FlakyExchange(SimulatedExchange):
+    """撤单后前几次 fetch_order 失败（模拟网络错误）"""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    def cancel_order(self, id, symbol=None, params=None):
+        canceled = super().cancel_order(id, symbol, params)
+        self.failing = self.failures
+        return canceled
+
+    def fetch_order(self, id, symbol=None, params=None):
+        if getattr(self, "failing", 0):
+            self.failing -= 1
+            raise ConnectionError("timeout")
+        return super().fetch_order(id, symbol, params)
+
+
+@pytest.fixture(autouse=True)
+def clean_state(workdir):
+    algo_states.path = str(workdir / "algo_orders.json")
+    order_manager.drain_events()
+    yield
+    set_exchange(None)
+
+
+def make_exchange(cls=SimulatedExchange, **kwargs):
+    exchange = cls(
+        data_source=FixedPrice({"BTC/USDT": 30000.0}), balances={"USDT": 100000, "BTC": 1}, **kwargs
+    )
+    set_exchange(exchange)
+    return exchange
+
+
+def test_interrupted_algo_is_settled_from_saved_children():
+    exchange = make_exchange()
+    algo = TWAPExecution("BTC/USDT", "BUY", 0.03, slices=3, tag={"action": "BUY"})
+    algo_states.save(algo)
+    algo._child(0.01)
+    resting = algo._child(0.01, order_type="limit", price=20000)
+    assert resting["status"] == "open"
+    # 进程在这里退出：母单未回报，状态文件中保留两笔子单
+
+    assert resume_execution(algo.id)
+    [event] = order_manager.drain_events()
+    assert event["filled"] == pytest.approx(0.01)
+    assert event["tag"] == {"action": "BUY"}
+    assert exchange.fetch_order(resting["id"])["status"] == "canceled"
+    assert algo_states.get(algo.id) is None
+    assert not resume_execution(algo.id)
+
+
+def test_chaser_keeps_tracking_child_until_cancel_is_confirmed():
+    # 撤单后连续失败的查询次数超过一次 _cancel 的重试次数，但在 max_chases 轮之内
+    exchange = make_exchange(FlakyExchange, failures=execution.CANCEL_RETRIES + 2)
+    algo = PostOnlyChaser("BTC/USDT", "BUY", 0.01, max_chases=3, fallback_market=False)
+    for _ in algo._execute():
+        pass
+
+    [child] = algo.children
+    assert exchange.fetch_open_orders("BTC/USDT") == []
+    assert exchange.fetch_order(child)["status"] == "canceled"
+    assert algo._working is None
+
+
+
+def test_chaser_keeps_unresolved_child_for_resume_after_max_chases():
+    exchange = make_exchange(FlakyExchange, failures=10 ** 6)
+    algo = PostOnlyChaser("BTC/USDT", "BUY", 0.02, max_chases=2, fallback_market=False, tag={"action": "BUY"})
+    # 第一笔子单立即成交，第二笔挂单后交易所再也查不到状态
+    algo._child(0.01)
+    for _ in algo._run_steps():
+        pass
+
+    [event] = order_manager.drain_events()
+    assert event["filled"] == pytest.approx(0.01)
+    assert event["status"] == "canceled"
+    assert event["tag"] == {"action": "BUY", "resume": algo.id}
+    [child] = algo.unresolved
+    state = algo_states.get(algo.id)
+    assert state["children"] == [child]
+    assert state["amount"] == pytest.approx(0.01)
+    assert state["tag"] == {"action": "BUY"}
+
+    # 交易所恢复后，下次启动按保存的子单结算（子单已撤销，未成交）
+    exchange.failures = exchange.failing = 0
+    assert resume_execution(algo.id)
+    [event] = order_manager.drain_events()
+    assert event["filled"] == 0
+    assert event["tag"] == {"action": "BUY"}
+    assert algo_states.get(algo.id) is None
+
+
+@pytest.mark.parametrize("execution_config, error", [
+    ({"algo": "twap", "slice": 3}, "不支持该参数"),
+    ({"algo": "twap", "sleep": 0}, "不支持该参数"),
+    ({"algo": "twap", "slices": 2.5}, "类型错误"),
+    ({"algo": "chase", "fallback_market": 1}, "类型错误"),
+    ({"algo": "iceberg", "interval": True}, "类型错误"),
+    ({"algo": "vwap"}, "只支持"),
+])
+def test_execution_config_is_checked_against_algo_signature(execution_config, error):
+    from config.symbol_loader import _validate_symbol
+
+    config = {"buy_price": 1, "amount": 1, "trailing_stop_pct": 0.02, "execution": execution_config}
+    with pytest.raises(ValueError, match=error):
+        _validate_symbol("BTC/USDT", config)
+
+
+def test_valid_execution_config_passes():
+    from config.symbol_loader import _validate_symbol
+
+    config = {"buy_price": 1, "amount": 1, "trailing_stop_pct": 0.02,
+              "execution": {"algo": "iceberg", "depth_levels": 3, "depth_fraction": 0.5, "interval": 1}}
+    assert _validate_symbol("BTC/USDT", config)["execution"] == config["execution"]
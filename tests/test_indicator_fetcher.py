@@ -0,0 +1,91 @@
+# 📁 tests/test_indicator_fetcher.py
+
+import numpy as np
+import pytest
+
+from data import indicator_fetcher
+from data.ring_buffer import RingBuffer
+
+MINUTE = 60_000
+
+
+class CandleFeed:
+    """按开盘时间生成 1m K 线，最后一根为未收盘 K 线（可逐笔更新收盘价）"""
+
+    def __init__(self, count=80):
+        self.candles = [self._candle(i, 100 + np.sin(i / 5) * 3) for i in range(count)]
+
+    @staticmethod
+    def _candle(i, close):
+        return [i * MINUTE, close, close + 0.5, close - 0.5, close, 10.0]
+
+    def tick(self, close):
+        """更新未收盘 K 线"""
+        candle = self.candles[-1]
+        candle[4] = close
+        candle[2] = max(candle[2], close)
+        candle[3] = min(candle[3], close)
+
+    def open_next(self, close):
+        """上一根收盘，开出新 K 线"""
+        self.candles.append(self._candle(len(self.candles), close))
+
+    def load(self, symbol, timeframe="1m", limit=200):
+        return [list(c) for c in self.candles[-limit:]], ()
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    feed = CandleFeed()
+    monkeypatch.setattr(indicator_fetcher, "load_candles", feed.load)
+    indicator_fetcher.reset_indicator_state("BTC/USDT")
+    yield feed
+    indicator_fetcher.reset_indicator_state("BTC/USDT")
+
+
+def _fresh(symbol="BTC/USDT"):
+    """丢弃历史后按当前 K 线重新计算（参考值）"""
+    indicator_fetcher.reset_indicator_state(symbol)
+    return indicator_fetcher.get_strategy_indicators(symbol)
+
+
+def test_previous_row_is_last_closed_candle_after_intra_candle_ticks(feed):
+    first = indicator_fetcher.get_strategy_indicators("BTC/USDT")
+    for close in (101.0, 104.0, 97.0):
+        feed.tick(close)
+        snapshot = indicator_fetcher.get_strategy_indicators("BTC/USDT")
+        # 同一根 K 线内的多次更新只覆盖最后一行
+        assert len(snapshot) == len(first)
+        assert snapshot.values[-2].tolist() == first.values[-2].tolist()
+
+    feed.open_next(99.0)
+    snapshot = indicator_fetcher.get_strategy_indicators("BTC/USDT")
+    reference = _fresh()
+    assert len(snapshot) == len(first) + 1
+    assert snapshot.timestamp == reference.timestamp
+    # 上一行是收盘后的最终值，而不是收盘前最后一次轮询时的值
+    np.testing.assert_allclose(snapshot.values[-2], reference.values[-2])
+    np.testing.assert_allclose(snapshot.values[-1], reference.values[-1])
+
+
+def test_history_is_rebuilt_when_window_misses_the_open_candles_close(feed, monkeypatch):
+    indicator_fetcher.get_strategy_indicators("BTC/USDT")
+    open_key = feed.candles[-1][0]
+    feed.tick(108.0)
+    feed.open_next(99.0)
+    # MACD 预热 33 根：窗口从第 47 根开始时，第一行有效指标恰好是新开的 K 线，拿不到上一根的收盘值
+    monkeypatch.setattr(indicator_fetcher, "load_candles", lambda symbol, timeframe="1m", limit=200: (
+        [list(c) for c in feed.candles[47:]], ()))
+    snapshot = indicator_fetcher.get_strategy_indicators("BTC/USDT")
+    keys = indicator_fetcher._indicator_buffers.get("BTC/USDT").keys().tolist()
+    assert open_key not in keys
+    assert snapshot.timestamp == feed.candles[-1][0]
+
+
+def test_ring_buffer_overwrites_same_key_and_ignores_older_keys():
+    buffer = RingBuffer(3, 1)
+    for key, value in ((1, 1.0), (2, 2.0), (2, 2.5), (3, 3.0), (4, 4.0), (3, 9.0)):
+        buffer.append(key, [value])
+    assert buffer.keys().tolist() == [2, 3, 4]
+    assert buffer.to_array()[:, 0].tolist() == [2.5, 3.0, 4.0]
+    assert buffer.row(-2)[0] == 3.0
@@ -0,0 +1,130 @@
+# 📁 tests/test_journal.py
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import binance.execution as execution_module
+import config.position as position_module
+import core.signal_handler as signal_handler
+from binance.exchange import get_exchange, set_exchange
+from binance.simulator import SimulatedExchange
+from config import clock as clock_module
+from config.config import SYMBOL_CONFIGS
+from core.journal import Journal
+from core.risk_engine import risk_engine
+from notify import telegram
+
+
+class FixedPrice:
+    def fetch_ticker(self, symbol):
+        return {"symbol": symbol, "timestamp": 0, "last": 30000.0}
+
+
+@pytest.fixture
+def isolated(monkeypatch):
+    """start_replay 会替换全局状态，测试结束后全部恢复"""
+    configs = dict(SYMBOL_CONFIGS)
+    monkeypatch.setattr(position_module, "POSITION_FILE", position_module.POSITION_FILE)
+    monkeypatch.setattr(execution_module.algo_states, "path", execution_module.algo_states.path)
+    monkeypatch.setattr(signal_handler, "TRADE_LOG_DIR", signal_handler.TRADE_LOG_DIR)
+    monkeypatch.setattr(risk_engine, "state_file", None)
+    clock = clock_module.get_clock()
+    yield
+    clock_module.set_clock(clock)
+    execution_module.run_inline(False)
+    SYMBOL_CONFIGS.clear()
+    SYMBOL_CONFIGS.update(configs)
+    telegram.set_enabled(False)
+    set_exchange(None)
+
+
+def test_replay_uses_recorded_simulator_params_and_total_balances(isolated, tmp_path):
+    exchange = SimulatedExchange(
+        data_source=FixedPrice(), balances={"USDT": 1000.0, "BTC": 0.5},
+        spread_bps=15, book_levels=7, level_notional=1234,
+    )
+    exchange.create_order("BTC/USDT", "limit", "buy", 0.01, price=20000)   # 冻结 200 USDT
+    set_exchange(exchange)
+
+    path = str(tmp_path / "session.journal")
+    recorder = Journal()
+    recorder.start_recording(path)
+    recorder.end_cycle()
+    recorder._writer.close()
+
+    Journal().start_replay(path)
+    replay = get_exchange()
+    assert replay is not exchange
+    assert (replay.spread_bps, replay.book_levels, replay.level_notional) == (15, 7, 1234)
+    balance = replay.fetch_balance()
+    assert balance["free"]["USDT"] == pytest.approx(1000.0)
+    assert balance["free"]["BTC"] == pytest.approx(0.5)
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 用合成行情（tools/soak_test.py）和模拟时钟录制一段运行日志
+RECORD_SCRIPT = """
+import sys
+from tools.soak_test import SyntheticMarket
+from config import clock
+from binance.exchange import set_exchange
+from binance.simulator import SimulatedExchange
+from core.journal import journal
+from core.strategy_runner import run_loop
+from notify.telegram import set_enabled
+
+replay_clock = clock.ReplayClock(1_700_000_000)
+clock.set_clock(replay_clock)
+set_enabled(False)
+market = SyntheticMarket(replay_clock, {"BTC/USDT": 30000}, seed=3)
+set_exchange(SimulatedExchange(data_source=market, balances={"USDT": 1_000_000}))
+journal.start_recording(sys.argv[1])
+try:
+    run_loop(max_cycles=int(sys.argv[2]))
+finally:
+    journal.finish()
+"""
+
+TWAP_SYMBOLS = """
+["BTC/USDT"]
+buy_price = 1000000
+amount = 0.01
+execution = { algo = "twap", slices = 4, duration = 40 }
+trailing_stop_pct = 0.02
+"""
+
+
+def _run(args, cwd, symbols_file):
+    env = dict(os.environ, PYTHONPATH=ROOT, SYMBOL_CONFIG_FILE=symbols_file)
+    return subprocess.run([sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+
+
+def test_replays_with_execution_algo_are_deterministic(tmp_path):
+    symbols_file = tmp_path / "symbols.toml"
+    symbols_file.write_text(TWAP_SYMBOLS)
+    record_dir = tmp_path / "record"
+    (record_dir / "logs").mkdir(parents=True)
+    result = _run(["-c", RECORD_SCRIPT, "session.journal", "400"], record_dir, str(symbols_file))
+    assert result.returncode == 0, result.stderr
+    assert "twap 执行算法" in (record_dir / "logs" / "trade_log.txt").read_text()
+
+    outcomes = []
+    for name in ("first", "second"):
+        replay_dir = tmp_path / name
+        (replay_dir / "logs").mkdir(parents=True)
+        shutil.copy(record_dir / "session.journal", replay_dir / "session.journal")
+        result = _run([os.path.join(ROOT, "bot.py"), "--replay", "session.journal"], replay_dir, str(symbols_file))
+        # 每个决策都与录制一致，两次回放的决策自然相同
+        assert result.returncode == 0, (replay_dir / "logs" / "trade_log.txt").read_text()[-2000:]
+        trades = sorted((replay_dir / "logs" / "replay").glob("*")) if (replay_dir / "logs" / "replay").exists() else []
+        outcomes.append((
+            (replay_dir / "session.journal.position.json").read_text(),
+            # 交易记录的时间列是写入时的系统时间，只比较其余各列
+            [[line.split(",", 1)[-1] for line in path.read_text().splitlines()] for path in trades],
+        ))
+    assert outcomes[0] == outcomes[1]
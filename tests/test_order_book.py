@@ -0,0 +1,132 @@
+# 📁 tests/test_order_book.py
+
+import pytest
+
+from binance.depth_stream import DepthStream, stream_name
+from data.order_book import LocalOrderBook, OrderBookGap, OrderBookManager
+
+SYMBOL = "BTC/USDT"
+
+
+def diff(first, last, bids=(), asks=()):
+    return {"e": "depthUpdate", "U": first, "u": last, "b": [list(l) for l in bids], "a": [list(l) for l in asks]}
+
+
+class Snapshots:
+    """按顺序返回预设的 REST 快照"""
+
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+
+    def __call__(self, symbol, depth):
+        return self.snapshots.pop(0)
+
+
+def snapshot(nonce, bids=(("100", "1"), ("99", "2")), asks=(("101", "1"), ("102", "3"))):
+    return {"bids": [list(l) for l in bids], "asks": [list(l) for l in asks], "nonce": nonce}
+
+
+@pytest.fixture
+def make_manager():
+    """不启动后台同步线程，测试里直接调用 _resync"""
+    def make(*snapshots):
+        manager = OrderBookManager(snapshot_fetcher=Snapshots(*snapshots), max_age=1e9)
+        manager._ensure_worker = lambda: None
+        return manager
+    return make
+
+
+def test_buffered_diffs_replay_from_the_one_straddling_the_snapshot(make_manager):
+    manager = make_manager(snapshot(100))
+    manager.on_event(SYMBOL, diff(90, 95, bids=[("98", "5")]))       # 早于快照，丢弃
+    manager.on_event(SYMBOL, diff(96, 101, asks=[("101", "4")]))     # U <= 101 <= u，第一条生效
+    manager.on_event(SYMBOL, diff(102, 103, bids=[("100.5", "1")]))
+    assert manager.top(SYMBOL) is None
+
+    assert manager._resync(SYMBOL)
+    book = manager._books[SYMBOL]
+    assert book.last_update_id == 103
+    assert book.bids.levels() == [(100.5, 1.0), (100.0, 1.0), (99.0, 2.0)]
+    assert book.asks.levels() == [(101.0, 4.0), (102.0, 3.0)]
+
+
+def test_stale_diff_is_ignored():
+    book = LocalOrderBook(SYMBOL)
+    book.load_snapshot([("100", "1")], [("101", "1")], 50)
+    assert book.apply(diff(45, 50, bids=[("100", "9")])) is False
+    assert book.last_update_id == 50
+    assert book.bids.best() == (100.0, 1.0)
+
+
+def test_gap_drops_the_book_and_resyncs(make_manager):
+    manager = make_manager(snapshot(100), snapshot(110, bids=[("100", "7")]))
+    manager.on_event(SYMBOL, diff(101, 101))
+    assert manager._resync(SYMBOL)
+    assert manager._queue.get_nowait() == SYMBOL
+
+    manager.on_event(SYMBOL, diff(105, 106))                          # 缺了 102 ~ 104
+    assert manager.stats()["gaps"] == 1
+    assert SYMBOL not in manager._books
+    assert manager._queue.get_nowait() == SYMBOL
+
+    # 快照比缓冲的事件新，缓冲事件作为过期事件丢弃
+    manager.on_event(SYMBOL, diff(107, 108))
+    assert manager._resync(SYMBOL)
+    assert manager._books[SYMBOL].last_update_id == 110
+    assert manager.top(SYMBOL).best_bid == 100.0
+    assert manager.stats()["resyncs"] == 2
+
+
+def test_snapshot_older_than_buffered_diffs_is_refetched(make_manager):
+    manager = make_manager(snapshot(100), snapshot(120))
+    manager.on_event(SYMBOL, diff(110, 112))
+    assert not manager._resync(SYMBOL)
+    assert manager.stats()["stale_snapshots"] == 1
+    assert manager.top(SYMBOL) is None
+
+    manager.on_event(SYMBOL, diff(113, 121, asks=[("101", "0.5")]))
+    assert manager._resync(SYMBOL)
+    assert manager._books[SYMBOL].last_update_id == 121
+
+
+def test_zero_quantity_removes_level():
+    book = LocalOrderBook(SYMBOL)
+    book.load_snapshot([("100", "1"), ("99", "2")], [("101", "1"), ("102", "3")], 10)
+    book.apply(diff(11, 11, bids=[("100", "0")], asks=[("101", "0.000")]))
+    assert book.bids.levels() == [(99.0, 2.0)]
+    assert book.asks.levels() == [(102.0, 3.0)]
+    # 删除不存在的档位不报错
+    book.apply(diff(12, 12, bids=[("50", "0")]))
+    assert len(book.bids) == 1
+
+
+def test_crossed_book_raises_gap():
+    book = LocalOrderBook(SYMBOL)
+    book.load_snapshot([("100", "1")], [("101", "1")], 10)
+    with pytest.raises(OrderBookGap):
+        book.apply(diff(11, 11, bids=[("101.5", "1")]))
+
+
+def test_top_after_updates(make_manager):
+    manager = make_manager(snapshot(10))
+    manager.on_event(SYMBOL, diff(11, 11))
+    manager._resync(SYMBOL)
+    manager.on_event(SYMBOL, diff(12, 12, bids=[("100.5", "3")], asks=[("101", "0")]))
+
+    top = manager.top(SYMBOL)
+    assert (top.best_bid, top.best_ask) == (100.5, 102.0)
+    assert top.mid == pytest.approx(101.25)
+    assert top.spread == pytest.approx(1.5)
+    assert top.spread_bps == pytest.approx(1.5 / 101.25 * 10000)
+    # 买量 1 + 2 + 3，卖量 3
+    assert top.imbalance == pytest.approx((6 - 3) / 9)
+
+
+def test_depth_stream_resubscribes_only_when_symbols_change():
+    stream = DepthStream(books=None)
+    stream.set_symbols({"ETH/USDT": {}, SYMBOL: {}})
+    assert stream._symbols == (SYMBOL, "ETH/USDT")
+    stream._changed.clear()
+    stream.set_symbols([SYMBOL, "ETH/USDT"])
+    assert not stream._changed.is_set()
+    assert stream_name(SYMBOL).startswith("btcusdt@depth")
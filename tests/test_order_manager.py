@@ -0,0 +1,108 @@
+# 📁 tests/test_order_manager.py
+
+import pytest
+
+from binance.exchange import set_exchange
+from binance.order_manager import OrderManager
+from binance.services import reset_precision_cache
+from binance.simulator import SimulatedExchange
+
+
+class SymbolRequiredExchange(SimulatedExchange):
+    """与 ccxt.binance 默认行为一致：不带交易对查询挂单时报错"""
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        if symbol is None:
+            raise RuntimeError("fetchOpenOrders() WARNING: fetching open orders without specifying a symbol")
+        return super().fetch_open_orders(symbol, since, limit, params)
+
+
+class FixedPrice:
+    def __init__(self, prices):
+        self.prices = prices
+
+    def fetch_ticker(self, symbol):
+        return {"symbol": symbol, "timestamp": 0, "last": self.prices[symbol]}
+
+
+@pytest.fixture
+def exchange():
+    return SymbolRequiredExchange(
+        data_source=FixedPrice({"BTC/USDT": 30000.0, "ETH/USDT": 2000.0}),
+        balances={"USDT": 100000, "BTC": 1, "ETH": 10},
+    )
+
+
+def test_poll_times_out_orders_on_symbol_required_venue(exchange):
+    now = [0.0]
+    manager = OrderManager(exchange=exchange, clock=lambda: now[0])
+    btc = exchange.create_order("BTC/USDT", "limit", "buy", 0.01, price=20000)
+    eth = exchange.create_order("ETH/USDT", "limit", "sell", 1, price=3000)
+    manager.track(btc, "BTC/USDT", "BUY", timeout_seconds=10)
+    manager.track(eth, "ETH/USDT", "SELL", timeout_seconds=10)
+
+    manager.poll()
+    assert sorted(manager.open_orders()) == sorted([btc["id"], eth["id"]])
+
+    now[0] = 11
+    manager.poll()
+    assert manager.open_orders() == []
+    events = manager.drain_events()
+    assert sorted(e["symbol"] for e in events) == ["BTC/USDT", "ETH/USDT"]
+    assert all(e["status"] == "canceled" for e in events)
+
+
+def test_poll_settles_filled_order(exchange):
+    manager = OrderManager(exchange=exchange, clock=lambda: 0.0)
+    order = exchange.create_order("BTC/USDT", "limit", "buy", 0.01, price=20000)
+    manager.track(order, "BTC/USDT", "BUY", timeout_seconds=60)
+
+    exchange.data_source.prices["BTC/USDT"] = 19000.0
+    exchange.fetch_ticker("BTC/USDT")   # 价格穿越挂单价，按 maker 成交
+    manager.poll()
+
+    [event] = manager.drain_events()
+    assert event["status"] == "closed"
+    assert event["filled"] == pytest.approx(0.01)
+    assert event["average"] == pytest.approx(20000)
+
+
+@pytest.fixture
+def default_exchange(exchange):
+    """精度信息从默认交易所读取（BTC/USDT 数量精度 0.00001，最小金额 5 USDT）"""
+    set_exchange(exchange)
+    reset_precision_cache()
+    yield exchange
+    reset_precision_cache()
+    set_exchange(None)
+
+
+def _time_out_partially_filled(exchange, filled):
+    now = [0.0]
+    manager = OrderManager(exchange=exchange, clock=lambda: now[0])
+    order = exchange.create_order("BTC/USDT", "limit", "buy", 0.01, price=20000)
+    manager.track(order, "BTC/USDT", "BUY", timeout_seconds=10, reprice=True)
+    manager._tracked[order["id"]]["filled"] = filled
+    now[0] = 11
+    manager.poll()
+    return manager
+
+
+def test_reprice_rounds_remaining_amount_to_step_size(default_exchange):
+    manager = _time_out_partially_filled(default_exchange, filled=0.01 / 3)
+    [order_id] = manager.open_orders()
+    assert default_exchange.fetch_order(order_id)["amount"] == 0.00666
+
+
+def test_reprice_skipped_when_remaining_below_minimum(default_exchange):
+    manager = _time_out_partially_filled(default_exchange, filled=0.00999)
+    assert manager.open_orders() == []
+    [event] = manager.drain_events()
+    assert event["status"] == "canceled"
+
+
+def test_report_treats_fill_within_half_step_as_closed():
+    manager = OrderManager(exchange=object())
+    manager.report("BTC/USDT", "BUY", 0.01, 0.0099999999, 300.0, 0.3, "canceled", step_size=0.00001)
+    manager.report("BTC/USDT", "BUY", 0.01, 0.00999, 300.0, 0.3, "canceled", step_size=0.00001)
+    assert [e["status"] for e in manager.drain_events()] == ["closed", "canceled"]
@@ -0,0 +1,117 @@
+# 📁 tests/test_reconciler.py
+
+import shutil
+
+import pytest
+
+from binance.exchange import set_exchange
+from config.position import PositionBook, load_position
+from core.reconciler import Reconciler
+
+SYMBOL = "BTC/USDT"
+
+
+class PagedTrades:
+    """按 fromId 分页返回成交的交易所替身，记录每次请求的 fromId"""
+
+    def __init__(self):
+        self.trades = {SYMBOL: []}
+        self.requests = []
+
+    def add(self, side, amount, price):
+        trades = self.trades[SYMBOL]
+        trade_id = len(trades) + 1
+        trades.append({
+            "id": str(trade_id), "symbol": SYMBOL, "side": side, "amount": amount, "price": price,
+            "cost": amount * price, "timestamp": trade_id * 1000, "fee": {"cost": 0.1, "currency": "USDT"},
+        })
+
+    def fetch_my_trades(self, symbol, limit=None, params=None):
+        trades = self.trades.get(symbol, [])
+        from_id = (params or {}).get("fromId")
+        if symbol == SYMBOL:
+            self.requests.append(from_id)
+        if from_id is None:
+            return trades[-limit:]
+        return [t for t in trades if int(t["id"]) >= from_id][:limit]
+
+    def fetch_open_orders(self, symbol=None):
+        return []
+
+
+@pytest.fixture
+def exchange():
+    exchange = PagedTrades()
+    set_exchange(exchange)
+    yield exchange
+    set_exchange(None)
+
+
+def test_first_run_only_records_the_latest_trade_id(exchange, workdir):
+    for _ in range(5):
+        exchange.add("buy", 1.0, 100.0)
+    position = PositionBook()
+
+    summary = Reconciler(state_file=str(workdir / "state.json"), page_size=3).run(position)
+
+    assert summary["trades"] == 0
+    assert exchange.requests == [None]
+    assert not position.ensure(SYMBOL).holding
+
+
+def test_new_trades_are_paged_from_the_checkpoint_and_fix_the_position(exchange, workdir):
+    state_file = str(workdir / "state.json")
+    exchange.add("buy", 1.0, 100.0)
+    Reconciler(state_file=state_file, page_size=3).run(PositionBook())
+
+    # 崩溃期间的成交：买入 7 笔，再卖出 2 笔
+    for i in range(7):
+        exchange.add("buy", 1.0, 100.0 + i)
+    exchange.add("sell", 1.0, 110.0)
+    exchange.add("sell", 1.0, 111.0)
+    exchange.requests.clear()
+
+    # 新的 Reconciler 实例从检查点文件继续
+    position = PositionBook()
+    summary = Reconciler(state_file=state_file, page_size=3).run(position)
+
+    # 9 笔新成交（ID 2 ~ 10）按 3 条一页拉取：2, 5, 8 三页都是满页，再从 11 拉一次确认没有更多
+    assert exchange.requests == [2, 5, 8, 11]
+    assert summary["trades"] == 9
+    assert summary["fixed"] == [SYMBOL]
+    record = load_position()[SYMBOL]
+    assert record.holding
+    assert record.amount == pytest.approx(5.0)
+    # 卖出按平均成本减少成本：(100 + ... + 106) / 7 = 103
+    assert record.entry_price == pytest.approx(103.0)
+    assert record.buy_fee == pytest.approx(0.7 * 5 / 7)
+
+    exchange.requests.clear()
+    Reconciler(state_file=state_file, page_size=3).run(position)
+    # 检查点已前进到 10
+    assert exchange.requests == [11]
+
+
+def test_rerun_replaying_the_same_trades_is_idempotent(exchange, workdir):
+    state_file = str(workdir / "state.json")
+    Reconciler(state_file=state_file).run(PositionBook())
+    checkpoint = str(workdir / "checkpoint.bak")
+    shutil.copy(state_file, checkpoint)
+    for i in range(4):
+        exchange.add("buy", 0.5, 200.0 + i)
+
+    first = Reconciler(state_file=state_file, page_size=2).run(load_position())
+    after_first = load_position()[SYMBOL].to_record()
+    assert first["fixed"] == [SYMBOL]
+
+    # 没有新成交：不修正任何持仓
+    again = Reconciler(state_file=state_file, page_size=2).run(load_position())
+    assert again["trades"] == 0 and again["fixed"] == []
+    assert load_position()[SYMBOL].to_record() == after_first
+
+    # 写完持仓、写检查点前崩溃：下次启动按旧检查点重放同样的成交，结果相同
+    shutil.copy(checkpoint, state_file)
+    replayed = Reconciler(state_file=state_file, page_size=2).run(load_position())
+    assert replayed["trades"] == 4
+    assert replayed["fixed"] == []
+    assert load_position()[SYMBOL].to_record() == after_first
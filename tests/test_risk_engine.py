@@ -0,0 +1,162 @@
+# 📁 tests/test_risk_engine.py
+
+import time
+
+import pytest
+
+from config.position import PositionBook
+from core import signal_handler
+from core.risk_engine import RiskEngine
+
+# 本地时间 2026-01-05 12:00，风控按本地日期切换当日盈亏
+NOON = time.mktime((2026, 1, 5, 12, 0, 0, 0, 0, -1))
+DAY = 86400
+
+
+@pytest.fixture
+def clock():
+    now = [NOON]
+    return now
+
+
+@pytest.fixture
+def engine(monkeypatch, clock):
+    def make(limits, state_file=None):
+        engine = RiskEngine(limits=limits, state_file=state_file, clock=lambda: clock[0])
+        monkeypatch.setattr(signal_handler, "risk_engine", engine)
+        return engine
+    return make
+
+
+def buy_fill(price, amount):
+    return {"filled": amount, "average": price, "fee": 0.0, "complete": True}
+
+
+def sell_fill(price, amount, complete):
+    return {"filled": amount, "average": price, "fee": 0.0, "complete": complete}
+
+
+def test_exposure_follows_reserve_fill_partial_sell_and_close(engine):
+    risk = engine({"max_gross_exposure": 1000, "max_asset_exposure": 600})
+    position = PositionBook()
+
+    risk.reserve("BTC/USDT", 300)
+    assert risk.snapshot()["reserved"] == pytest.approx(300)
+    # 预留金额计入总敞口和资产敞口：同一资产的不同报价对合并计算
+    assert risk.check_buy("BTC/FDUSD", 300) is None
+    assert "BTC 敞口" in risk.check_buy("BTC/FDUSD", 301)
+
+    signal_handler.apply_buy_fill("BTC/USDT", buy_fill(30000.0, 0.01), position)
+    risk.reserve("BTC/FDUSD", 200)
+    signal_handler.apply_buy_fill("BTC/FDUSD", buy_fill(20000.0, 0.01), position)
+    risk.reserve("ETH/USDT", 400)
+    signal_handler.apply_buy_fill("ETH/USDT", buy_fill(2000.0, 0.2), position)
+
+    snapshot = risk.snapshot()
+    assert snapshot["reserved"] == 0.0
+    assert snapshot["gross_exposure"] == pytest.approx(900)
+    assert snapshot["asset_exposure"] == pytest.approx({"BTC": 500, "ETH": 400})
+    assert "总敞口" in risk.check_buy("SOL/USDT", 101)
+    assert risk.check_buy("SOL/USDT", 100) is None
+
+    # 部分卖出按剩余持仓成本更新
+    holding = position["BTC/USDT"]
+    signal_handler.settle_sell("BTC/USDT", sell_fill(31000.0, 0.004, False), holding, position)
+    snapshot = risk.snapshot()
+    assert snapshot["gross_exposure"] == pytest.approx(780)
+    assert snapshot["asset_exposure"] == pytest.approx({"BTC": 380, "ETH": 400})
+
+    for symbol in ("BTC/USDT", "BTC/FDUSD", "ETH/USDT"):
+        holding = position[symbol]
+        signal_handler.settle_sell(symbol, sell_fill(holding.entry_price, holding.amount, True), holding, position)
+
+    snapshot = risk.snapshot()
+    assert snapshot["gross_exposure"] == 0.0
+    assert snapshot["asset_exposure"] == {}
+    assert risk.check_buy("BTC/USDT", 600) is None
+
+
+def test_per_asset_limit_overrides_the_default(engine):
+    risk = engine({"max_asset_exposure": 100, "asset_exposure_limits": {"BTC": 500}})
+    risk.set_exposure("BTC/USDT", 450)
+    assert risk.check_buy("BTC/FDUSD", 50) is None
+    assert risk.check_buy("BTC/FDUSD", 51) is not None
+    assert risk.check_buy("ETH/USDT", 101) is not None
+
+
+def test_rebuild_restores_exposure_from_positions(engine):
+    risk = engine({})
+    position = PositionBook()
+    position.ensure("BTC/USDT").open(price=100.0, amount=2.0, fee=0.0, trailing_pct=0.02)
+    position.ensure("ETH/USDT")
+    risk.set_exposure("SOL/USDT", 999)
+
+    risk.rebuild(position)
+
+    snapshot = risk.snapshot()
+    assert snapshot["gross_exposure"] == pytest.approx(200)
+    assert snapshot["asset_exposure"] == pytest.approx({"BTC": 200})
+
+
+def test_daily_loss_limit_resets_on_the_next_day(engine, clock):
+    risk = engine({"daily_loss_limit": 100})
+
+    risk.record_close("BTC/USDT", -60, "SELL")
+    assert risk.check_buy("BTC/USDT", 10) is None
+    risk.record_close("ETH/USDT", -40, "SELL")
+    assert "当日亏损" in risk.check_buy("BTC/USDT", 10)
+
+    # 同一天晚些时候仍然禁止开仓
+    clock[0] = NOON + 11 * 3600
+    assert risk.check_buy("BTC/USDT", 10) is not None
+
+    # 本地时间跨过零点，当日盈亏清零
+    clock[0] = NOON + 12 * 3600 + 1
+    assert risk.check_buy("BTC/USDT", 10) is None
+    assert risk.snapshot()["realized_pnl_today"] == 0.0
+
+    # 新的一天只计当日的盈亏
+    risk.record_close("BTC/USDT", 30, "SELL")
+    risk.record_close("BTC/USDT", -90, "SELL")
+    assert risk.snapshot()["realized_pnl_today"] == pytest.approx(-60)
+    assert risk.check_buy("BTC/USDT", 10) is None
+
+
+def test_consecutive_stop_losses_trip_the_breaker(engine, clock):
+    risk = engine({"max_consecutive_stop_losses": 3, "circuit_breaker_cooldown": 600})
+
+    # 中间出现非止损平仓，计数清零
+    risk.record_close("BTC/USDT", -10, "STOP_LOSS")
+    risk.record_close("BTC/USDT", -10, "STOP_LOSS")
+    risk.record_close("BTC/USDT", 5, "SELL")
+    assert risk.snapshot()["consecutive_stop_losses"] == 0
+    assert risk.check_buy("BTC/USDT", 10) is None
+
+    for _ in range(3):
+        risk.record_close("ETH/USDT", -10, "STOP_LOSS")
+    snapshot = risk.snapshot()
+    assert snapshot["circuit_breaker_active"]
+    assert snapshot["consecutive_stop_losses"] == 0
+    assert "熔断" in risk.check_buy("BTC/USDT", 10)
+
+    clock[0] = NOON + 599
+    assert risk.check_buy("BTC/USDT", 10) is not None
+    clock[0] = NOON + 600
+    assert risk.check_buy("BTC/USDT", 10) is None
+    assert not risk.snapshot()["circuit_breaker_active"]
+
+
+def test_breaker_and_daily_loss_survive_restart(engine, clock, workdir):
+    limits = {"max_consecutive_stop_losses": 2, "circuit_breaker_cooldown": 600, "daily_loss_limit": 1000}
+    state_file = str(workdir / "risk_state.json")
+    risk = engine(limits, state_file=state_file)
+    risk.record_close("BTC/USDT", -10, "STOP_LOSS")
+    risk.record_close("BTC/USDT", -15, "STOP_LOSS")
+
+    restarted = engine(limits, state_file=state_file)
+    assert restarted.state() == risk.state()
+    assert restarted.check_buy("BTC/USDT", 10) is not None
+    assert restarted.snapshot()["realized_pnl_today"] == pytest.approx(-25)
+
+    clock[0] = NOON + 600
+    assert restarted.check_buy("BTC/USDT", 10) is None
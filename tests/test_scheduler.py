@@ -0,0 +1,24 @@
+# 📁 tests/test_scheduler.py
+
+import pytest
+
+from core import scheduler as scheduler_module
+from core.scheduler import SymbolScheduler
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "CANDLE_CLOSE_DELAY", 2)
+    return SymbolScheduler(timeframe="1m")
+
+
+@pytest.mark.parametrize("now, expected", [
+    (6000, 6002),      # 刚收盘，仍在延迟窗口内：本次收盘的检查时间
+    (6001.5, 6002),
+    (6002, 6062),      # 已到本次检查时间：下一次收盘
+    (6030, 6062),
+    (6059.9, 6062),
+    (6061.9, 6062),
+])
+def test_next_candle_close_handles_the_delay_window(scheduler, now, expected):
+    assert scheduler.next_candle_close(now) == expected
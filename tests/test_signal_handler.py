@@ -0,0 +1,103 @@
+# 📁 tests/test_signal_handler.py
+
+import pytest
+
+from binance.order_manager import order_manager
+from config.config import SYMBOL_CONFIGS
+from config.position import PositionBook, load_position
+from core.signal_handler import process_order_events
+
+
+@pytest.fixture
+def removed_symbol():
+    """模拟挂单期间币种被热加载从配置中移除"""
+    symbol = "ETH/USDT"
+    config = SYMBOL_CONFIGS.pop(symbol)
+    yield symbol
+    SYMBOL_CONFIGS[symbol] = config
+
+
+def test_buy_fill_for_removed_symbol_is_recorded(removed_symbol):
+    position = PositionBook()
+    position.ensure(removed_symbol).pending_order = "42"
+    order_manager.drain_events()
+    order_manager.report(removed_symbol, "BUY", 0.5, 0.5, 1000.0, 1.0, "closed", {"action": "BUY"})
+
+    process_order_events(position)
+
+    record = load_position()[removed_symbol]
+    assert record.holding
+    assert record.amount == pytest.approx(0.5)
+    assert record.entry_price == pytest.approx(2000.0)
+    assert record.pending_order is None
+
+
+def test_partial_stop_loss_fills_count_as_one_close(monkeypatch):
+    from core import signal_handler
+    from core.risk_engine import RiskEngine
+
+    engine = RiskEngine(limits={"max_consecutive_stop_losses": 2, "circuit_breaker_cooldown": 60}, state_file=None)
+    monkeypatch.setattr(signal_handler, "risk_engine", engine)
+    position = PositionBook()
+    record = position.ensure("BTC/USDT")
+    record.open(price=100.0, amount=3.0, fee=0.3, trailing_pct=0.02)
+
+    for complete in (False, False, True):
+        fill = {"filled": 1.0, "average": 90.0, "fee": 0.09, "complete": complete}
+        signal_handler.settle_sell("BTC/USDT", fill, position["BTC/USDT"], position, action="STOP_LOSS")
+        if not complete:
+            assert engine.state()["consecutive_stop_losses"] == 0
+            assert engine.state()["realized_pnl"] == 0.0
+
+    state = engine.state()
+    assert state["consecutive_stop_losses"] == 1
+    assert engine.check_buy("BTC/USDT", 10) is None
+    assert state["realized_pnl"] == pytest.approx(3 * (90.0 - 100.0) - 0.3 - 3 * 0.09)
+    assert not position["BTC/USDT"].holding
+    assert position["BTC/USDT"].realized_pnl is None
+
+
+def test_buy_reservation_is_released_when_submit_raises(monkeypatch):
+    from core import signal_handler
+    from core.risk_engine import RiskEngine
+
+    engine = RiskEngine(limits={}, state_file=None)
+    monkeypatch.setattr(signal_handler, "risk_engine", engine)
+
+    def broken_submit(*args, **kwargs):
+        raise TypeError("unexpected keyword argument 'slice'")
+
+    monkeypatch.setattr(signal_handler, "submit_order", broken_submit)
+    position = PositionBook()
+    signal_handler.handle_buy("BTC/USDT", 30000.0, position)
+
+    assert engine.snapshot()["reserved"] == 0.0
+    assert not position["BTC/USDT"].holding
+    assert position["BTC/USDT"].pending_order is None
+
+
+def test_unresolved_algo_child_keeps_pending_and_late_fill_merges(monkeypatch):
+    from core import signal_handler
+    from core.risk_engine import RiskEngine
+
+    engine = RiskEngine(limits={}, state_file=None)
+    monkeypatch.setattr(signal_handler, "risk_engine", engine)
+    position = PositionBook()
+    order_manager.drain_events()
+
+    # 母单回报已确认的成交，仍有子单未确认：持仓建立，挂单标记保留
+    order_manager.report("BTC/USDT", "BUY", 0.02, 0.01, 100.0, 0.1, "canceled", {"action": "BUY", "resume": "algo-x"})
+    process_order_events(position)
+    record = position["BTC/USDT"]
+    assert record.holding and record.amount == pytest.approx(0.01)
+    assert record.pending_order == "algo-x"
+
+    # 下次启动结算遗留子单的成交，并入持仓
+    order_manager.report("BTC/USDT", "BUY", 0.01, 0.01, 120.0, 0.12, "closed", {"action": "BUY"})
+    process_order_events(position)
+    record = position["BTC/USDT"]
+    assert record.amount == pytest.approx(0.02)
+    assert record.entry_price == pytest.approx(11000.0)
+    assert record.buy_fee == pytest.approx(0.22)
+    assert record.pending_order is None
+    assert engine.snapshot()["gross_exposure"] == pytest.approx(220.0)
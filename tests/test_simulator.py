@@ -0,0 +1,52 @@
+# 📁 tests/test_simulator.py
+
+import threading
+
+from binance.simulator import SimulatedExchange
+
+
+class FixedPrice:
+    def __init__(self):
+        self.calls = 0
+
+    def fetch_ticker(self, symbol):
+        self.calls += 1
+        return {"symbol": symbol, "timestamp": 0, "last": 30000.0}
+
+
+def test_latency_and_ticker_refresh_do_not_hold_the_matching_lock():
+    entered, unblock = threading.Event(), threading.Event()
+
+    def slow_sleep(seconds):
+        # 只阻塞下单线程的模拟延迟
+        if threading.current_thread().name == "placer":
+            entered.set()
+            unblock.wait(5)
+
+    exchange = SimulatedExchange(data_source=FixedPrice(), latency_ms=100, sleep=slow_sleep)
+    resting = exchange.create_order("BTC/USDT", "limit", "buy", 0.01, price=20000)
+
+    placer = threading.Thread(
+        target=exchange.create_order, args=("BTC/USDT", "market", "buy", 0.01), name="placer"
+    )
+    placer.start()
+    assert entered.wait(5)
+    results = []
+
+    def others():
+        # 下单线程仍在模拟延迟中，其他线程可以查询、撤单、刷新行情
+        results.append(exchange.fetch_open_orders("BTC/USDT")[0]["id"])
+        results.append(exchange.cancel_order(resting["id"], "BTC/USDT")["status"])
+        results.append(exchange.fetch_ticker("BTC/USDT")["last"])
+
+    checker = threading.Thread(target=others)
+    checker.start()
+    checker.join(1)
+    finished = not checker.is_alive()
+    unblock.set()
+    placer.join(5)
+    checker.join(5)
+    assert finished, "下单线程的模拟延迟阻塞了其他线程"
+    assert results == [resting["id"], "canceled", 30000.0]
+    assert not placer.is_alive()
+    assert exchange.fetch_balance()["total"]["BTC"] == 0.01
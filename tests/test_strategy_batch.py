@@ -0,0 +1,75 @@
+# 📁 tests/test_strategy_batch.py
+
+import random
+
+import numpy as np
+import pytest
+
+from config.config import SYMBOL_CONFIGS
+from config.position import Position
+from data.indicator_snapshot import IndicatorSnapshot
+from strategies.batch import StrategyBatch
+from strategies.macd_kdj_strategy import STOP_METHODS, MACDKDJStrategy
+
+ROWS = 300
+
+
+def random_indicators(rng, rows):
+    """DIF/DEA、K/D 在彼此附近波动，金叉 / 死叉经常出现"""
+    values = []
+    for _ in range(rows):
+        dea, d = rng.uniform(-5, 5), rng.uniform(10, 90)
+        values.append([dea + rng.uniform(-1, 1), dea, d + rng.uniform(-8, 8), d, rng.uniform(-10, 110),
+                       rng.uniform(0.5, 5)])
+    return np.array(values)
+
+
+def random_position(rng, price):
+    if rng.random() < 0.3:
+        return None if rng.random() < 0.5 else Position()
+    entry = price * rng.uniform(0.9, 1.1)
+    return Position(
+        holding=True, amount=rng.uniform(0.1, 2), entry_price=entry,
+        trailing_stop_price=rng.choice([None, 0, entry * rng.uniform(0.9, 1.05)]),
+        max_price=rng.choice([None, 0, entry * rng.uniform(1.0, 1.15)]),
+        buy_fee=rng.choice([None, 0, rng.uniform(0, 0.5)]),
+    )
+
+
+@pytest.fixture
+def market(monkeypatch):
+    rng = random.Random(11)
+    snapshots, prices, positions = {}, {}, {}
+    for i in range(ROWS):
+        symbol = f"T{i}/USDT"
+        priority = list(STOP_METHODS)
+        rng.shuffle(priority)
+        monkeypatch.setitem(SYMBOL_CONFIGS, symbol, {
+            "min_j_sell": rng.uniform(70, 95), "min_profit_pct": rng.uniform(0, 2),
+            "fixed_stop_loss_pct": rng.uniform(0.01, 0.05), "atr_stop_multiplier": rng.uniform(1, 3),
+            "max_drawdown_pct": rng.uniform(0.02, 0.08), "stop_loss_priority": priority[:rng.randint(1, 5)],
+        })
+        # 指标不足两根 / 只有一根 / 没有快照的行也要一致
+        length = rng.choice([0, 1, 2, 2, 3])
+        snapshots[symbol] = IndicatorSnapshot(symbol, "1m", 0, random_indicators(rng, length)) if length else None
+        prices[symbol] = rng.uniform(90, 110)
+        positions[symbol] = random_position(rng, prices[symbol])
+    return snapshots, prices, positions
+
+
+def test_evaluate_batch_matches_scalar_methods_row_by_row(market):
+    snapshots, prices, positions = market
+    strategy = MACDKDJStrategy()
+    signals = strategy.evaluate_batch(StrategyBatch.from_snapshots(snapshots, prices, positions))
+
+    for i, symbol in enumerate(signals.symbols):
+        position = positions[symbol] or Position()
+        kwargs = {"indicators": snapshots[symbol]}
+        price = prices[symbol]
+        assert bool(signals.buy[i]) == strategy.should_buy(symbol, price, position, **kwargs), symbol
+        assert bool(signals.sell[i]) == strategy.should_sell(symbol, price, position, **kwargs), symbol
+        assert signals.stop_reason[i] == strategy.evaluate_stop_loss(symbol, price, position, **kwargs), symbol
+
+    # 随机数据确实覆盖了各类信号
+    assert signals.buy.any() and signals.sell.any()
+    assert len(set(signals.stop_reason) - {None}) >= 4
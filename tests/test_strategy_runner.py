@@ -0,0 +1,43 @@
+# 📁 tests/test_strategy_runner.py
+
+import numpy as np
+
+from config.position import PositionBook
+from core import strategy_runner
+from data.indicator_snapshot import IndicatorSnapshot, INDICATOR_NAMES
+from data.order_book import BookTop
+from strategies.base_strategy import BaseStrategy
+
+
+class RecordingStrategy(BaseStrategy):
+    """记录每次调用收到的扩展参数，从不触发买卖"""
+
+    def __init__(self):
+        self.calls = []
+
+    def should_buy(self, symbol, price, position, **kwargs):
+        self.calls.append(("buy", kwargs))
+        return False
+
+    def should_sell(self, symbol, price, position, **kwargs):
+        self.calls.append(("sell", kwargs))
+        return False
+
+    def should_stop_loss(self, symbol, price, position, **kwargs):
+        self.calls.append(("stop_loss", kwargs))
+        return False
+
+
+def test_evaluate_symbol_passes_order_book_top_to_strategy(monkeypatch):
+    top = BookTop("BTC/USDT", 29999.0, 30001.0, 30000.0, 2.0, 0.67, 0.25, 0.0)
+    snapshot = IndicatorSnapshot("BTC/USDT", "1m", 0, np.zeros((2, len(INDICATOR_NAMES))))
+    monkeypatch.setattr(strategy_runner, "get_ticker", lambda symbol: {"symbol": symbol, "last": 30000.0})
+    monkeypatch.setattr(strategy_runner, "get_strategy_indicators", lambda **kwargs: snapshot)
+    monkeypatch.setattr(strategy_runner, "is_ticker_stale", lambda *args: False)
+    monkeypatch.setattr(strategy_runner.order_books, "top", lambda symbol: top)
+
+    strategy = RecordingStrategy()
+    strategy_runner.evaluate_symbol(strategy, "BTC/USDT", {"trailing_stop_pct": 0.02}, PositionBook())
+
+    assert [name for name, _ in strategy.calls] == ["buy", "sell", "stop_loss"]
+    assert all(kwargs["order_book"] is top for _, kwargs in strategy.calls)
@@ -0,0 +1,162 @@
+# 📁 tests/test_venues.py
+
+import threading
+
+import pytest
+
+from binance.exchange import set_exchange
+from binance.services import reset_precision_cache
+from binance.simulator import SimulatedExchange
+from binance.venues import VenueRegistry, venues
+from config.config import SYMBOL_CONFIGS
+from config.position import PositionBook
+from core import signal_handler
+
+SYMBOL = "BTC/USDT"
+
+
+class FakeVenue(SimulatedExchange):
+    """
+    基于本地撮合引擎的交易所替身：固定价格的合成盘口，可以注入报价延迟或失败，并统计行情请求次数。
+    """
+
+    def __init__(self, price, spread_bps=2, delay=0.0, fail=False, balances=None):
+        super().__init__(balances=balances or {"USDT": 100000, "BTC": 1}, spread_bps=spread_bps)
+        self.delay = delay
+        self.fail = fail
+        self.ticker_calls = 0
+        self._unblock = threading.Event()
+        self._on_price(SYMBOL, price)
+
+    def fetch_ticker(self, symbol):
+        self.ticker_calls += 1
+        if self.fail:
+            raise RuntimeError("exchange unavailable")
+        if self.delay:
+            self._unblock.wait(self.delay)
+        return super().fetch_ticker(symbol)
+
+    def release(self):
+        """让挂起中的慢请求立即返回（测试结束时不留后台线程）"""
+        self._unblock.set()
+
+
+@pytest.fixture
+def registry():
+    registry = VenueRegistry(default="home", quote_venues={}, trading_venues={}, timeout=0.2)
+    yield registry
+    for name in registry.names():
+        client = registry.get(name).client
+        if isinstance(client, FakeVenue):
+            client.release()
+
+
+def test_fetch_quotes_skips_failed_and_slow_venues(registry):
+    registry.register("home", FakeVenue(30000), default=True)
+    registry.register("okx", FakeVenue(30010))
+    registry.register("broken", FakeVenue(30000, fail=True))
+    registry.register("slow", FakeVenue(29000, delay=5))
+
+    quotes = registry.fetch_quotes(SYMBOL)
+
+    assert sorted(quotes) == ["home", "okx"]
+    assert quotes["okx"].last == 30010
+    assert quotes["home"].bid < 30000 < quotes["home"].ask
+
+
+def test_fetch_quotes_single_venue_failure_returns_empty(registry):
+    registry.register("home", FakeVenue(30000, fail=True), default=True)
+    assert registry.fetch_quotes(SYMBOL) == {}
+    assert registry.best_quote(SYMBOL, "BUY") is None
+
+
+def test_best_quote_picks_cheapest_ask_and_highest_bid(registry):
+    registry.register("home", FakeVenue(30000), default=True)
+    registry.register("cheap", FakeVenue(29900))
+    registry.register("rich", FakeVenue(30100), trading=False)
+
+    assert registry.best_quote(SYMBOL, "BUY").venue == "cheap"
+    assert registry.best_quote(SYMBOL, "SELL").venue == "rich"
+    # 只读行情交易所不参与下单路由
+    assert registry.best_quote(SYMBOL, "SELL", trading_only=True).venue == "home"
+
+
+def test_trading_venues_from_config_are_routable():
+    registry = VenueRegistry(default="home", quote_venues={"okx": "okx"}, trading_venues={"bybit": "bybit"})
+    assert registry.names(trading_only=True) == ["home", "bybit"]
+    assert not registry.get("okx").trading
+
+
+# ===== 下单路由（全局注册表） =====
+
+@pytest.fixture
+def routed(monkeypatch):
+    """默认交易所 + 一个报价更优的可下单交易所，币种配置 venue = "best" """
+    home, cheap = FakeVenue(30000), FakeVenue(29900)
+    set_exchange(home)
+    venues.register("cheap", cheap)
+    monkeypatch.setitem(SYMBOL_CONFIGS, SYMBOL, dict(SYMBOL_CONFIGS[SYMBOL], venue="best", order_type="MARKET",
+                                                     execution=None, amount=0.01))
+    reset_precision_cache(SYMBOL)
+    yield home, cheap
+    venues.unregister("cheap")
+    reset_precision_cache(SYMBOL)
+    set_exchange(None)
+
+
+def test_best_buy_opens_on_cheapest_venue_and_sells_there(routed):
+    home, cheap = routed
+    position = PositionBook()
+
+    signal_handler.handle_buy(SYMBOL, 30000.0, position)
+    record = position[SYMBOL]
+    assert record.holding and record.venue == "cheap"
+    assert cheap.fetch_balance()["free"]["BTC"] > 1
+    # 下单价格直接用比价拿到的报价，不再单独请求行情
+    assert cheap.ticker_calls == 1
+
+    # 卖出回到持币的交易所，即使另一个交易所买一更高
+    home._on_price(SYMBOL, 31000)
+    signal_handler.handle_sell(SYMBOL, 31000.0, record, position)
+    assert not position[SYMBOL].holding
+    assert cheap.fetch_balance()["free"]["BTC"] == pytest.approx(1)
+    assert home.fetch_balance()["free"]["BTC"] == pytest.approx(1)
+
+
+def test_stop_loss_skips_quote_comparison_and_uses_position_venue(routed):
+    home, cheap = routed
+    position = PositionBook()
+    signal_handler.handle_buy(SYMBOL, 30000.0, position)
+    calls = home.ticker_calls, cheap.ticker_calls
+
+    signal_handler.handle_stop_loss(SYMBOL, 29000.0, position[SYMBOL], position, reason="fixed")
+
+    assert not position[SYMBOL].holding
+    assert (home.ticker_calls, cheap.ticker_calls) == calls
+    assert cheap.fetch_balance()["free"]["BTC"] == pytest.approx(1)
+
+
+def test_legacy_position_without_venue_sells_on_default_venue(routed):
+    home, cheap = routed
+    position = PositionBook()
+    position.ensure(SYMBOL).open(30000.0, 0.01, 0.0, 0.02)
+    assert position[SYMBOL].venue is None
+
+    signal_handler.handle_sell(SYMBOL, 30000.0, position[SYMBOL], position)
+
+    assert home.fetch_balance()["free"]["BTC"] == pytest.approx(0.99)
+    assert cheap.fetch_balance()["free"]["BTC"] == pytest.approx(1)
+
+
+def test_config_change_reloads_markets_on_every_trading_venue(routed, monkeypatch):
+    from core.strategy_runner import on_symbol_config_changed
+
+    home, cheap = routed
+    for client in (home, cheap):
+        assert client.market(SYMBOL)["precision"]["amount"] != 0.001
+    monkeypatch.setitem(SYMBOL_CONFIGS, SYMBOL, dict(SYMBOL_CONFIGS[SYMBOL], amount_step=0.001))
+
+    on_symbol_config_changed(SYMBOL, SYMBOL_CONFIGS[SYMBOL], SYMBOL_CONFIGS[SYMBOL])
+
+    for client in (home, cheap):
+        assert client.market(SYMBOL)["precision"]["amount"] == 0.001
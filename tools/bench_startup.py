@@ -0,0 +1,77 @@
+# 📁 tools/bench_startup.py
+"""
+启动耗时基准：在全新子进程中反复导入指定模块，统计冷启动耗时。
+
+用法：
+    python tools/bench_startup.py                       # 默认测量 core.strategy_runner
+    python tools/bench_startup.py -m binance.simulator -n 20 --max-seconds 1.0
+    python tools/bench_startup.py --importtime          # 额外输出最慢的导入模块（python -X importtime）
+
+--max-seconds 指定时，中位数超过阈值则以非 0 状态码退出，可用于 CI 防止启动变慢。
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str, runs: int) -> list:
+    """在子进程中导入 module，返回每次的耗时（秒）"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def slowest_imports(module: str, top: int = 15) -> list:
+    """使用 -X importtime 找出累计耗时最多的导入模块"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, check=True, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line.split("|")]
+        rows.append((int(cumulative_us), int(self_us.split(":")[-1]), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量模块冷启动导入耗时")
+    parser.add_argument("-m", "--module", action="append", help="要测量的模块，可重复指定")
+    parser.add_argument("-n", "--runs", type=int, default=10, help="每个模块的测量次数")
+    parser.add_argument("--max-seconds", type=float, help="中位数耗时上限，超过则失败")
+    parser.add_argument("--importtime", action="store_true", help="输出最慢的导入模块")
+    args = parser.parse_args()
+
+    modules = args.module or ["core.strategy_runner"]
+    baseline = statistics.median(measure("sys", args.runs))
+    print(f"解释器空启动: {baseline * 1000:.1f} ms")
+
+    failed = False
+    for module in modules:
+        timings = measure(module, args.runs)
+        median = statistics.median(timings)
+        print(f"{module}: 中位数 {median * 1000:.1f} ms（最小 {min(timings) * 1000:.1f} ms，"
+              f"扣除解释器启动 {(median - baseline) * 1000:.1f} ms）")
+        if args.importtime:
+            for cumulative, self_us, name in slowest_imports(module):
+                print(f"    {cumulative / 1000:8.1f} ms  {name}")
+        if args.max_seconds is not None and median > args.max_seconds:
+            print(f"❌ {module} 启动耗时超过 {args.max_seconds} 秒")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
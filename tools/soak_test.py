@@ -0,0 +1,184 @@
+# 📁 tools/soak_test.py
+"""
+内存浸泡测试：用模拟时钟和合成行情驱动真实的主循环（策略 / 指标 / 撮合 / 订单管理 / 风控），
+快速跑完 N 天的行情，定期记录进程 RSS，检查预热之后内存是否保持平稳。
+
+用法：
+    python tools/soak_test.py                         # 模拟 30 天（每个币种每分钟检查一次，耗时约 20 分钟）
+    python tools/soak_test.py --days 3 --max-growth-mb 10
+    python tools/soak_test.py --days 1 --tick-seconds 0   # 使用 config.py 中的真实调度间隔
+
+行情为每个币种独立的随机游走（可复现，--seed 指定），运行在临时目录中，
+日志写入 /dev/null，不会修改项目中的 position.json / risk_state.json。
+预热（--warmup-days）之后 RSS 增长超过 --max-growth-mb 时以非 0 状态码退出，可用于 CI。
+"""
+
+import argparse
+import contextlib
+import gc
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import deque
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SYMBOL_CONFIG_FILE", os.path.join(ROOT, "config", "symbols.toml"))
+
+MINUTE_MS = 60_000
+
+# 合成行情保留的分钟 K 线数量（测试工具自身也不能无限增长）
+HISTORY_MINUTES = 1500
+
+
+def current_rss_mb() -> float:
+    """当前进程的常驻内存（MB）；非 Linux 平台退化为峰值 RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+class SyntheticMarket:
+    """
+    按模拟时钟生成分钟 K 线的行情源（实现 fetch_ticker / fetch_ohlcv，供 SimulatedExchange 透传）。
+    价格为带均值回归和周期波动的随机游走，足以触发策略的买卖和止损。
+    """
+
+    def __init__(self, clock, symbols: dict, seed: int):
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.base = dict(symbols)
+        self.price = dict(symbols)
+        self.candles = {symbol: deque(maxlen=HISTORY_MINUTES) for symbol in symbols}
+        start = self._minute() - (HISTORY_MINUTES - 1) * MINUTE_MS
+        for symbol in symbols:
+            for t in range(start, self._minute() + MINUTE_MS, MINUTE_MS):
+                self._append(symbol, t)
+
+    def _minute(self) -> int:
+        return int(self.clock.time() * 1000) // MINUTE_MS * MINUTE_MS
+
+    def _append(self, symbol: str, t: int):
+        base, last = self.base[symbol], self.price[symbol]
+        cycle = 0.02 * math.sin(t / (MINUTE_MS * 240))
+        drift = 0.05 * (base * (1 + cycle) - last) / base
+        close = last * (1 + drift + self.rng.gauss(0, 0.002))
+        high = max(last, close) * (1 + abs(self.rng.gauss(0, 0.001)))
+        low = min(last, close) * (1 - abs(self.rng.gauss(0, 0.001)))
+        self.candles[symbol].append([t, last, high, low, close, self.rng.uniform(1, 100)])
+        self.price[symbol] = close
+
+    def _advance(self, symbol: str):
+        candles = self.candles[symbol]
+        now = self._minute()
+        while candles[-1][0] < now:
+            self._append(symbol, candles[-1][0] + MINUTE_MS)
+
+    def fetch_ticker(self, symbol):
+        self._advance(symbol)
+        last = self.candles[symbol][-1][4] * (1 + self.rng.gauss(0, 0.0005))
+        return {"symbol": symbol, "timestamp": int(self.clock.time() * 1000), "last": last}
+
+    def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=200):
+        self._advance(symbol)
+        candles = self.candles[symbol]
+        if since is not None:
+            rows = [c for c in candles if c[0] >= since][:limit]
+        else:
+            rows = list(candles)[-limit:]
+        return [list(c) for c in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="主循环内存浸泡测试")
+    parser.add_argument("--days", type=float, default=30, help="模拟运行的天数")
+    parser.add_argument("--warmup-days", type=float, default=1, help="预热天数（之后开始检查内存增长）")
+    parser.add_argument("--max-growth-mb", type=float, default=20, help="预热后允许的 RSS 增长上限（MB）")
+    parser.add_argument("--chunk-cycles", type=int, default=2000, help="每多少轮主循环采样一次 RSS")
+    parser.add_argument(
+        "--tick-seconds", type=float, default=60,
+        help="每个币种两次策略判断的最短间隔（秒），放大调度间隔以加快模拟；0 表示使用 config.py 中的调度参数"
+    )
+    parser.add_argument("--seed", type=int, default=7, help="合成行情的随机种子")
+    args = parser.parse_args()
+
+    # 在临时目录中运行，持仓 / 风控状态 / 交易记录都写在这里
+    workdir = tempfile.mkdtemp(prefix="soak-")
+    os.chdir(workdir)
+    os.makedirs("logs", exist_ok=True)
+
+    import config.logger
+    config.logger.LOG_FILE = os.devnull
+
+    from config import clock
+    from config.config import SYMBOL_CONFIGS
+    from binance.exchange import set_exchange
+    from binance.simulator import SimulatedExchange
+    from notify.telegram import set_enabled
+    from core import strategy_runner
+    from core.strategy_runner import run_loop
+    from data import data_quality, indicator_fetcher
+    from binance import services
+    from core import scheduler as scheduler_module
+
+    if args.tick_seconds:
+        # 只放大调度间隔（K 线收盘对齐、退避等逻辑不变），减少模拟一个月所需的策略判断次数
+        scheduler_module.INTERVAL = max(scheduler_module.INTERVAL, args.tick_seconds)
+        scheduler_module.IDLE_INTERVAL = max(scheduler_module.IDLE_INTERVAL, args.tick_seconds)
+        scheduler_module.NEAR_STOP_INTERVAL = max(scheduler_module.NEAR_STOP_INTERVAL, args.tick_seconds)
+
+    # 合成行情没有对应的增量深度推送，不连接 Binance
+    strategy_runner.ORDER_BOOK_STREAM = False
+
+    replay_clock = clock.ReplayClock(time.time())
+    clock.set_clock(replay_clock)
+    set_enabled(False)
+
+    symbols = {symbol: config.get("buy_price", 100) * 0.98 for symbol, config in SYMBOL_CONFIGS.items()}
+    exchange = SimulatedExchange(data_source=SyntheticMarket(replay_clock, symbols, args.seed), balances={"USDT": 1_000_000})
+    set_exchange(exchange)
+
+    start = replay_clock.time()
+    end = start + args.days * 86400
+    samples = []
+    began = time.perf_counter()
+
+    print(f"🧪 浸泡测试：{len(symbols)} 个币种，模拟 {args.days:g} 天，工作目录 {workdir}", file=sys.stderr)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        while replay_clock.time() < end:
+            run_loop(max_cycles=args.chunk_cycles)
+            gc.collect()
+            day = (replay_clock.time() - start) / 86400
+            samples.append((day, current_rss_mb()))
+            print(
+                f"  第 {day:6.2f} 天  RSS {samples[-1][1]:7.1f} MB  "
+                f"（K 线缓存 {len(data_quality._candle_buffers)}，指标缓存 {len(indicator_fetcher._indicator_buffers)}，"
+                f"精度缓存 {len(services._precision_cache)}，模拟订单 {len(exchange._orders)}，成交 {len(exchange._trades)}）",
+                file=sys.stderr
+            )
+
+    measured = [rss for day, rss in samples if day >= args.warmup_days]
+    baseline = next((rss for day, rss in samples if day >= args.warmup_days), samples[-1][1])
+    growth = max(measured, default=baseline) - baseline
+    elapsed = time.perf_counter() - began
+    print(
+        f"📊 用时 {elapsed:.0f} 秒；预热后 RSS 基线 {baseline:.1f} MB，最高增长 {growth:+.1f} MB"
+        f"（上限 {args.max_growth_mb:g} MB）",
+        file=sys.stderr
+    )
+    if growth > args.max_growth_mb:
+        print("❌ 内存持续增长，浸泡测试失败", file=sys.stderr)
+        sys.exit(1)
+    print("✅ 内存保持平稳", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()